@@ -39,8 +39,13 @@ class PubSub(typing.Generic[_T]):
     def stop(self) -> None:
         self._item.cancel()
 
-    async def subscribe(self) -> AsyncIterator[_T]:
-        next_item = self._item
+    def subscribe(self) -> AsyncIterator[_T]:
+        # Values published after this call are received,
+        # even if iterating only starts later.
+        return self._iter_values(self._item)
+
+    @staticmethod
+    async def _iter_values(next_item: "PubSub.Message[_T]") -> AsyncIterator[_T]:
         while True:
             try:
                 value, next_item = await next_item
@@ -91,7 +96,7 @@ async def schedule(
         emitter = emitter_class(
             event_queue=PubSubEventQueue(pubsub=pubsub),
             watch=watchdog.observers.api.ObservedWatch(  # type: ignore[no-untyped-call]
-                str(path), recursive
+                str(path), recursive=recursive
             ),
             timeout=timeout,
         )
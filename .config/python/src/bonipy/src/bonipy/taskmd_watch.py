@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+
+# Keep taskmd totals of a directory up to date as files change.
+#
+# Only the changed file is parsed again,
+# and its previous contribution to the totals is replaced.
+# Totals are published to subscribers,
+# such as a status file for tmux or an HTTP endpoint:
+#
+#     python3 -m bonipy.taskmd_watch ~/notes --output ~/.cache/taskmd-status
+#     set -g status-right '#(cat ~/.cache/taskmd-status)'
+
+# Standard libraries.
+import argparse
+import asyncio
+import collections.abc as cabc
+import datetime
+import json
+import logging
+import os
+import pathlib
+import sys
+import typing as t
+
+# External dependencies.
+import watchdog.events
+
+# Internal modules.
+from bonipy35.taskmd import data
+
+from .extension.watchdog_ext.asyncio_ext import PubSub, schedule
+
+_P = t.ParamSpec("_P")
+_logger = logging.getLogger(__name__)
+
+# Seconds to wait for more changes to a file before parsing it.
+DEFAULT_DEBOUNCE = 0.5
+
+# Other events, such as opening a file, would be triggered by parsing it.
+CHANGE_EVENT_TYPES = frozenset(
+    (
+        watchdog.events.EVENT_TYPE_CREATED,
+        watchdog.events.EVENT_TYPE_DELETED,
+        watchdog.events.EVENT_TYPE_MODIFIED,
+        watchdog.events.EVENT_TYPE_MOVED,
+    )
+)
+
+
+class Totals:
+    """Clocked seconds of today, of this week and of each tag this week."""
+
+    def __init__(
+        self,
+        *args: _P.args,  # type: ignore[valid-type]
+        **kwargs: _P.kwargs,  # type: ignore[valid-type]
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.today_seconds = 0
+        self.week_seconds = 0
+        self.tag_seconds: dict[str, int] = {}
+
+    def add(self, other: "Totals", *, sign: int = 1) -> None:
+        self.today_seconds += sign * other.today_seconds
+        self.week_seconds += sign * other.week_seconds
+        tag_seconds = self.tag_seconds
+        for tag, seconds in other.tag_seconds.items():
+            new_seconds = tag_seconds.get(tag, 0) + sign * seconds
+            # Drop tags of removed clocks, so the totals do not grow over time.
+            if new_seconds:
+                tag_seconds[tag] = new_seconds
+            else:
+                tag_seconds.pop(tag, None)
+
+    def copy(self) -> "Totals":
+        totals = Totals()
+        totals.add(self)
+        return totals
+
+    def to_dict(self) -> dict[str, t.Any]:
+        return {
+            "tag_seconds": dict(sorted(self.tag_seconds.items())),
+            "today_seconds": self.today_seconds,
+            "week_seconds": self.week_seconds,
+        }
+
+    def to_status(self) -> str:
+        today_hours = self.today_seconds / 3600
+        week_hours = self.week_seconds / 3600
+        return f"Today {today_hours:.2f} h, week {week_hours:.2f} h"
+
+
+def get_periods(
+    now: datetime.datetime,
+) -> tuple[datetime.datetime, datetime.datetime, datetime.datetime]:
+    """Get start of today, start of this week and start of next week."""
+
+    today = datetime.datetime(now.year, now.month, now.day, tzinfo=now.tzinfo)
+    week_start = today - datetime.timedelta(days=today.weekday())
+    return today, week_start, week_start + datetime.timedelta(days=7)
+
+
+def get_file_totals(path: pathlib.Path, *, now: datetime.datetime) -> Totals:
+    with path.open(encoding="utf-8") as stream:
+        parsed_lines = list(data.iter_structure(data.iter_lines(stream)))
+    clock_index = data.ClockIndex.build(
+        data.ParsedDocument(parsed_lines=parsed_lines)
+    )
+    tag_index = data.TagIndex.build(data.iter_headline_tags(parsed_lines))
+
+    today, week_start, week_end = get_periods(now)
+    week_rollup = tag_index.rollup(
+        clock_index, start=week_start, end=week_end
+    )
+    today_rollup = tag_index.rollup(
+        clock_index, start=today, end=today + datetime.timedelta(days=1)
+    )
+
+    totals = Totals()
+    totals.today_seconds = today_rollup.duration_seconds
+    totals.week_seconds = week_rollup.duration_seconds
+    totals.tag_seconds = dict(week_rollup.tag_durations)
+    return totals
+
+
+def is_taskmd_path(path: pathlib.Path) -> bool:
+    return path.suffix == ".md"
+
+
+class Watcher:
+    """
+    Totals of taskmd files in a directory.
+
+    Only totals of each file are kept, not their parsed documents,
+    so memory use does not depend on how long the watcher runs.
+    """
+
+    def __init__(
+        self,
+        *args: _P.args,  # type: ignore[valid-type]
+        debounce: float = DEFAULT_DEBOUNCE,
+        directory: pathlib.Path,
+        **kwargs: _P.kwargs,  # type: ignore[valid-type]
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.debounce = debounce
+        self.directory = directory
+        self.file_totals: dict[pathlib.Path, Totals] = {}
+        self.pubsub: PubSub[Totals] = PubSub()
+        self.totals = Totals()
+        # Refreshes wait for a rescan to finish, and the other way around,
+        # so a file is never counted by both.
+        self._lock = asyncio.Lock()
+        # Refreshes started by timers. The loop only keeps weak references.
+        self._tasks: set[asyncio.Task[None]] = set()
+        # Pending parses of files with recent changes.
+        self._timers: dict[pathlib.Path, asyncio.TimerHandle] = {}
+
+    async def refresh(self, path: pathlib.Path) -> None:
+        """Parse the file again and apply the change to the totals."""
+
+        async with self._lock:
+            await self._refresh(path)
+
+    async def _refresh(self, path: pathlib.Path) -> None:
+        try:
+            new_totals: None | Totals = await asyncio.to_thread(
+                get_file_totals, path, now=data.get_now()
+            )
+        except FileNotFoundError:
+            new_totals = None
+        except (OSError, UnicodeDecodeError) as error:
+            _logger.warning("Unable to read %s: %s", path, error)
+            return
+
+        old_totals = self.file_totals.pop(path, None)
+        if old_totals is not None:
+            self.totals.add(old_totals, sign=-1)
+        if new_totals is not None:
+            self.file_totals[path] = new_totals
+            self.totals.add(new_totals)
+        # A copy, since later changes update the totals in place.
+        self.pubsub.publish(self.totals.copy())
+
+    async def rescan(self) -> None:
+        """Parse all files again, for example when the day changes."""
+
+        async with self._lock:
+            # Built apart, so totals served during the scan stay whole.
+            file_totals: dict[pathlib.Path, Totals] = {}
+            totals = Totals()
+            now = data.get_now()
+            for path in sorted(self.directory.rglob("*.md")):
+                try:
+                    path_totals = await asyncio.to_thread(
+                        get_file_totals, path, now=now
+                    )
+                except (OSError, UnicodeDecodeError) as error:
+                    _logger.warning("Unable to read %s: %s", path, error)
+                    continue
+                file_totals[path] = path_totals
+                totals.add(path_totals)
+            self.file_totals = file_totals
+            self.totals = totals
+        self.pubsub.publish(self.totals.copy())
+
+    def schedule_refresh(self, path: pathlib.Path) -> None:
+        # Restart the wait on every change, so a burst of saves parses once.
+        timer = self._timers.pop(path, None)
+        if timer is not None:
+            timer.cancel()
+
+        def on_timeout() -> None:
+            del self._timers[path]
+            task = asyncio.create_task(self.refresh(path))
+            self._tasks.add(task)
+            task.add_done_callback(self._on_refresh_done)
+
+        self._timers[path] = asyncio.get_running_loop().call_later(
+            self.debounce, on_timeout
+        )
+
+    def _on_refresh_done(self, task: asyncio.Task[None]) -> None:
+        self._tasks.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            _logger.error("Unable to refresh totals: %s", error)
+
+    def on_event(self, event: watchdog.events.FileSystemEvent) -> None:
+        if event.is_directory or event.event_type not in CHANGE_EVENT_TYPES:
+            return
+        paths = [event.src_path]
+        if isinstance(event, watchdog.events.FileMovedEvent):
+            paths.append(event.dest_path)
+        for path_value in paths:
+            path = pathlib.Path(os.fsdecode(path_value))
+            if is_taskmd_path(path):
+                self.schedule_refresh(path)
+
+    async def roll_over(self) -> None:
+        # Today and this week are different after midnight.
+        while True:
+            now = data.get_now()
+            tomorrow = get_periods(now)[0] + datetime.timedelta(days=1)
+            await asyncio.sleep((tomorrow - now).total_seconds())
+            await self.rescan()
+
+    async def run(self) -> None:
+        async with schedule(path=self.directory, recursive=True) as events:
+            # Subscribed before the scan, so files saved during it are refreshed.
+            subscription = events.subscribe()
+            await self.rescan()
+            roll_over_task = asyncio.create_task(self.roll_over())
+            try:
+                async for event in subscription:
+                    self.on_event(event)
+            finally:
+                roll_over_task.cancel()
+                for timer in self._timers.values():
+                    timer.cancel()
+                self._timers.clear()
+                for task in self._tasks:
+                    task.cancel()
+                self.pubsub.stop()
+
+
+async def write_status(
+    totals_feed: cabc.AsyncIterator[Totals],
+    *,
+    output_path: None | pathlib.Path,
+) -> None:
+    async for totals in totals_feed:
+        status = totals.to_status()
+        if output_path is None:
+            print(status, flush=True)
+            continue
+        # Replace the file so readers never see a partial status.
+        temporary_path = output_path.with_name(output_path.name + ".tmp")
+        temporary_path.write_text(status + "\n", encoding="utf-8")
+        os.replace(temporary_path, output_path)
+
+
+async def serve_totals(watcher: Watcher, *, host: str, port: int) -> None:
+    """Reply to every HTTP request with the totals as JSON."""
+
+    async def on_connection(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            # Only the request line and headers are read. Paths are ignored.
+            while (await reader.readline()).strip():
+                pass
+            body = json.dumps(watcher.totals.to_dict()).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: application/json\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                b"Connection: close\r\n"
+                b"\r\n" + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(on_connection, host=host, port=port)
+    async with server:
+        await server.serve_forever()
+
+
+def parse_arguments() -> argparse.Namespace:
+    argument_parser = argparse.ArgumentParser(
+        description="Keep totals of taskmd files up to date."
+    )
+    argument_parser.add_argument("directory", type=pathlib.Path)
+    argument_parser.add_argument(
+        "--debounce",
+        default=DEFAULT_DEBOUNCE,
+        help="Seconds to wait for more changes to a file.",
+        type=float,
+    )
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    argument_parser.add_argument(
+        "--output", help="File to write status line to.", type=pathlib.Path
+    )
+    argument_parser.add_argument(
+        "--port", help="Serve totals as JSON over HTTP.", type=int
+    )
+    return argument_parser.parse_args()
+
+
+async def amain() -> int:
+    arguments = parse_arguments()
+
+    watcher = Watcher(
+        debounce=arguments.debounce, directory=arguments.directory
+    )
+    tasks = [
+        asyncio.create_task(watcher.run()),
+        asyncio.create_task(
+            write_status(
+                watcher.pubsub.subscribe(), output_path=arguments.output
+            )
+        ),
+    ]
+    if arguments.port is not None:
+        tasks.append(
+            asyncio.create_task(
+                serve_totals(
+                    watcher, host=arguments.host, port=arguments.port
+                )
+            )
+        )
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return 0
+
+
+def main() -> int:
+    try:
+        return asyncio.run(amain())
+    except KeyboardInterrupt:
+        return 2  # SIGINT = 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
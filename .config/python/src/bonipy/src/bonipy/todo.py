@@ -5,10 +5,16 @@
 
 # Standard libraries.
 import argparse
+import codecs
 import contextlib
 import datetime
+import heapq
+import io
 import logging
+import mmap
+import os
 import re
+import stat
 import sys
 import typing
 
@@ -117,27 +123,107 @@ def create_markdown_parser() -> Generator["None | Token", str, None]:
         line = yield None
 
 
-DEFAULT_BUFFER_SIZE = 4096
+# Bytes read, or mapped and decoded, at a time.
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+# Both LF and CRLF end a line. A last line without line ending is still yielded.
+def split_chunks(
+    chunks: "typing.Iterable[bytes]",
+    *,
+    encoding: str = "utf-8",
+    errors: str = "strict"
+) -> Generator[str, None, None]:
+    # Keeps bytes of a character split across chunks until the next chunk.
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    # Text of a line not ended yet. Joined once the line ends,
+    # so a long line is not copied again for every chunk.
+    pending = []  # type: list[str]
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        end = text.rfind("\n")
+        if end < 0:
+            pending.append(text)
+            continue
+        pending.append(text[: end + 1])
+        rest = text[end + 1 :]
+        text = "".join(pending)
+        pending = [rest]
+        if "\r" in text:
+            text = text.replace("\r\n", "\n")
+        lines = text.split("\n")
+        # The text ends with a new line, so the last item is empty.
+        del lines[-1]
+        yield from lines
+    pending.append(decoder.decode(b"", final=True))
+    text = "".join(pending)
+    if text:
+        yield text[:-1] if text.endswith("\r") else text
+
+
+def iter_chunks(
+    *, buffer_size: int, source: typing.BinaryIO
+) -> Generator[bytes, None, None]:
+    # Regular files are mapped to memory instead of read into buffers.
+    try:
+        fileno = source.fileno()
+        position = source.tell()
+        file_stat = os.fstat(fileno)
+        size = file_stat.st_size
+        is_mappable = stat.S_ISREG(file_stat.st_mode) and position < size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        is_mappable = False
+
+    if is_mappable:
+        with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mapped_source:
+            for start in range(position, size, buffer_size):
+                yield mapped_source[start : start + buffer_size]
+        source.seek(size)
+        return
+
+    # Returns what is available, up to the buffer size,
+    # instead of waiting for a full buffer. Pipes can then be streamed.
+    read = getattr(source, "read1", source.read)
+    while True:
+        chunk = read(buffer_size)
+        # Empty chunk if at EOF.
+        if not chunk:
+            return
+        yield chunk
 
 
 def read_lines(
-    *, buffer_size: "None | int" = None, source: typing.TextIO
+    *,
+    buffer_size: "None | int" = None,
+    source: "typing.BinaryIO | typing.TextIO"
 ) -> Generator[str, None, None]:
     if buffer_size is None:
         buffer_size = DEFAULT_BUFFER_SIZE
     if buffer_size <= 0:
         return
-    while True:
-        line = source.readline(buffer_size)
-        # Empty line if at EOF.
-        if not line:
-            return
-        if len(line) >= buffer_size:
-            _logger.error("Line too long.")
+
+    encoding = "utf-8"
+    errors = "strict"
+    if isinstance(source, io.TextIOBase):
+        # Decoding a chunk at a time is faster than decoding every line.
+        binary_source = getattr(source, "buffer", None)
+        if binary_source is None:
+            # For example, `io.StringIO`, which is already decoded.
+            for line in source:
+                if line.endswith("\n"):
+                    line = line[:-2] if line.endswith("\r\n") else line[:-1]
+                yield line
             return
-        # Note that line always has a trailing new line unless ending in EOF.
-        # TODO: Check line ending of source. Strip line ending before yielding line.
-        yield line[:-1]
+        encoding = source.encoding or encoding
+        errors = source.errors or errors
+        source = binary_source
+
+    binary_source = typing.cast(typing.BinaryIO, source)
+    yield from split_chunks(
+        iter_chunks(buffer_size=buffer_size, source=binary_source),
+        encoding=encoding,
+        errors=errors,
+    )
 
 
 Entry = typing.NamedTuple(
@@ -173,77 +259,85 @@ def create_token_parser() -> Generator["None | Entry", Token, "None | Entry"]:
         entry = Entry(title=token, clocks=[], children=[])
 
 
-# TODO: Consider using recursive yield from.
-def create_entry_parser() -> Generator[None, Entry, Entry]:
-    try:
-        base_entry = entry = yield None
-    except GeneratorExit:
-        # Use default entry.
-        return Entry(
+Outline = typing.NamedTuple(
+    "Outline",
+    [
+        ("entries", "list[Entry]"),
+        ("durations", "list[datetime.timedelta]"),
+    ],
+)
+
+
+def create_outline_parser() -> Generator[None, Token, Outline]:
+    # Entries in document order, starting with the level 0 document entry.
+    entries = [
+        Entry(
             title=Title(level=0, state="", priority="", content="", tags=[]),
             clocks=[],
             children=[],
         )
+    ]
+    # Duration of clocks in each entry and in its descendants.
+    # Descendants are only added once they are closed.
+    durations = [datetime.timedelta()]
+    # Indices of the open entry and its ancestors.
+    ancestors = [0]
 
-    if not base_entry.title.level:
-        raise RuntimeError("First entry must have a level 0 title.")
+    def close(level: int) -> None:
+        while len(ancestors) > 1 and entries[ancestors[-1]].title.level >= level:
+            closed_index = ancestors.pop()
+            durations[ancestors[-1]] += durations[closed_index]
 
     while True:
         try:
-            entry = yield None
+            token = yield None
         except GeneratorExit:
-            return base_entry
+            close(0)
+            return Outline(entries=entries, durations=durations)
 
-        parent = base_entry
+        if isinstance(token, Clock):
+            entries[ancestors[-1]].clocks.append(token)
+            durations[ancestors[-1]] += token.end - token.start
+            continue
 
-        level = entry.level
-        while parent.children:
-            child = parent.children[-1]
-            if child.title.level >= level:
-                break
-            parent = child
+        close(token.level)
+        entry = Entry(title=token, clocks=[], children=[])
+        entries[ancestors[-1]].children.append(entry)
+        ancestors.append(len(entries))
+        entries.append(entry)
+        durations.append(datetime.timedelta())
 
-        entry = Entry(title=markdown_line, clocks=[], children=[])
-        parent.children.append(entry)
 
+def finish_outline_parser(outline_parser: Generator[None, Token, Outline]) -> Outline:
+    try:
+        outline_parser.throw(GeneratorExit())
+    except StopIteration as error:
+        return error.value  # type: ignore[no-any-return]
+    raise RuntimeError("Outline parser did not finish.")
 
-def create_document_parser() -> Generator[None, str, Entry]:
-    document = entry = Entry(
-        title=Title(level=0, state="", priority="", content="", tags=[]),
-        clocks=[],
-        children=[],
-    )
 
+def create_document_parser() -> Generator[None, str, Entry]:
+    outline_parser = create_outline_parser()
     markdown_parser = create_markdown_parser()
     try:
+        next(outline_parser)
         next(markdown_parser)
     except StopIteration:
-        return document
+        return Entry(
+            title=Title(level=0, state="", priority="", content="", tags=[]),
+            clocks=[],
+            children=[],
+        )
 
     while True:
         try:
             line = yield None
         except GeneratorExit:
-            return document
+            return finish_outline_parser(outline_parser).entries[0]
 
         markdown_line = markdown_parser.send(line)
-        if markdown_line is None:
-            continue
-        if isinstance(markdown_line, Clock):
-            entry.clocks.append(markdown_line)
-            continue
-
-        parent = document
-
-        level = markdown_line.level
-        while parent.children:
-            child = parent.children[-1]
-            if child.title.level >= level:
-                break
-            parent = child
-
-        entry = Entry(title=markdown_line, clocks=[], children=[])
-        parent.children.append(entry)
+        if markdown_line is not None:
+            outline_parser.send(markdown_line)
 
 
 def parse_document(source: typing.TextIO) -> Entry:
@@ -271,15 +365,23 @@ def parse_document(source: typing.TextIO) -> Entry:
 MarkdownLines = "list[Token]"  # type: typing.TypeAlias # pylint: disable=invalid-name
 
 
-def read_markdown_lines() -> MarkdownLines:
+# Filename standing for standard input.
+STDIN_FILENAME = "-"
+
+
+def read_markdown_lines(filename: str = STDIN_FILENAME) -> MarkdownLines:
     markdown_parser = create_markdown_parser()
     next(markdown_parser)
     markdown_lines = []
-    for line in read_lines(source=sys.stdin):
-        result = markdown_parser.send(line)
-        if result is None:
-            continue
-        markdown_lines.append(result)
+    with contextlib.ExitStack() as stack:
+        source = sys.stdin  # type: typing.BinaryIO | typing.TextIO
+        if filename != STDIN_FILENAME:
+            source = stack.enter_context(open(filename, "rb"))
+        for line in read_lines(source=source):
+            result = markdown_parser.send(line)
+            if result is None:
+                continue
+            markdown_lines.append(result)
     return markdown_lines
 
 
@@ -301,33 +403,21 @@ LogRow = typing.NamedTuple(
 LogTable = "list[LogRow]"  # type: typing.TypeAlias # pylint: disable=invalid-name
 
 
-def to_log_table(markdown_lines: MarkdownLines) -> LogTable:
-    log_table = []
-
-    # Store total duration in the first line as summary.
-    # It will be filled again before returning.
-    total_duration = datetime.timedelta()
-    duration = datetime.timedelta()
-    content = "Title"
-
-    def add_row() -> None:
-        log_table.append(LogRow(print_duration(duration), content))
+def to_log_table(markdown_lines: MarkdownLines, *, title: str = "Title") -> LogTable:
+    outline_parser = create_outline_parser()
+    next(outline_parser)
+    for markdown_line in markdown_lines:
+        outline_parser.send(markdown_line)
+    outline = finish_outline_parser(outline_parser)
 
+    # Duration of each title includes its descendants.
+    # The first row is the document, with the total duration as summary.
     indent = "  "
-    for line in markdown_lines:
-        if isinstance(line, Title):
-            add_row()
-            content = indent * (line.level - 1) + line.content
-            duration = datetime.timedelta()
-            continue
-
-        clock_duration = line.end - line.start
-        duration += clock_duration
-        total_duration += clock_duration
-
-    add_row()
-
-    log_table[0] = LogRow(print_duration(total_duration), log_table[0].headline)
+    log_table = [LogRow(print_duration(outline.durations[0]), title)]
+    for entry, duration in zip(outline.entries[1:], outline.durations[1:]):
+        entry_title = entry.title
+        headline = indent * (entry_title.level - 1) + entry_title.content
+        log_table.append(LogRow(print_duration(duration), headline))
 
     return log_table
 
@@ -369,6 +459,108 @@ def print_log_table(log_table: LogTable) -> "list[str]":
     return output
 
 
+LogItem = typing.NamedTuple(
+    "LogItem",
+    [
+        ("clock", Clock),
+        ("filename", str),
+        ("line_number", int),
+        ("title", str),
+    ],
+)
+
+
+def iter_log_items(
+    *, filename: str, source: "typing.BinaryIO | typing.TextIO"
+) -> Generator[LogItem, None, None]:
+    markdown_parser = create_markdown_parser()
+    try:
+        next(markdown_parser)
+    except StopIteration:
+        return
+    title = ""
+    for line_number, line in enumerate(read_lines(source=source), start=1):
+        token = markdown_parser.send(line)
+        if isinstance(token, Title):
+            title = token.content
+        elif token is not None:
+            yield LogItem(
+                clock=token, filename=filename, line_number=line_number, title=title
+            )
+
+
+def read_log_items(filename: str) -> Generator[LogItem, None, None]:
+    # Files are only opened once the merge asks for their first clock.
+    if filename == STDIN_FILENAME:
+        yield from iter_log_items(filename=filename, source=sys.stdin)
+        return
+    with open(filename, "rb") as source:
+        yield from iter_log_items(filename=filename, source=source)
+
+
+# Clocks apart that `log` reorders within a file by default.
+# Files are sorted whole with a window of 0,
+# since clocks are grouped by headline and not ordered by time.
+DEFAULT_WINDOW = 0
+
+
+def sort_log_items(
+    log_items: "typing.Iterable[LogItem]", *, window: int
+) -> Generator[LogItem, None, None]:
+    # Sort the whole stream if there is no window.
+    if window <= 0:
+        yield from sorted(log_items, key=lambda log_item: log_item.clock.start)
+        return
+
+    # Otherwise, only clocks at most `window` clocks apart are reordered.
+    # This keeps memory bounded and starts output early
+    # for streams that are mostly in order already.
+    # Counter breaks ties so that log items are never compared.
+    heap = []  # type: list[tuple[datetime.datetime, int, LogItem]]
+    last_start = None  # type: None | datetime.datetime
+    for index, log_item in enumerate(log_items):
+        pushed = (log_item.clock.start, index, log_item)
+        if len(heap) < window:
+            heapq.heappush(heap, pushed)
+            continue
+        start, _, earliest_log_item = heapq.heappushpop(heap, pushed)
+        if last_start is not None and start < last_start:
+            _logger.warning(
+                "Clock out of order beyond window: %s:%d",
+                earliest_log_item.filename,
+                earliest_log_item.line_number,
+            )
+        last_start = start
+        yield earliest_log_item
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def merge_log_items(
+    filenames: "list[str]", *, window: int
+) -> "typing.Iterator[LogItem]":
+    # Only the next clock of each input is compared at a time.
+    return heapq.merge(
+        *(
+            sort_log_items(read_log_items(filename), window=window)
+            for filename in filenames
+        ),
+        key=lambda log_item: log_item.clock.start
+    )
+
+
+def print_log_item(log_item: LogItem) -> str:
+    clock = log_item.clock
+    return "{filename}:{line_number}: {start} -- {end} {duration} {title}".format(
+        duration=print_duration(clock.end - clock.start) or "0.00h",
+        end=clock.end.isoformat(),
+        filename=log_item.filename,
+        line_number=log_item.line_number,
+        start=clock.start.isoformat(),
+        title=log_item.title,
+    )
+
+
 @contextlib.contextmanager
 def suppress_keyboard_interrupt() -> Generator[None, None, None]:
     try:
@@ -380,14 +572,31 @@ def suppress_keyboard_interrupt() -> Generator[None, None, None]:
 
 def parse_arguments(args: "list[str]") -> argparse.Namespace:
     parser = argparse.ArgumentParser()
-    parser.add_argument("command", choices=["report"], default="report")
-    return parser.parse_args(args)
+    parser.add_argument("command", choices=["log", "report"], default="report")
+    parser.add_argument(
+        "filenames",
+        default=[STDIN_FILENAME],
+        help="Markdown files to read. Default: standard input.",
+        metavar="file",
+        nargs="*",
+    )
+    parser.add_argument(
+        "--window",
+        default=DEFAULT_WINDOW,
+        help=(
+            "Clocks apart to reorder in a file in log mode,"
+            " or 0 to read and sort whole files. Default: {}."
+        ).format(DEFAULT_WINDOW),
+        type=int,
+    )
+    # Files may follow options, as in `log --window 0 a.md`.
+    # Python 3.6 lacks `parse_intermixed_args`. Options must go first there.
+    parse_args = getattr(parser, "parse_intermixed_args", parser.parse_args)
+    return parse_args(args)
 
 
-# TODO: Add command for log mode. Ordered by time. Base case for daily view.
 # TODO: Add command for report mode. Ordered by title.
 # TODO: Add command for checking clock gaps.
-# TODO: Add option to prefix by filename:lineno for Vim quickfix jumps.
 
 
 @suppress_keyboard_interrupt()
@@ -397,10 +606,19 @@ def main(argv: "None | list[str]" = None) -> int:
 
     arguments = parse_arguments(argv[1:])
 
-    markdown_lines = read_markdown_lines()
+    if arguments.command == "log":
+        for log_item in merge_log_items(arguments.filenames, window=arguments.window):
+            print(print_log_item(log_item))
+        return 0
 
     if arguments.command == "report":
-        log_table = to_log_table(markdown_lines)
+        # Each file has its own outline, so that clocks before its first title
+        # are not added to the last title of the previous file.
+        filenames = arguments.filenames
+        log_table = []  # type: LogTable
+        for filename in filenames:
+            title = filename if len(filenames) > 1 else "Title"
+            log_table.extend(to_log_table(read_markdown_lines(filename), title=title))
         for row in print_log_table(log_table):
             print(row)
 
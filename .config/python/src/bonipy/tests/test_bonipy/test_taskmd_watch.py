@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+# Standard libraries.
+import asyncio
+import datetime
+import pathlib
+
+# External dependencies.
+import pytest
+import watchdog.events
+
+# Internal modules.
+from bonipy35.taskmd import data
+
+from bonipy import taskmd_watch
+from bonipy.taskmd_watch import Totals, Watcher, get_file_totals
+
+NOW = datetime.datetime(
+    2004, 1, 7, 12, tzinfo=datetime.timezone.utc
+)  # Wednesday.
+
+LINES = [
+    "# Work :work:",
+    "## CLOCK: (2004-01-07T00:00:00+00:00)--(2004-01-07T02:00:00+00:00)",
+    "## CLOCK: (2004-01-05T00:00:00+00:00)--(2004-01-05T01:00:00+00:00)",
+    "# Last week :work:",
+    "## CLOCK: (2004-01-02T00:00:00+00:00)--(2004-01-02T01:00:00+00:00)",
+]
+
+
+def test_get_file_totals(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "a.md"
+    path.write_text("\n".join(LINES) + "\n", encoding="utf-8")
+    totals = get_file_totals(path, now=NOW)
+    assert totals.to_dict() == {
+        "tag_seconds": {"work": 3 * 3600},
+        "today_seconds": 2 * 3600,
+        "week_seconds": 3 * 3600,
+    }
+
+
+def test_totals_add_and_remove() -> None:
+    totals = Totals()
+    other = Totals()
+    other.today_seconds = 1
+    other.week_seconds = 2
+    other.tag_seconds = {"work": 2}
+    totals.add(other)
+    totals.add(other, sign=-1)
+    assert totals.to_dict() == Totals().to_dict()
+
+
+def test_refresh_removed_file(tmp_path: pathlib.Path) -> None:
+    async def run() -> Totals:
+        path = tmp_path / "a.md"
+        path.write_text("\n".join(LINES) + "\n", encoding="utf-8")
+        watcher = Watcher(directory=tmp_path)
+        await watcher.rescan()
+        path.unlink()
+        await watcher.refresh(path)
+        return watcher.totals
+
+    assert asyncio.run(run()).to_dict() == Totals().to_dict()
+
+
+def test_refresh_during_rescan(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    monkeypatch.setattr(data, "get_now", lambda: NOW)
+    paths = [tmp_path / name for name in ("a.md", "b.md", "c.md")]
+    for path in paths:
+        path.write_text("\n".join(LINES) + "\n", encoding="utf-8")
+
+    async def run() -> Totals:
+        watcher = Watcher(directory=tmp_path)
+        # The scan has not read the file yet when the refresh starts.
+        await asyncio.gather(watcher.rescan(), watcher.refresh(paths[-1]))
+        return watcher.totals
+
+    assert asyncio.run(run()).week_seconds == 3 * 3 * 3600
+
+
+def test_subscribe_before_publish(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    monkeypatch.setattr(data, "get_now", lambda: NOW)
+    (tmp_path / "a.md").write_text("\n".join(LINES) + "\n", encoding="utf-8")
+
+    async def run() -> Totals:
+        watcher = Watcher(directory=tmp_path)
+        subscription = watcher.pubsub.subscribe()
+        await watcher.rescan()
+        return await anext(subscription)
+
+    assert asyncio.run(run()).week_seconds == 3 * 3600
+
+
+def test_published_totals_not_updated(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    monkeypatch.setattr(data, "get_now", lambda: NOW)
+    path = tmp_path / "a.md"
+    path.write_text("\n".join(LINES) + "\n", encoding="utf-8")
+
+    async def run() -> Totals:
+        watcher = Watcher(directory=tmp_path)
+        subscription = watcher.pubsub.subscribe()
+        await watcher.rescan()
+        published = await anext(subscription)
+        path.unlink()
+        await watcher.refresh(path)
+        assert (await anext(subscription)).week_seconds == 0
+        return published
+
+    assert asyncio.run(run()).week_seconds == 3 * 3600
+
+
+def test_burst_of_events_refreshes_once(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    monkeypatch.setattr(data, "get_now", lambda: NOW)
+    path = tmp_path / "a.md"
+    path.write_text("\n".join(LINES) + "\n", encoding="utf-8")
+    parsed_paths: list[pathlib.Path] = []
+
+    def get_counted_file_totals(
+        path: pathlib.Path, *, now: datetime.datetime
+    ) -> Totals:
+        parsed_paths.append(path)
+        return get_file_totals(path, now=now)
+
+    monkeypatch.setattr(
+        taskmd_watch, "get_file_totals", get_counted_file_totals
+    )
+    events = [
+        watchdog.events.FileCreatedEvent(str(path)),
+        watchdog.events.FileModifiedEvent(str(path)),
+        watchdog.events.FileModifiedEvent(str(path)),
+        # Ignored.
+        watchdog.events.DirModifiedEvent(str(tmp_path)),
+        watchdog.events.FileModifiedEvent(str(tmp_path / "a.txt")),
+    ]
+
+    async def run() -> Totals:
+        watcher = Watcher(debounce=0.01, directory=tmp_path)
+        subscription = watcher.pubsub.subscribe()
+        for event in events:
+            watcher.on_event(event)
+        totals = await anext(subscription)
+        # No refresh follows for the earlier events.
+        await asyncio.sleep(0.05)
+        return totals
+
+    assert asyncio.run(run()).week_seconds == 3 * 3600
+    assert parsed_paths == [path]
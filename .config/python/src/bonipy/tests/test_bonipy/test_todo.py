@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+
+# Need Python 3.6. Supporting Python 3.5.
+# pylint: disable=consider-using-f-string
+
+# Standard libraries.
+import datetime
+import io
+import pathlib
+
+# External dependencies.
+import pytest
+
+# Internal modules.
+from bonipy.todo import (
+    Clock,
+    LogItem,
+    Title,
+    Token,
+    create_outline_parser,
+    finish_outline_parser,
+    main,
+    merge_log_items,
+    read_lines,
+    sort_log_items,
+    split_chunks,
+    to_log_table,
+)
+
+UTC = datetime.timezone.utc
+
+
+def to_log_item(hour: int, *, filename: str = "a.md") -> LogItem:
+    start = datetime.datetime(2004, 1, 1, hour, tzinfo=UTC)
+    return LogItem(
+        clock=Clock(start, start + datetime.timedelta(hours=1)),
+        filename=filename,
+        line_number=hour,
+        title="",
+    )
+
+
+def to_title(level: int, content: str) -> Title:
+    return Title(level=level, state="", priority="", content=content, tags=[])
+
+
+def to_clock(hours: int) -> Clock:
+    start = datetime.datetime(2004, 1, 1, tzinfo=UTC)
+    return Clock(start, start + datetime.timedelta(hours=hours))
+
+
+# Each title has clocks of a different power of two hours,
+# so every sum of them is unique.
+OUTLINE_TOKENS = [
+    to_clock(1),
+    to_title(1, "A"),
+    to_clock(2),
+    to_title(2, "A.1"),
+    to_clock(4),
+    to_title(4, "A.1.1"),
+    to_clock(8),
+    to_title(2, "A.2"),
+    to_clock(16),
+    to_title(1, "B"),
+    to_clock(32),
+    to_clock(64),
+]  # type: list[Token]
+
+
+def write_log(path: pathlib.Path, *, hours: "list[int]") -> pathlib.Path:
+    lines = ["# " + path.stem, "```org.logbook"]
+    for hour in hours:
+        lines.append(
+            "CLOCK: [2004-01-01T{start:02d}:00:00+0000]"
+            "--[2004-01-01T{start:02d}:30:00+0000]".format(start=hour)
+        )
+    lines.append("```")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def get_line_numbers(output: str) -> "list[int]":
+    return [int(line.split(":")[1]) for line in output.splitlines()]
+
+
+class TestSplitChunks:
+    def test_crlf(self) -> None:
+        assert list(split_chunks([b"a\r\nb\r", b"\nc\n"])) == ["a", "b", "c"]
+
+    def test_missing_final_newline(self) -> None:
+        assert list(split_chunks([b"a\nb"])) == ["a", "b"]
+        assert list(split_chunks([b"a\r\nb\r"])) == ["a", "b"]
+
+    def test_line_longer_than_chunk(self) -> None:
+        line = b"x" * 10
+        chunks = [line[index : index + 3] for index in range(0, 10, 3)]
+        assert list(split_chunks(chunks + [b"\ny\n"])) == ["x" * 10, "y"]
+
+    def test_character_across_chunks(self) -> None:
+        data = "é\nü".encode("utf-8")
+        chunks = [data[:1], data[1:4], data[4:]]
+        assert list(split_chunks(chunks)) == ["é", "ü"]
+
+    def test_empty_lines(self) -> None:
+        assert list(split_chunks([b"\n\na\n"])) == ["", "", "a"]
+        assert not list(split_chunks([]))
+
+
+class TestReadLines:
+    def test_file_by_chunks(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "a.md"
+        path.write_bytes("# é\r\n## ü\nlast".encode("utf-8"))
+        with path.open("rb") as source:
+            assert list(read_lines(buffer_size=2, source=source)) == [
+                "# é",
+                "## ü",
+                "last",
+            ]
+
+    def test_wrapper_encoding(self) -> None:
+        data = "# é\n## ü\n".encode("utf-16")
+        source = io.TextIOWrapper(io.BytesIO(data), encoding="utf-16")
+        assert list(read_lines(buffer_size=3, source=source)) == [
+            "# é",
+            "## ü",
+        ]
+
+    def test_decoded_source(self) -> None:
+        source = io.StringIO("a\r\nb\nc")
+        assert list(read_lines(source=source)) == ["a", "b", "c"]
+
+
+class TestSortLogItems:
+    def test_by_start(self) -> None:
+        log_items = [to_log_item(hour) for hour in (3, 1, 2)]
+        assert [
+            log_item.line_number
+            for log_item in sort_log_items(log_items, window=0)
+        ] == [1, 2, 3]
+
+    def test_within_window(self) -> None:
+        log_items = [to_log_item(hour) for hour in (2, 1, 4, 3, 5)]
+        assert [
+            log_item.line_number
+            for log_item in sort_log_items(log_items, window=2)
+        ] == [1, 2, 3, 4, 5]
+
+    def test_beyond_window(self, caplog: pytest.LogCaptureFixture) -> None:
+        # The first clock is written before the one two clocks later is read.
+        log_items = [to_log_item(hour) for hour in (2, 3, 1)]
+        assert [
+            log_item.line_number
+            for log_item in sort_log_items(log_items, window=1)
+        ] == [2, 1, 3]
+        assert "out of order" in caplog.text
+
+    def test_stable_for_equal_starts(self) -> None:
+        log_items = [
+            to_log_item(1, filename=filename) for filename in ("b", "a", "c")
+        ]
+        assert [
+            log_item.filename
+            for log_item in sort_log_items(log_items, window=2)
+        ] == ["b", "a", "c"]
+
+
+class TestMergeLogItems:
+    def test_files(self, tmp_path: pathlib.Path) -> None:
+        first = write_log(tmp_path / "a.md", hours=[1, 4, 3])
+        second = write_log(tmp_path / "b.md", hours=[2, 5])
+        assert [
+            (pathlib.Path(log_item.filename).name, log_item.line_number)
+            for log_item in merge_log_items(
+                [str(first), str(second)], window=0
+            )
+        ] == [("a.md", 3), ("b.md", 3), ("a.md", 5), ("a.md", 4), ("b.md", 4)]
+
+    def test_main(
+        self, capsys: pytest.CaptureFixture[str], tmp_path: pathlib.Path
+    ) -> None:
+        first = write_log(tmp_path / "a.md", hours=[2])
+        second = write_log(tmp_path / "b.md", hours=[1])
+        assert main(["todo", "log", str(first), str(second)]) == 0
+        assert capsys.readouterr().out.splitlines() == [
+            "{path}:3: 2004-01-01T01:00:00+00:00 -- 2004-01-01T01:30:00+00:00"
+            " 0.50h b".format(path=second),
+            "{path}:3: 2004-01-01T02:00:00+00:00 -- 2004-01-01T02:30:00+00:00"
+            " 0.50h a".format(path=first),
+        ]
+
+    def test_main_window(
+        self,
+        caplog: pytest.LogCaptureFixture,
+        capsys: pytest.CaptureFixture[str],
+        tmp_path: pathlib.Path,
+    ) -> None:
+        path = write_log(tmp_path / "a.md", hours=[2, 3, 1])
+        assert main(["todo", "--window", "1", "log", str(path)]) == 0
+        assert "out of order" in caplog.text
+        assert get_line_numbers(capsys.readouterr().out) == [3, 5, 4]
+        # Whole files are sorted with no window.
+        assert main(["todo", "--window", "0", "log", str(path)]) == 0
+        assert get_line_numbers(capsys.readouterr().out) == [5, 3, 4]
+
+    def test_main_sorts_whole_files_by_default(
+        self, capsys: pytest.CaptureFixture[str], tmp_path: pathlib.Path
+    ) -> None:
+        path = write_log(tmp_path / "a.md", hours=[2, 3, 1])
+        assert main(["todo", "log", str(path)]) == 0
+        assert get_line_numbers(capsys.readouterr().out) == [5, 3, 4]
+
+    def test_main_options_before_files(
+        self, capsys: pytest.CaptureFixture[str], tmp_path: pathlib.Path
+    ) -> None:
+        path = write_log(tmp_path / "a.md", hours=[2, 1])
+        assert main(["todo", "log", "--window", "0", str(path)]) == 0
+        assert get_line_numbers(capsys.readouterr().out) == [4, 3]
+
+
+class TestOutlineParser:
+    def test_rolled_up_durations(self) -> None:
+        outline_parser = create_outline_parser()
+        next(outline_parser)
+        for token in OUTLINE_TOKENS:
+            outline_parser.send(token)
+        outline = finish_outline_parser(outline_parser)
+
+        assert [entry.title.content for entry in outline.entries] == [
+            "",
+            "A",
+            "A.1",
+            "A.1.1",
+            "A.2",
+            "B",
+        ]
+        assert [
+            duration // datetime.timedelta(hours=1)
+            for duration in outline.durations
+        ] == [127, 30, 12, 8, 16, 96]
+
+    def test_children(self) -> None:
+        outline_parser = create_outline_parser()
+        next(outline_parser)
+        for token in OUTLINE_TOKENS:
+            outline_parser.send(token)
+        document = finish_outline_parser(outline_parser).entries[0]
+
+        assert len(document.clocks) == 1
+        assert [child.title.content for child in document.children] == [
+            "A",
+            "B",
+        ]
+        first = document.children[0]
+        assert [child.title.content for child in first.children] == [
+            "A.1",
+            "A.2",
+        ]
+        # A skipped level still nests under the closest shallower title.
+        assert [
+            child.title.content for child in first.children[0].children
+        ] == ["A.1.1"]
+
+    def test_empty(self) -> None:
+        outline_parser = create_outline_parser()
+        next(outline_parser)
+        outline = finish_outline_parser(outline_parser)
+        assert len(outline.entries) == 1
+        assert outline.durations == [datetime.timedelta()]
+
+    def test_log_table(self) -> None:
+        assert [
+            (log_row.duration, log_row.headline)
+            for log_row in to_log_table(OUTLINE_TOKENS)
+        ] == [
+            ("127.00h", "Title"),
+            ("30.00h", "A"),
+            ("12.00h", "  A.1"),
+            ("8.00h", "      A.1.1"),
+            ("16.00h", "  A.2"),
+            ("96.00h", "B"),
+        ]
+
+
+class TestMainReport:
+    def test_files_have_own_outlines(
+        self, capsys: pytest.CaptureFixture[str], tmp_path: pathlib.Path
+    ) -> None:
+        first = write_log(tmp_path / "a.md", hours=[1])
+        # Clocks before the first title belong to the second document.
+        second = tmp_path / "b.md"
+        second.write_text(
+            "```org.logbook\n"
+            "CLOCK: [2004-01-01T02:00:00+0000]--[2004-01-01T04:00:00+0000]\n"
+            "```\n",
+            encoding="utf-8",
+        )
+        assert main(["todo", "report", str(first), str(second)]) == 0
+        assert [
+            [cell.strip() for cell in row.split("|")[1:3]]
+            for row in capsys.readouterr().out.splitlines()[2:]
+        ] == [["0.50h", str(first)], ["0.50h", "a"], ["2.00h", str(second)]]
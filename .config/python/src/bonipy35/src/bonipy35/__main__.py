@@ -52,7 +52,14 @@ def main(argv: "None | list[str]" = None) -> int:
     logging_ext.add_verbose_flag(parser)
     parser.add_argument(
         "command",
-        choices=("curses_ext", "floaty", "log_viewer", "logging_ext", "notify"),
+        choices=(
+            "curses_ext",
+            "floaty",
+            "log_viewer",
+            "logging_ext",
+            "notify",
+            "taskmd",
+        ),
     )
     arguments, remaining_arguments = parser.parse_known_args(argv[1:])
 
@@ -50,7 +50,7 @@ def main(argv: "None | list[str]" = None) -> int:
 
     parser = argparse.ArgumentParser(description="Entry point for subcommands.")
     logging_ext.add_verbose_flag(parser)
-    parser.add_argument("command", choices=("cli", "daemon"))
+    parser.add_argument("command", choices=("cli", "daemon", "history"))
     arguments, remaining_arguments = parser.parse_known_args(argv[1:])
 
     logging_ext.set_logger_verbosity(logger=_logger, verbosity=arguments.verbosity)
@@ -8,18 +8,24 @@
 
 # Standard libraries.
 import argparse
+import collections
+import contextlib
+import copy
 import enum
 import datetime
+import functools
+import json
 import logging
-import queue
+import os
 import sys
 import threading
+import time
 import tkinter
 import types
 import typing
 
 # TODO(Python 3.9): Use builtin.
-from typing import Dict, List, Tuple, Type
+from typing import List, Tuple, Type
 
 # TODO(Python 3.10): Use | instead of Union.
 from typing import Union
@@ -32,11 +38,23 @@ import gi.repository.GLib  # type: ignore[import-not-found]  # pylint: disable=i
 
 # Internal modules.
 from .. import logging_ext
+from . import history
+from .layout import (
+    DEFAULT_COALESCE_SECONDS,
+    DEFAULT_MAX_VISIBLE,
+    Coalescer,
+    Notification,
+    NotificationGroup,
+    SlotLayout,
+)
 
 _logger = logging.getLogger(__name__)
 
 _T = typing.TypeVar("_T")
 
+# Withdrawn windows kept built for reuse.
+DEFAULT_POOL_SIZE = 8
+
 
 class TkinterEvent:
     class Pattern:
@@ -54,55 +72,123 @@ class TkinterEvent:
         TAIL: typing.Literal["tail"] = "tail"
 
 
+class QueueStats:
+    # Batches handled, their sizes,
+    # and seconds from the first put of a batch until it was handled.
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.batch_count = 0
+        self.item_count = 0
+        self.max_depth = 0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    def add(self, *, depth: int, latency: float) -> None:
+        self.batch_count += 1
+        self.item_count += depth
+        self.max_depth = max(self.max_depth, depth)
+        self.max_latency = max(self.max_latency, latency)
+        self.total_latency += latency
+
+    def log(self) -> None:
+        _logger.info(
+            "Queue: %d items in %d batches, max depth %d,"
+            " mean latency %.3f ms, max latency %.3f ms",
+            self.item_count,
+            self.batch_count,
+            self.max_depth,
+            self.total_latency / max(1, self.batch_count) * 1000,
+            self.max_latency * 1000,
+        )
+
+
 class TkQueue(typing.Generic[_T]):
-    # Notify Tkinter parent with QUEUE when the queue is no longer empty.
-    # Uses `event_generate` for Tkinter communication.
-    # Likely sufficiently thread-safe.
+    # Hand items from any thread to the Tkinter main loop.
+    #
+    # Writers only append to a list and write a byte to a pipe.
+    # The read end is watched by Tk with `createfilehandler`,
+    # so no Tk function is called outside of the main loop thread.
+    # The callback gets every item pending at wake up as one batch.
 
     def __init__(
         self,
         parent: tkinter.Misc,
         *args: typing.Any,
+        callback: typing.Callable[[List[_T]], None],
         **kwargs: typing.Any,
     ) -> None:
         super().__init__(*args, **kwargs)
+        self.stats = QueueStats()
+        self._callback = callback
+        self._lock = threading.Lock()
         self._parent = parent
-        self._pending = queue.Queue()  # type: queue.Queue[_T]
-        # Stop sending events.
-        # Sending events would error if parent no longer exists.
+        self._pending = []  # type: list[_T]
+        # Whether a wake up byte is in the pipe. Guarded by the lock.
+        self._is_woken = False
+        self._woken_at = 0.0
+        # Stop accepting items.
+        # Callbacks would error if parent no longer exists.
         self._is_stopped = False
 
-    def get(self) -> Union[None, _T]:
-        _pending = self._pending
-        try:
-            buffer = _pending.get_nowait()
-        except queue.Empty:
-            return None
-        _pending.task_done()
-        return buffer
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        os.set_blocking(self._write_fd, False)
+        parent.tk.createfilehandler(self._read_fd, tkinter.READABLE, self._on_readable)
 
     def put(self, buffer: _T) -> None:
-        if self._is_stopped:
-            return
-
-        _pending = self._pending
-        _pending.put_nowait(buffer)
-        # Notify reader of new items.
-        #
-        # To reduce the number of notifications sent,
-        # only send if the queue likely did not have any beforehand.
-        # Since this object is the only writer into the queue,
-        # if the count was greater than one,
-        # it is safe to assume the queue was not empty,
-        # and the queue is still be processed.
-        is_generating_event = _pending.qsize() <= 1
-        if is_generating_event:
-            self._parent.event_generate(
-                TkinterEvent.Pattern.ON_QUEUE, when=TkinterEvent.When.TAIL
-            )
+        with self._lock:
+            if self._is_stopped:
+                return
+            self._pending.append(buffer)
+            if self._is_woken:
+                return
+            self._is_woken = True
+            self._woken_at = time.perf_counter()
+            # Written with the lock held, so that `stop` cannot close it
+            # in between. The pipe is non-blocking, so this never waits.
+            try:
+                os.write(self._write_fd, b"\0")
+            except BlockingIOError:
+                # The pipe is full, so the reader is woken anyway.
+                pass
 
     def stop(self) -> None:
-        self._is_stopped = True
+        with self._lock:
+            if self._is_stopped:
+                return
+            self._is_stopped = True
+            # Writers check `_is_stopped` first, so none can reach it after.
+            os.close(self._write_fd)
+        self._parent.tk.deletefilehandler(self._read_fd)
+        os.close(self._read_fd)
+        self.stats.log()
+
+    def _on_readable(self, fd: int, mask: int) -> None:
+        del fd, mask
+        try:
+            while os.read(self._read_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        # Items put after this wake the reader again.
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+            self._is_woken = False
+            woken_at = self._woken_at
+        if not pending:
+            return
+
+        self._callback(pending)
+        latency = time.perf_counter() - woken_at
+        self.stats.add(depth=len(pending), latency=latency)
+        _logger.log(
+            logging_ext.TRACE,
+            "Handled %d events in %.3f ms.",
+            len(pending),
+            latency * 1000,
+        )
 
 
 class Reason(enum.Enum):
@@ -113,33 +199,6 @@ class Reason(enum.Enum):
     UNDEFINED = 4
 
 
-class Notification:
-    def __init__(  # pylint: disable=too-many-arguments
-        self,
-        *args: typing.Any,
-        actions: List[typing.Any],
-        app_icon: str,
-        app_name: str,
-        body: str,
-        created_at: datetime.datetime,
-        expire_timeout: int,
-        hints: Dict[str, typing.Any],
-        id: int,  # pylint: disable=redefined-builtin
-        summary: str,
-        **kwargs: typing.Any
-    ) -> None:
-        super().__init__(*args, **kwargs)
-        self.actions = actions
-        self.app_icon = app_icon
-        self.app_name = app_name
-        self.body = body
-        self.created_at = created_at
-        self.expire_timeout = expire_timeout
-        self.hints = hints
-        self.id = id
-        self.summary = summary
-
-
 class CloseNotificationEvent:
     def __init__(
         self, *args: typing.Any, notification_id: int, **kwargs: typing.Any
@@ -180,6 +239,7 @@ class Dispatcher:
         self._last_id = 0
         self._notifications = {}  # type: dict[int, Notification]
 
+        self.history_writer = None  # type: Union[None, history.HistoryWriter]
         self.do_close_notification = None  # type: None | typing.Callable[[int], None]
         self.do_notify = None  # type: None | typing.Callable[[Notification], None]
         self.on_notification_closed = (
@@ -210,6 +270,17 @@ class Dispatcher:
             notification.id = notification_id
         _logger.log(logging_ext.TRACE, "Received notification %s", notification.id)
         self._notifications[notification_id] = notification
+        history_writer = self.history_writer
+        if history_writer is not None:
+            history_writer.record(
+                {
+                    "app_name": notification.app_name,
+                    "body": notification.body,
+                    "created_at": notification.created_at.timestamp(),
+                    "id": notification_id,
+                    "summary": notification.summary,
+                }
+            )
         do_notify = self.do_notify
         if do_notify is not None:
             do_notify(notification)
@@ -324,20 +395,43 @@ class Service(dbus.service.Object):  # type: ignore[misc]
     def on_notification_closed(self, notification_id: int, reason: int) -> None:
         self.NotificationClosed(dbus.UInt32(notification_id), dbus.UInt32(reason))
 
+    @dbus.service.method(history.DBUS_INTERFACE, in_signature="sdd", out_signature="bas")  # type: ignore[misc]
+    def QueryRecentHistory(  # pylint: disable=invalid-name
+        self, app_name: dbus.String, since: dbus.Double, until: dbus.Double
+    ) -> Tuple[bool, List[str]]:
+        # An empty app name matches any app, and an until of 0 has no end.
+        # Answered from memory only, so the D-Bus thread never reads the disk.
+        history_writer = self._dispatcher.history_writer
+        if history_writer is None:
+            return False, []
+        records = history_writer.query_recent(
+            app_name=str(app_name) or None,
+            since=float(since),
+            until=float(until) or None,
+        )
+        if records is None:
+            return False, []
+        return True, [json.dumps(record, sort_keys=True) for record in records]
+
 
 class Window(tkinter.Toplevel):
-    def __init__(  # pylint: disable=too-many-locals
+    # Widgets are built once, withdrawn.
+    # Content is set in place with `set_content` before each `show`,
+    # so the window can be reused for later notifications.
+
+    def __init__(
         self,
         parent: tkinter.Misc,
         *args: typing.Any,
-        notification: Notification,
         notification_event_queue: TkQueue[NotificationEvent],
         **kwargs: typing.Any
     ) -> None:
         super().__init__(parent, *args, **kwargs)
-        _logger.log(logging_ext.TRACE, "Creating window %s", notification.id)
-        self._notification = notification
+        _logger.log(logging_ext.TRACE, "Creating window.")
+        self._expire_timer = None  # type: Union[None, str]
+        self._notification = None  # type: Union[None, Notification]
         self._notification_event_queue = notification_event_queue
+        self.is_shown = False
 
         font_name = "sans-serif"
         bg = "#222222"
@@ -345,6 +439,7 @@ class Window(tkinter.Toplevel):
         focused_fg = "#ffffff"
         unfocused_fg = "#888888"
 
+        self.withdraw()
         self.overrideredirect(True)
         self.attributes("-topmost", True)
 
@@ -354,11 +449,10 @@ class Window(tkinter.Toplevel):
         header = tkinter.Frame(main_frame, bg=bg)
         header.pack(fill="x", padx=10, pady=5)
 
-        app_name = self._notification.app_name or "Notification"
-        app_label = tkinter.Label(
-            header, text=app_name, fg=unfocused_fg, bg=bg, font=(font_name, 9)
+        self._app_label = tkinter.Label(
+            header, fg=unfocused_fg, bg=bg, font=(font_name, 9)
         )
-        app_label.pack(side="left")
+        self._app_label.pack(side="left")
 
         close_btn = tkinter.Label(
             header, text="×", fg=unfocused_fg, bg=bg, font=(font_name, 14)
@@ -366,149 +460,340 @@ class Window(tkinter.Toplevel):
         close_btn.pack(side="right")
         close_btn.bind(TkinterEvent.Pattern.BUTTON_1, self._dismiss)
 
-        summary = self._notification.summary
-        if summary:
-            sum_label = tkinter.Label(
-                main_frame,
-                text=summary,
-                fg=focused_fg,
-                bg=bg,
-                font=(font_name, 11, "bold"),
-                anchor="w",
-                wraplength=280,
-            )
-            sum_label.pack(fill="x", padx=10)
-
-        body = self._notification.body
-        if body:
-            body_label = tkinter.Label(
-                main_frame,
-                text=body,
-                fg=fg,
-                bg=bg,
-                font=(font_name, 10),
-                anchor="w",
-                wraplength=280,
-                justify="left",
-            )
-            body_label.pack(fill="x", padx=10, pady=(2, 5))
+        # Packed only if there is text to show.
+        self._summary_label = tkinter.Label(
+            main_frame,
+            fg=focused_fg,
+            bg=bg,
+            font=(font_name, 11, "bold"),
+            anchor="w",
+            wraplength=280,
+        )
+        self._body_label = tkinter.Label(
+            main_frame,
+            fg=fg,
+            bg=bg,
+            font=(font_name, 10),
+            anchor="w",
+            wraplength=280,
+            justify="left",
+        )
 
         is_dismiss_on_click = True
         if is_dismiss_on_click:
             self.bind(TkinterEvent.Pattern.BUTTON_1, self._dismiss)
 
+    def destroy(self) -> None:
+        # The timer would call a deleted command after destruction.
+        self._cancel_expire_timer()
+        super().destroy()
+
+    def hide(self) -> None:
+        self._cancel_expire_timer()
+        self._notification = None
+        self.is_shown = False
+        self.withdraw()
+
+    def set_content(self, *, count: int = 1, notification: Notification) -> None:
+        """Show the notification, and expire it from now."""
+
+        _logger.log(logging_ext.TRACE, "Setting window to %s", notification.id)
+        self._notification = notification
+
+        app_name = notification.app_name or "Notification"
+        if count > 1:
+            app_name = "{app_name} ({count})".format(app_name=app_name, count=count)
+        self._app_label.configure(text=app_name)
+
+        # Repack to keep the order of labels.
+        summary_label = self._summary_label
+        body_label = self._body_label
+        summary_label.pack_forget()
+        body_label.pack_forget()
+        summary = notification.summary
+        if summary:
+            summary_label.configure(text=summary)
+            summary_label.pack(fill="x", padx=10)
+        body = notification.body
+        if body:
+            body_label.configure(text=body)
+            body_label.pack(fill="x", padx=10, pady=(2, 5))
+
         self.update_idletasks()
 
+        self._cancel_expire_timer()
         expire_timeout = notification.expire_timeout
         if expire_timeout == -1:
             expire_timeout = 5000
         expire_timeout = max(0, expire_timeout)
-        self.after(expire_timeout, self._expire)
+        self._expire_timer = self.after(expire_timeout, self._expire)
 
-    def _expire(self) -> None:
+    def show(self) -> None:
+        self.is_shown = True
+        self.deiconify()
+
+    def _cancel_expire_timer(self) -> None:
+        expire_timer = self._expire_timer
+        if expire_timer is not None:
+            self._expire_timer = None
+            self.after_cancel(expire_timer)
+
+    def _close(self, reason: Reason) -> None:
+        notification = self._notification
+        # Clicks on the close button also reach the window.
+        if notification is None:
+            return
         self._notification_event_queue.put(
-            NotificationClosedEvent(id_=self._notification.id, state=Reason.EXPIRED)
+            NotificationClosedEvent(id_=notification.id, state=reason)
         )
-        self.destroy()
+        self.hide()
+
+    def _expire(self) -> None:
+        self._expire_timer = None
+        self._close(Reason.EXPIRED)
 
     def _dismiss(self, event: tkinter.Event) -> None:
         del event
-        self._notification_event_queue.put(
-            NotificationClosedEvent(id_=self._notification.id, state=Reason.DISMISSED)
+        self._close(Reason.DISMISSED)
+
+
+class OverflowWindow(tkinter.Toplevel):
+    # Count of notifications waiting for a free slot, shown above the stack.
+
+    def __init__(
+        self, parent: tkinter.Misc, *args: typing.Any, **kwargs: typing.Any
+    ) -> None:
+        super().__init__(parent, *args, **kwargs)
+        self.withdraw()
+        self.overrideredirect(True)
+        self.attributes("-topmost", True)
+        self._label = tkinter.Label(
+            self, bg="#222222", fg="#888888", font=("sans-serif", 9)
         )
-        self.destroy()
+        self._label.pack(fill="both", expand=True, padx=10, pady=2)
+
+    def show(self, *, count: int, x: int, y: int) -> None:
+        """Show with its bottom edge at `y`."""
+
+        self._label.configure(text="+{count} more".format(count=count))
+        self.update_idletasks()
+        height = self.winfo_reqheight()
+        self.geometry(
+            "{width}x{height}+{x}+{y}".format(
+                width=Application.WINDOW_WIDTH, height=height, x=x, y=y - height
+            )
+        )
+        self.deiconify()
 
 
 class Application(tkinter.Tk):
+    # Distance of windows from the edges of the screen, and between windows.
+    PADDING = 32
+
+    WINDOW_WIDTH = 300
+
     def __init__(
-        self, *args: typing.Any, dispatcher: Dispatcher, **kwargs: typing.Any
+        self,
+        *args: typing.Any,
+        coalesce_seconds: float = DEFAULT_COALESCE_SECONDS,
+        dispatcher: Dispatcher,
+        max_visible: int = DEFAULT_MAX_VISIBLE,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        **kwargs: typing.Any
     ) -> None:
         super().__init__(*args, **kwargs)
+        self._coalescer = Coalescer(coalesce_seconds=coalesce_seconds)
         self._dispatcher = dispatcher
 
+        self._event_handlers = {
+            CloseNotificationEvent: self._on_close_notification_event,
+            NotificationClosedEvent: self._notification_closed,
+            OpenNotificationEvent: self._on_open_notification_event,
+        }  # type: dict[type, typing.Callable[[typing.Any], None]]
         self._notification_event_queue = TkQueue(
-            parent=self
+            parent=self, callback=self._on_queue
         )  # type: TkQueue[NotificationEvent]
-        self._windows = {}  # type: dict[int, Window]
-        self._last_cleared_window_heights = []  # type: list[int]
 
         self.withdraw()
         self.title(__package__)
-        self.bind(TkinterEvent.Pattern.ON_QUEUE, self._on_queue)
         # self.protocol("WM_DELETE_WINDOW", self.withdraw)
 
+        self._layout = SlotLayout(max_count=max_visible, spacing=self.PADDING)
+        # Last geometry set for the window in each slot.
+        self._slot_geometries = {}  # type: dict[int, str]
+        self._slot_windows = {}  # type: dict[int, Window]
+        # Groups waiting for a free slot, oldest first.
+        self._overflow_groups = (
+            collections.OrderedDict()
+        )  # type: collections.OrderedDict[int, NotificationGroup]
+        self._overflow_window = OverflowWindow(self)
+
+        # Built before notifications arrive, so showing one is only a reconfigure.
+        self._pool_size = pool_size
+        self._window_pool = [
+            self._create_window() for _ in range(pool_size)
+        ]  # type: list[Window]
+
         dispatcher.do_close_notification = self.close_notification_threadsafe
         dispatcher.do_notify = self.open_notification_threadsafe
 
+    def destroy(self) -> None:
+        self._notification_event_queue.stop()
+        super().destroy()
+
     def _close_notification(self, notification_id: int) -> None:
-        window = self._windows.pop(notification_id, None)
-        if window is None:
+        # Only this notification closes. The rest of its group stays shown.
+        if self._coalescer.discard(notification_id) is None:
             return
-        self._notification_event_queue.put(
-            NotificationClosedEvent(id_=notification_id, state=Reason.CLOSED)
-        )
-        window.destroy()
+        self._dispatcher.notification_closed(notification_id, Reason.CLOSED.value)
 
     def _notification_closed(self, event: NotificationClosedEvent) -> None:
-        windows = self._windows
+        coalescer = self._coalescer
 
-        id_ = event.id_
-        windows.pop(id_, None)
-        self._dispatcher.notification_closed(id_, event.state.value)
+        group = coalescer.get_group(event.id_)
+        if group is None:
+            return
+        # The window hid itself.
+        self._hide_group(group)
+        if group.get_latest().id != event.id_:
+            # Newer notifications arrived after the window was shown.
+            # Show them instead of closing them unseen.
+            coalescer.mark_dirty(group)
+            return
 
-        if not windows:
-            self._last_cleared_window_heights.clear()
+        for notification_id in coalescer.remove_group(group):
+            self._dispatcher.notification_closed(notification_id, event.state.value)
 
-    def _on_queue(self, event: tkinter.Event) -> None:
-        del event
-        get = self._notification_event_queue.get
-        while True:
-            notification_event = get()
-            if notification_event is None:
-                break
-            if isinstance(notification_event, OpenNotificationEvent):
-                self._open_notification(notification_event.notification)
-            elif isinstance(notification_event, NotificationClosedEvent):
-                self._notification_closed(notification_event)
-            else:
-                self._close_notification(notification_event.notification_id)
-        _logger.log(logging_ext.TRACE, "No more events.")
+    def _on_close_notification_event(self, event: CloseNotificationEvent) -> None:
+        self._close_notification(event.notification_id)
+
+    def _on_open_notification_event(self, event: OpenNotificationEvent) -> None:
+        self._open_notification(event.notification)
+
+    def _on_queue(self, notification_events: List[NotificationEvent]) -> None:
+        event_handlers = self._event_handlers
+        for notification_event in notification_events:
+            event_handlers[type(notification_event)](notification_event)
+        # Changed groups are drawn once per batch,
+        # however many notifications they received.
+        self._render_groups()
 
     def _open_notification(self, notification: Notification) -> None:
-        notification_id = notification.id
-        # TODO: If the ID is known, content should be changed
-        # instead of reopening, as required by the specification.
-        self._close_notification(notification_id)
-
-        window = Window(
-            self,
-            notification=notification,
-            notification_event_queue=self._notification_event_queue,
+        self._coalescer.add(notification, now=time.monotonic())
+
+    def _acquire_window(self) -> Window:
+        window_pool = self._window_pool
+        if window_pool:
+            return window_pool.pop()
+        return self._create_window()
+
+    def _create_window(self) -> Window:
+        return Window(self, notification_event_queue=self._notification_event_queue)
+
+    def _hide_group(self, group: NotificationGroup) -> None:
+        self._overflow_groups.pop(id(group), None)
+        window = group.window
+        slot = group.slot
+        group.window = None
+        group.slot = None
+        if slot is not None:
+            self._layout.release(slot)
+            del self._slot_geometries[slot]
+            del self._slot_windows[slot]
+        if window is not None:
+            self._release_window(window)
+
+    def _release_window(self, window: Window) -> None:
+        if len(self._window_pool) < self._pool_size:
+            window.hide()
+            self._window_pool.append(window)
+        else:
+            window.destroy()
+
+    def _render_group(self, group: NotificationGroup) -> None:
+        start = time.perf_counter()
+        layout = self._layout
+        window = group.window
+        if window is None:
+            if layout.is_full():
+                self._overflow_groups[id(group)] = group
+                return
+            window = self._acquire_window()
+            group.window = window
+
+        window.set_content(
+            count=len(group.notifications), notification=group.get_latest()
         )
-
         height = window.winfo_reqheight()
-        screen_h = window.winfo_screenheight()
-        padding = 32
-        last_cleared_window_heights = self._last_cleared_window_heights
-        y = (
-            screen_h
-            - (padding * 2 + height)
-            - (
-                sum(last_cleared_window_heights)
-                + (len(last_cleared_window_heights) + 1) * padding
-            )
+        slot = group.slot
+        if slot is None:
+            slot = layout.allocate(height)
+            group.slot = slot
+            self._slot_windows[slot] = window
+        else:
+            layout.resize(slot, height)
+            # The window can hide itself while its group stays on screen,
+            # when the shown notification is closed in the same batch.
+            if not window.is_shown:
+                window.show()
+        _logger.log(
+            logging_ext.TRACE,
+            "Rendered window in %.3f ms.",
+            (time.perf_counter() - start) * 1000,
         )
 
-        width = 300
-        x = padding
+    def _render_groups(self) -> None:
+        for group in self._coalescer.pop_dirty_groups():
+            if group.notifications:
+                self._render_group(group)
+            else:
+                self._hide_group(group)
 
-        geometry = "{width}x{height}+{x}+{y}".format(
-            width=width, height=height, x=x, y=y
-        )
-        window.geometry(geometry)
+        # Fill slots freed by closed windows.
+        overflow_groups = self._overflow_groups
+        layout = self._layout
+        while overflow_groups and not layout.is_full():
+            _, group = overflow_groups.popitem(last=False)
+            self._render_group(group)
 
-        self._windows[notification_id] = window
-        last_cleared_window_heights.append(height)
+        self._apply_layout()
+
+    def _apply_layout(self) -> None:
+        offsets = self._layout.flush()
+        if offsets is None:
+            return
+
+        padding = self.PADDING
+        screen_height = self.winfo_screenheight()
+        slot_geometries = self._slot_geometries
+        slot_windows = self._slot_windows
+        # Only windows that moved or resized are reconfigured.
+        for slot, offset in offsets:
+            window = slot_windows[slot]
+            height = window.winfo_reqheight()
+            geometry = "{width}x{height}+{x}+{y}".format(
+                width=self.WINDOW_WIDTH,
+                height=height,
+                x=padding,
+                y=screen_height - 3 * padding - offset - height,
+            )
+            old_geometry = slot_geometries.get(slot)
+            if geometry == old_geometry:
+                continue
+            slot_geometries[slot] = geometry
+            window.geometry(geometry)
+            if old_geometry is None:
+                window.show()
+
+        overflow_count = len(self._overflow_groups)
+        if overflow_count:
+            self._overflow_window.show(
+                count=overflow_count,
+                x=padding,
+                y=screen_height - 3 * padding - self._layout.get_total_height(),
+            )
+        else:
+            self._overflow_window.withdraw()
 
     def close_notification_threadsafe(self, notification_id: int) -> None:
         self._notification_event_queue.put(
@@ -521,11 +806,81 @@ class Application(tkinter.Tk):
         )
 
 
-def run() -> int:
-    with DbusThread():
+def measure_latency(*, count: int, pool_size: int) -> int:
+    """Time opening, replacing and closing notifications, without D-Bus."""
+
+    dispatcher = Dispatcher()
+    # Every notification gets its own window.
+    application = Application(
+        coalesce_seconds=0.0, dispatcher=dispatcher, pool_size=pool_size
+    )
+    timings = collections.OrderedDict(
+        (name, []) for name in ("open", "replace", "close")
+    )  # type: collections.OrderedDict[str, list[float]]
+
+    def time_call(name: str, call: typing.Callable[[], None]) -> None:
+        start = time.perf_counter()
+        call()
+        application.update()
+        timings[name].append(time.perf_counter() - start)
+
+    for index in range(count):
+        notification = Notification(
+            actions=[],
+            app_icon="",
+            app_name="measure",
+            body="Body {index}".format(index=index),
+            created_at=datetime.datetime.now(),
+            # Long enough to only close when asked to.
+            expire_timeout=60000,
+            hints={},
+            id=0,
+            summary="Summary {index}".format(index=index),
+        )
+        time_call("open", functools.partial(dispatcher.notify, notification))
+        replacement = copy.copy(notification)
+        replacement.body = "Replaced {index}".format(index=index)
+        time_call("replace", functools.partial(dispatcher.notify, replacement))
+        time_call(
+            "close", functools.partial(dispatcher.close_notification, notification.id)
+        )
+    application.destroy()
+
+    for name, name_timings in timings.items():
+        _logger.info(
+            "%s: mean %.3f ms, max %.3f ms",
+            name,
+            sum(name_timings) / max(1, len(name_timings)) * 1000,
+            max(name_timings, default=0.0) * 1000,
+        )
+    return 0
+
+
+def run(
+    *,
+    coalesce_seconds: float,
+    is_history_enabled: bool,
+    max_visible: int,
+    pool_size: int
+) -> int:
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(DbusThread())
         dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
         dispatcher = Dispatcher()
-        application = Application(dispatcher=dispatcher)
+        if is_history_enabled:
+            dispatcher.history_writer = stack.enter_context(
+                history.HistoryWriter(
+                    store=history.HistoryStore(
+                        directory=history.get_history_directory()
+                    )
+                )
+            )
+        application = Application(
+            coalesce_seconds=coalesce_seconds,
+            dispatcher=dispatcher,
+            max_visible=max_visible,
+            pool_size=pool_size,
+        )
         service = Service(dispatcher=dispatcher)
         # TODO: This blocks until event handling is needed,
         # even when SIGINT is received.
@@ -544,12 +899,53 @@ def main(argv: Union[None, List[str]] = None) -> int:
 
     argument_parser = argparse.ArgumentParser()
     logging_ext.add_verbose_flag(argument_parser)
+    argument_parser.add_argument(
+        "--coalesce",
+        default=DEFAULT_COALESCE_SECONDS,
+        dest="coalesce_seconds",
+        help="Seconds within which notifications with the same summary are grouped.",
+        type=float,
+    )
+    argument_parser.add_argument(
+        "--max-visible",
+        default=DEFAULT_MAX_VISIBLE,
+        help="Windows shown at once. Others are counted until there is room.",
+        type=int,
+    )
+    argument_parser.add_argument(
+        "--measure-latency",
+        help="Time this many notifications without D-Bus, and exit.",
+        metavar="COUNT",
+        type=int,
+    )
+    argument_parser.add_argument(
+        "--no-history",
+        action="store_false",
+        dest="is_history_enabled",
+        help="Do not keep notifications on disk.",
+    )
+    argument_parser.add_argument(
+        "--pool-size",
+        default=DEFAULT_POOL_SIZE,
+        help="Windows kept built for reuse. 0 builds a window per notification.",
+        type=int,
+    )
 
     arguments = argument_parser.parse_args(argv[1:])
     logging_ext.set_logger_verbosity(logger=_logger, verbosity=arguments.verbosity)
 
+    if arguments.measure_latency is not None:
+        return measure_latency(
+            count=arguments.measure_latency, pool_size=arguments.pool_size
+        )
+
     try:
-        return run()
+        return run(
+            coalesce_seconds=arguments.coalesce_seconds,
+            is_history_enabled=arguments.is_history_enabled,
+            max_visible=arguments.max_visible,
+            pool_size=arguments.pool_size,
+        )
     except KeyboardInterrupt:
         return 2
 
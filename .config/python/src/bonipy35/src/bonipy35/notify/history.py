@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+
+# Keep this Python 3.5 compatible for Debian 9 support.
+# pylint: disable=consider-using-f-string
+
+# Persistent history of notifications.
+#
+# History is kept in segments under the XDG state directory.
+# Each segment is a log of JSON lines,
+# and an index of fixed size records of creation time,
+# offset of the line in the log, and a hash of the app name.
+# Queries search the index and only read matching lines from the log.
+# The oldest segments are removed to keep the history within a size limit.
+# Recent records are asked of the daemon first, which keeps them in memory.
+#
+#     python3 -m bonipy35 notify history --app firefox --since 1h
+
+# Standard libraries.
+import argparse
+import collections
+import datetime
+import json
+import logging
+import mmap
+import pathlib
+import queue
+import re
+import struct
+import sys
+import threading
+import time
+import types
+import typing
+import zlib
+
+# TODO(Python 3.9): Use builtin.
+from typing import Dict, Iterator, List, Type
+
+# TODO(Python 3.10): Use | instead of Union.
+from typing import Union
+
+# Internal modules.
+from .. import logging_ext
+from .. import xdg
+
+_logger = logging.getLogger(__name__)
+
+# Bytes in the log of a segment before starting a new one.
+DEFAULT_MAX_SEGMENT_SIZE = 1 << 20
+
+DEFAULT_MAX_SEGMENT_COUNT = 16
+
+# Records kept in memory by the writer.
+DEFAULT_RECENT_COUNT = 256
+
+# Creation time in epoch seconds, offset in the log, and CRC-32 of the app name.
+_INDEX_RECORD = struct.Struct("<dQI")
+
+INDEX_SUFFIX = ".idx"
+LOG_SUFFIX = ".ndjson"
+
+# Keys are "app_name", "body", "created_at" in epoch seconds, "id" and "summary".
+Record = Dict[str, typing.Any]
+
+# Interface of the daemon for querying records kept in memory.
+DBUS_INTERFACE = "com.github.BoniLindsley.notify.History"
+
+
+def get_app_hash(app_name: str) -> int:
+    return zlib.crc32(app_name.encode("utf-8"))
+
+
+def get_history_directory() -> pathlib.Path:
+    return xdg.AppDirectories(app_name="notify").state_home / "history"
+
+
+def _find_first_since(
+    index: mmap.mmap, record_count: int, since: float
+) -> int:
+    """Get the position of the first record created at or after `since`."""
+
+    record_size = _INDEX_RECORD.size
+    unpack_from = _INDEX_RECORD.unpack_from
+    low = 0
+    high = record_count
+    while low < high:
+        middle = (low + high) // 2
+        if unpack_from(index, middle * record_size)[0] < since:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _iter_index(
+    index: mmap.mmap,
+    record_count: int,
+    *,
+    since: Union[None, float],
+    until: Union[None, float]
+) -> Iterator["tuple[int, int]"]:
+    """Get log offsets and app name hashes of records in `[since, until)`."""
+
+    record_size = _INDEX_RECORD.size
+    unpack_from = _INDEX_RECORD.unpack_from
+    start = 0
+    if since is not None:
+        start = _find_first_since(index, record_count, since)
+    for position in range(start, record_count):
+        created_at, offset, app_hash = unpack_from(
+            index, position * record_size
+        )
+        if until is not None and created_at >= until:
+            break
+        yield offset, app_hash
+
+
+class HistoryStore:
+    # Segments are named by the creation time of their first record,
+    # in milliseconds, so they sort by time.
+    # A segment covers records until the start of the next one.
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        directory: pathlib.Path,
+        max_segment_count: int = DEFAULT_MAX_SEGMENT_COUNT,
+        max_segment_size: int = DEFAULT_MAX_SEGMENT_SIZE,
+        **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.directory = directory
+        self.max_segment_count = max_segment_count
+        self.max_segment_size = max_segment_size
+        self._index_file = None  # type: Union[None, typing.BinaryIO]
+        self._log_file = None  # type: Union[None, typing.BinaryIO]
+
+    def append(self, record: Record) -> None:
+        """Append a record. Call `flush` to make it visible to queries."""
+
+        log_file = self._log_file
+        index_file = self._index_file
+        if (
+            log_file is None
+            or index_file is None
+            or log_file.tell() >= self.max_segment_size
+        ):
+            log_file, index_file = self._start_segment(record["created_at"])
+
+        offset = log_file.tell()
+        line = json.dumps(record, sort_keys=True) + "\n"
+        log_file.write(line.encode("utf-8"))
+        index_file.write(
+            _INDEX_RECORD.pack(
+                record["created_at"], offset, get_app_hash(record["app_name"])
+            )
+        )
+
+    def close(self) -> None:
+        self.flush()
+        for segment_file in (self._index_file, self._log_file):
+            if segment_file is not None:
+                segment_file.close()
+        self._index_file = None
+        self._log_file = None
+
+    def flush(self) -> None:
+        # The log is flushed first, so indexed lines always exist.
+        if self._log_file is not None:
+            self._log_file.flush()
+        if self._index_file is not None:
+            self._index_file.flush()
+
+    def get_segment_starts(self) -> List[int]:
+        try:
+            paths = list(self.directory.glob("*" + INDEX_SUFFIX))
+        except FileNotFoundError:
+            return []
+        segment_starts = []  # type: List[int]
+        for path in paths:
+            try:
+                segment_starts.append(int(path.stem))
+            except ValueError:
+                continue
+        segment_starts.sort()
+        return segment_starts
+
+    def query(
+        self,
+        *,
+        app_name: Union[None, str] = None,
+        since: Union[None, float] = None,
+        until: Union[None, float] = None
+    ) -> Iterator[Record]:
+        """
+        Get records created in `[since, until)`, oldest first.
+
+        Segments entirely outside of the range are skipped by name.
+        Within a segment, the index is searched for the range,
+        and only lines with the app name hash are read from the log.
+        """
+
+        segment_starts = self.get_segment_starts()
+        for position, segment_start in enumerate(segment_starts):
+            if position + 1 < len(segment_starts) and since is not None:
+                if segment_starts[position + 1] <= since * 1000:
+                    continue
+            if until is not None and segment_start >= until * 1000:
+                break
+            try:
+                yield from self._query_segment(
+                    segment_start, app_name=app_name, since=since, until=until
+                )
+            except FileNotFoundError:
+                # Removed by the daemon after being listed.
+                continue
+
+    def _get_path(self, segment_start: int, suffix: str) -> pathlib.Path:
+        return self.directory / "{segment_start:015d}{suffix}".format(
+            segment_start=segment_start, suffix=suffix
+        )
+
+    def _query_segment(
+        self,
+        segment_start: int,
+        *,
+        app_name: Union[None, str],
+        since: Union[None, float],
+        until: Union[None, float]
+    ) -> Iterator[Record]:
+        index_path = self._get_path(segment_start, INDEX_SUFFIX)
+        log_path = self._get_path(segment_start, LOG_SUFFIX)
+        app_hash = get_app_hash(app_name) if app_name is not None else None
+
+        with index_path.open("rb") as index_file, log_path.open(
+            "rb"
+        ) as log_file:
+            # A record being written may be incomplete.
+            record_count = index_path.stat().st_size // _INDEX_RECORD.size
+            if not record_count:
+                return
+            with mmap.mmap(
+                index_file.fileno(),
+                record_count * _INDEX_RECORD.size,
+                access=mmap.ACCESS_READ,
+            ) as index:
+                for offset, record_app_hash in _iter_index(
+                    index, record_count, since=since, until=until
+                ):
+                    if app_hash is not None and record_app_hash != app_hash:
+                        continue
+                    log_file.seek(offset)
+                    try:
+                        record = json.loads(
+                            log_file.readline().decode("utf-8")
+                        )
+                    except ValueError:
+                        _logger.warning(
+                            "Skipping broken record in %s", log_path
+                        )
+                        continue
+                    # Hashes of different names may be equal.
+                    if (
+                        app_name is not None
+                        and record.get("app_name") != app_name
+                    ):
+                        continue
+                    yield record
+
+    def _start_segment(
+        self, created_at: float
+    ) -> "tuple[typing.BinaryIO, typing.BinaryIO]":
+        self.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        segment_starts = self.get_segment_starts()
+        segment_start = int(created_at * 1000)
+        if segment_starts:
+            # Keep names in order even if the clock went back.
+            segment_start = max(segment_start, segment_starts[-1] + 1)
+        for old_segment_start in segment_starts[
+            : max(0, len(segment_starts) + 1 - self.max_segment_count)
+        ]:
+            for suffix in (INDEX_SUFFIX, LOG_SUFFIX):
+                try:
+                    self._get_path(old_segment_start, suffix).unlink()
+                except FileNotFoundError:
+                    pass
+
+        # The log is created first, so a listed index always has a log.
+        log_file = self._get_path(segment_start, LOG_SUFFIX).open("ab")
+        index_file = self._get_path(segment_start, INDEX_SUFFIX).open("ab")
+        self._index_file = index_file
+        self._log_file = log_file
+        return log_file, index_file
+
+
+class HistoryWriter(threading.Thread):
+    # Write records to the store in a thread,
+    # so that callers never wait for the disk.
+    # Recent records are also kept in memory,
+    # so that the daemon can answer queries about them without the disk.
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        recent_count: int = DEFAULT_RECENT_COUNT,
+        store: HistoryStore,
+        **kwargs: typing.Any
+    ) -> None:
+        kwargs.setdefault("daemon", True)
+        super().__init__(*args, **kwargs)
+        # Oldest first. Guarded by the lock.
+        self.recent = collections.deque(
+            maxlen=recent_count
+        )  # type: typing.Deque[Record]
+        self.store = store
+        self._lock = threading.Lock()
+        # None stops the thread.
+        self._pending = (
+            queue.Queue()
+        )  # type: queue.Queue[Union[None, Record]]
+
+    def __enter__(self) -> "HistoryWriter":
+        _logger.info("Starting history writer thread.")
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        type_: Union[None, Type[BaseException]],
+        value: Union[None, BaseException],
+        traceback: Union[None, types.TracebackType],
+    ) -> None:
+        _logger.info("Stopping history writer thread.")
+        self._pending.put(None)
+        self.join()
+
+    def query_recent(
+        self,
+        *,
+        app_name: Union[None, str] = None,
+        since: float,
+        until: Union[None, float] = None
+    ) -> Union[None, List[Record]]:
+        """
+        Get records as `HistoryStore.query` does, from memory only.
+
+        Records are only complete if `since` is after the oldest recent
+        record, since every record created after that one is still there.
+        Those include records not yet written to disk.
+        Returns None otherwise, and the store should be queried instead.
+        """
+
+        with self._lock:
+            recent = list(self.recent)
+        if not recent or since <= recent[0]["created_at"]:
+            return None
+
+        records = []  # type: List[Record]
+        for record in recent:
+            created_at = record["created_at"]
+            if created_at < since or (
+                until is not None and created_at >= until
+            ):
+                continue
+            if app_name is not None and record["app_name"] != app_name:
+                continue
+            records.append(record)
+        return records
+
+    def record(self, record: Record) -> None:
+        with self._lock:
+            self.recent.append(record)
+        self._pending.put_nowait(record)
+
+    def run(self) -> None:
+        pending = self._pending
+        store = self.store
+        is_running = True
+        try:
+            while is_running:
+                # Write everything queued before flushing once.
+                batch = [pending.get()]
+                while True:
+                    try:
+                        batch.append(pending.get_nowait())
+                    except queue.Empty:
+                        break
+                # Errors are logged and the thread keeps going,
+                # so that recorded notifications do not pile up in the queue.
+                for record in batch:
+                    if record is None:
+                        is_running = False
+                        break
+                    try:
+                        store.append(record)
+                    except OSError as error:
+                        _logger.error("Unable to write history: %s", error)
+                try:
+                    store.flush()
+                except OSError as error:
+                    _logger.error("Unable to flush history: %s", error)
+        finally:
+            store.close()
+
+
+_DURATION_REGEX = re.compile(
+    r"^(?P<count>[0-9]+(\.[0-9]*)?)(?P<unit>[smhdw])$"
+)
+
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_time(value: str, *, now: float) -> float:
+    """Parse a duration before `now` such as `1h`, or a local date and time."""
+
+    duration_match = _DURATION_REGEX.match(value)
+    if duration_match is not None:
+        seconds = float(duration_match.group("count"))
+        return now - seconds * _UNIT_SECONDS[duration_match.group("unit")]
+    for time_format in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(
+                datetime.datetime.strptime(value, time_format).timetuple()
+            )
+        except ValueError:
+            continue
+    raise ValueError("Unable to parse time: {value}".format(value=value))
+
+
+def format_record(record: Record) -> str:
+    created_at = datetime.datetime.fromtimestamp(record["created_at"])
+    text = "{created_at} {app_name}: {summary}".format(
+        app_name=record["app_name"],
+        created_at=created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        summary=record["summary"],
+    )
+    body = record["body"]
+    if body:
+        text += " - " + " ".join(body.split())
+    return text
+
+
+def query_daemon(
+    *, app_name: Union[None, str], since: float, until: Union[None, float]
+) -> Union[None, List[Record]]:
+    """
+    Get records from memory of a running daemon, as `query_recent` does.
+
+    Returns None if there is no daemon to ask,
+    or if it may not have all of the records.
+    """
+
+    try:
+        import dbus  # type: ignore[import-not-found]  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+
+    try:
+        service = dbus.SessionBus().get_object(
+            "org.freedesktop.Notifications", "/org/freedesktop/Notifications"
+        )
+        is_complete, lines = service.QueryRecentHistory(
+            app_name or "",
+            since,
+            0.0 if until is None else until,
+            dbus_interface=DBUS_INTERFACE,
+        )
+    except dbus.DBusException as error:
+        _logger.debug("Unable to query daemon: %s", error)
+        return None
+    if not is_complete:
+        return None
+    return [json.loads(str(line)) for line in lines]
+
+
+def main(argv: Union[None, List[str]] = None) -> int:
+    """Parse command line arguments and print matching history."""
+
+    if argv is None:
+        argv = sys.argv
+
+    logging_ext.set_up_logging(logger=_logger)
+
+    argument_parser = argparse.ArgumentParser(
+        description="Show notifications received by the daemon."
+    )
+    logging_ext.add_verbose_flag(argument_parser)
+    argument_parser.add_argument(
+        "--app", dest="app_name", help="App name to match."
+    )
+    argument_parser.add_argument(
+        "--directory",
+        help="Default: history directory under XDG_STATE_HOME.",
+        type=pathlib.Path,
+    )
+    argument_parser.add_argument(
+        "--format", choices=("text", "ndjson"), default="text"
+    )
+    argument_parser.add_argument(
+        "--since", help="For example, 1h, 2d or 2024-01-31T12:00."
+    )
+    argument_parser.add_argument("--until", help="Same format as --since.")
+
+    arguments = argument_parser.parse_args(argv[1:])
+    logging_ext.set_logger_verbosity(
+        logger=_logger, verbosity=arguments.verbosity
+    )
+
+    now = time.time()
+    since = None  # type: Union[None, float]
+    until = None  # type: Union[None, float]
+    try:
+        if arguments.since is not None:
+            since = parse_time(arguments.since, now=now)
+        if arguments.until is not None:
+            until = parse_time(arguments.until, now=now)
+    except ValueError as error:
+        argument_parser.error(str(error))
+
+    records = None  # type: Union[None, typing.Iterable[Record]]
+    directory = arguments.directory
+    if directory is None:
+        directory = get_history_directory()
+        # Only the daemon writing to the default directory is asked.
+        if since is not None:
+            records = query_daemon(
+                app_name=arguments.app_name, since=since, until=until
+            )
+    if records is None:
+        records = HistoryStore(directory=directory).query(
+            app_name=arguments.app_name, since=since, until=until
+        )
+    for record in records:
+        if arguments.format == "ndjson":
+            sys.stdout.write(json.dumps(record, sort_keys=True) + "\n")
+        else:
+            sys.stdout.write(format_record(record) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+# Keep this Python 3.5 compatible for Debian 9 support.
+
+# Grouping of notifications into windows and placement of the windows.
+#
+# Kept apart from the daemon so that it can be used without D-Bus or a display.
+
+# Standard libraries.
+import collections
+import datetime
+import heapq
+import typing
+
+# TODO(Python 3.9): Use builtin.
+from typing import Dict, List, Tuple
+
+# TODO(Python 3.10): Use | instead of Union.
+from typing import Union
+
+if typing.TYPE_CHECKING:
+    # Internal modules.
+    from .daemon import Window
+
+# Seconds after the last notification of a group that new ones still join it.
+DEFAULT_COALESCE_SECONDS = 2.0
+
+# Windows shown at once. Others wait for a free slot.
+DEFAULT_MAX_VISIBLE = 8
+
+
+class Notification:
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        *args: typing.Any,
+        actions: List[typing.Any],
+        app_icon: str,
+        app_name: str,
+        body: str,
+        created_at: datetime.datetime,
+        expire_timeout: int,
+        hints: Dict[str, typing.Any],
+        id: int,  # pylint: disable=redefined-builtin
+        summary: str,
+        **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.actions = actions
+        self.app_icon = app_icon
+        self.app_name = app_name
+        self.body = body
+        self.created_at = created_at
+        self.expire_timeout = expire_timeout
+        self.hints = hints
+        self.id = id
+        self.summary = summary
+
+
+# App name and summary.
+GroupKey = Tuple[str, str]
+
+
+class NotificationGroup:
+    # Notifications shown together in one window.
+
+    def __init__(
+        self, *args: typing.Any, key: GroupKey, **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.is_dirty = False
+        self.key = key
+        # In order received. The last one is shown.
+        self.notifications = (
+            collections.OrderedDict()
+        )  # type: collections.OrderedDict[int, Notification]
+        self.slot = None  # type: Union[None, int]
+        self.updated_at = 0.0
+        self.window = None  # type: Union[None, Window]
+
+    def get_latest(self) -> Notification:
+        return next(reversed(self.notifications.values()))
+
+
+class Coalescer:
+    # Group notifications with the same app name and summary
+    # that arrive within `coalesce_seconds` of each other.
+    # Each notification ID stays known
+    # so that it can be closed and reported closed on its own.
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        coalesce_seconds: float = DEFAULT_COALESCE_SECONDS,
+        **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.coalesce_seconds = coalesce_seconds
+        # Groups new notifications may join.
+        self._open_groups = {}  # type: dict[GroupKey, NotificationGroup]
+        self._groups = {}  # type: dict[int, NotificationGroup]
+        self._dirty_groups = []  # type: list[NotificationGroup]
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def add(
+        self, notification: Notification, *, now: float
+    ) -> NotificationGroup:
+        notification_id = notification.id
+        key = (notification.app_name, notification.summary)
+
+        # A replaced notification stays in its group if the group still fits,
+        # so that its window is updated in place.
+        group = self._groups.get(notification_id)
+        if group is not None and group.key == key:
+            group.notifications[notification_id] = notification
+            group.notifications.move_to_end(notification_id)
+            group.updated_at = now
+            self.mark_dirty(group)
+            return group
+        # Otherwise it moves to the group of its new content.
+        self.discard(notification_id)
+
+        group = self._open_groups.get(key)
+        if group is None or now - group.updated_at >= self.coalesce_seconds:
+            group = NotificationGroup(key=key)
+            self._open_groups[key] = group
+        group.notifications[notification_id] = notification
+        group.updated_at = now
+        self._groups[notification_id] = group
+        self.mark_dirty(group)
+        return group
+
+    def discard(self, notification_id: int) -> Union[None, NotificationGroup]:
+        """Remove one notification. Its group is removed if left empty."""
+
+        group = self._groups.pop(notification_id, None)
+        if group is None:
+            return None
+        del group.notifications[notification_id]
+        if not group.notifications:
+            self._forget(group)
+        self.mark_dirty(group)
+        return group
+
+    def get_group(
+        self, notification_id: int
+    ) -> Union[None, NotificationGroup]:
+        return self._groups.get(notification_id)
+
+    def pop_dirty_groups(self) -> List[NotificationGroup]:
+        """Get groups changed since the last call. Emptied groups included."""
+
+        dirty_groups = self._dirty_groups
+        self._dirty_groups = []
+        for group in dirty_groups:
+            group.is_dirty = False
+        return dirty_groups
+
+    def remove_group(self, group: NotificationGroup) -> List[int]:
+        """Remove all notifications of the group and get their IDs."""
+
+        notification_ids = list(group.notifications)
+        for notification_id in notification_ids:
+            del self._groups[notification_id]
+        group.notifications.clear()
+        self._forget(group)
+        return notification_ids
+
+    def _forget(self, group: NotificationGroup) -> None:
+        if self._open_groups.get(group.key) is group:
+            del self._open_groups[group.key]
+
+    def mark_dirty(self, group: NotificationGroup) -> None:
+        if not group.is_dirty:
+            group.is_dirty = True
+            self._dirty_groups.append(group)
+
+
+class SlotLayout:
+    # Vertical slots of windows stacked up from the bottom of the screen.
+    # A new window takes the lowest free slot.
+    # Free slots take no space, so windows above them move down
+    # when offsets are next computed.
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        max_count: int,
+        spacing: int,
+        **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.max_count = max_count
+        self.spacing = spacing
+        # Slots below `_slot_count` that are not used. A heap.
+        self._free_slots = []  # type: list[int]
+        self._heights = {}  # type: dict[int, int]
+        self._is_dirty = False
+        self._slot_count = 0
+
+    def __len__(self) -> int:
+        return len(self._heights)
+
+    def allocate(self, height: int) -> int:
+        if self._free_slots:
+            slot = heapq.heappop(self._free_slots)
+        else:
+            slot = self._slot_count
+            self._slot_count += 1
+        self._heights[slot] = height
+        self._is_dirty = True
+        return slot
+
+    def flush(self) -> Union[None, List[Tuple[int, int]]]:
+        """
+        Get offsets from the bottom of used slots, bottom first.
+
+        None if nothing changed since the last call.
+        """
+
+        if not self._is_dirty:
+            return None
+        self._is_dirty = False
+        heights = self._heights
+        spacing = self.spacing
+        offsets = []  # type: List[Tuple[int, int]]
+        offset = 0
+        for slot in sorted(heights):
+            offsets.append((slot, offset))
+            offset += heights[slot] + spacing
+        return offsets
+
+    def get_total_height(self) -> int:
+        return sum(self._heights.values()) + len(self._heights) * self.spacing
+
+    def is_full(self) -> bool:
+        return len(self._heights) >= self.max_count
+
+    def release(self, slot: int) -> None:
+        del self._heights[slot]
+        self._is_dirty = True
+        if self._heights:
+            heapq.heappush(self._free_slots, slot)
+        else:
+            self._free_slots.clear()
+            self._slot_count = 0
+
+    def resize(self, slot: int, height: int) -> None:
+        if self._heights[slot] != height:
+            self._heights[slot] = height
+            self._is_dirty = True
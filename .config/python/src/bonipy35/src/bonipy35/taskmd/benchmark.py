@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+
+# Need Python 3.5 support.
+# pylint: disable=consider-using-f-string
+
+# Time taskmd operations on a synthetic or given document.
+#
+# Results are written as JSON so a later run can be compared against them.
+# For example:
+#
+#     python3 -m bonipy35.taskmd.benchmark run --output baseline.json
+#     python3 -m bonipy35.taskmd.benchmark run --output current.json
+#     python3 -m bonipy35.taskmd.benchmark compare baseline.json current.json
+
+# Standard libraries.
+import argparse
+import copy
+import datetime
+import functools
+import json
+import logging
+import pathlib
+import platform
+import sys
+import time
+import typing
+
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+# Internal modules.
+from .. import logging_ext
+from . import corpus
+from . import data
+
+_logger = logging.getLogger(
+    __name__ if __name__ != "__main__" else __package__
+)
+
+RESULTS_VERSION = 1
+
+# Name of the case, and a function that prepares a call to time.
+# Preparation is not timed, so each call can start from a fresh copy.
+Case = Tuple[str, Callable[[], Callable[[], object]]]
+
+
+def get_cases(  # pylint: disable=too-many-locals
+    lines: Sequence[str], *, date: datetime.date
+) -> List[Case]:
+    """
+    Get operations to time on the given document.
+
+    Reports are those of the Vim plugin for the given date,
+    without the Vim interface.
+    Background reports are timed as after an edit to the buffer.
+    The plugin then parses the changed lines again
+    and builds a new index before the query.
+    """
+
+    parsed_document = data.ParsedDocument.parse(iter(lines))
+    refreshed_document = parsed_document.copy()
+    refreshed_document.refresh_durations()
+    clock_index = data.ClockIndex.build(parsed_document)
+    tag_index = data.TagIndex.build(
+        data.iter_headline_tags(parsed_document.parsed_lines)
+    )
+
+    day_start = datetime.datetime(
+        year=date.year, month=date.month, day=date.day
+    ).astimezone()
+    day_end = day_start + datetime.timedelta(days=1)
+    month_start = day_start.replace(day=1)
+    day_starts = []  # type: List[datetime.datetime]
+    month_end = month_start
+    while month_end.month == month_start.month:
+        day_starts.append(month_end)
+        month_end += datetime.timedelta(days=1)
+
+    # An inserted line shifts every line after it.
+    edited_lines = list(lines)
+    edited_lines.insert(len(lines) // 2, "")
+    start, old_end, new_end = data.get_changed_range(lines, edited_lines)
+
+    def get_edited_clock_index() -> data.ClockIndex:
+        edited_document = copy.copy(parsed_document)
+        edited_document.update(
+            edited_lines, start=start, old_end=old_end, new_end=new_end
+        )
+        return data.ClockIndex.build(edited_document)
+
+    def bound_time_range() -> Callable[[], object]:
+        return functools.partial(
+            parsed_document.copy().bound_time_range,
+            start=day_start,
+            end=day_end,
+        )
+
+    def refresh_durations() -> Callable[[], object]:
+        return parsed_document.copy().refresh_durations
+
+    def write_agenda() -> object:
+        return clock_index.get_bounded_clocks(start=day_start, end=day_end)
+
+    def write_day_report() -> object:
+        return data.get_summary_quicklist(
+            clock_index.get_bounded_document(start=day_start, end=day_end)
+        )
+
+    def write_month_report() -> object:
+        edited_clock_index = get_edited_clock_index()
+        return data.get_summary_quicklist(
+            edited_clock_index.get_bounded_document(
+                start=month_start, end=month_end
+            )
+        )
+
+    def write_summary() -> object:
+        edited_clock_index = get_edited_clock_index()
+        return data.get_summary_quicklist(
+            edited_clock_index.get_clocked_document()
+        )
+
+    def write_tag_report() -> object:
+        tag_rollup = tag_index.rollup(
+            clock_index, start=month_start, end=month_end
+        )
+        return data.get_tag_quicklist(tag_rollup, tag_index)
+
+    def write_timesheet() -> object:
+        edited_clock_index = get_edited_clock_index()
+        return [
+            data.get_summary_quicklist(bounded_document)
+            for bounded_document in edited_clock_index.get_bounded_documents(
+                day_starts + [month_end]
+            )
+        ]
+
+    return [
+        ("parse", lambda: lambda: data.ParsedDocument.parse(iter(lines))),
+        ("refresh_durations", refresh_durations),
+        ("bound_time_range", bound_time_range),
+        (
+            "get_summary_quicklist",
+            lambda: lambda: data.get_summary_quicklist(refreshed_document),
+        ),
+        (
+            "clock_index_build",
+            lambda: lambda: data.ClockIndex.build(parsed_document),
+        ),
+        (
+            "tag_index_build",
+            lambda: lambda: data.TagIndex.build(
+                data.iter_headline_tags(parsed_document.parsed_lines)
+            ),
+        ),
+        (
+            "fix_clocks",
+            lambda: lambda: data.merge_line_changes(
+                parsed_document.get_fix_clocks_diff()
+            ),
+        ),
+        ("agenda", lambda: write_agenda),
+        ("day_report", lambda: write_day_report),
+        ("month_report", lambda: write_month_report),
+        ("summary", lambda: write_summary),
+        ("tag_report", lambda: write_tag_report),
+        ("timesheet", lambda: write_timesheet),
+    ]
+
+
+def get_clock_cases(clock_lines: Sequence[str]) -> List[Case]:
+    """Get parsing and formatting of clock lines, apart from any document."""
+
+    clocks = [data.Clock.parse(line) for line in clock_lines]
+
+    def parse_clocks() -> object:
+        parse = data.Clock.parse
+        return [parse(line) for line in clock_lines]
+
+    def format_clocks() -> object:
+        return [clock.to_string() for clock in clocks if clock is not None]
+
+    return [
+        ("clock_parse", lambda: parse_clocks),
+        ("clock_to_string", lambda: format_clocks),
+    ]
+
+
+def time_case(case: Case, *, repeat: int) -> List[float]:
+    """Time calls prepared by the case, in seconds."""
+
+    _, prepare = case
+    timings = []  # type: List[float]
+    for _ in range(repeat):
+        call = prepare()
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_cases(
+    cases: Sequence[Case],
+    *,
+    names: Union[None, Sequence[str]] = None,
+    repeat: int
+) -> Dict[str, Dict[str, float]]:
+    results = {}  # type: Dict[str, Dict[str, float]]
+    for case in cases:
+        name = case[0]
+        if names and name not in names:
+            continue
+        timings = time_case(case, repeat=repeat)
+        results[name] = {
+            "best_seconds": min(timings),
+            "mean_seconds": sum(timings) / len(timings),
+        }
+        _logger.info("%s: %.6f s", name, results[name]["best_seconds"])
+    return results
+
+
+def compare_results(
+    baseline: Dict[str, typing.Any],
+    current: Dict[str, typing.Any],
+    *,
+    minimum_seconds: float = 0.0,
+    tolerance: float
+) -> List[str]:
+    """
+    Get cases that are slower than in the baseline by more than `tolerance`.
+
+    Best timings are compared, as they are the least affected by other load.
+    Slowdowns shorter than `minimum_seconds` are taken as timer noise.
+    Cases missing from either side are skipped.
+    """
+
+    if baseline.get("corpus") != current.get("corpus"):
+        _logger.warning("Comparing results from different documents.")
+
+    regressions = []  # type: List[str]
+    baseline_results = baseline["results"]
+    for name, result in sorted(current["results"].items()):
+        baseline_result = baseline_results.get(name)
+        if baseline_result is None:
+            continue
+        baseline_seconds = baseline_result["best_seconds"]
+        current_seconds = result["best_seconds"]
+        if current_seconds - baseline_seconds < minimum_seconds:
+            continue
+        if current_seconds > baseline_seconds * tolerance:
+            regressions.append(
+                "{name}: {baseline:.6f} s -> {current:.6f} s".format(
+                    name=name,
+                    baseline=baseline_seconds,
+                    current=current_seconds,
+                )
+            )
+    return regressions
+
+
+def run(  # pylint: disable=too-many-arguments
+    *,
+    clock_count: int,
+    days: int,
+    input_path: Union[None, pathlib.Path],
+    names: Sequence[str],
+    output_path: Union[None, pathlib.Path],
+    repeat: int,
+    seed: int
+) -> int:
+    if input_path is None:
+        lines = list(corpus.generate_lines(days=days, seed=seed))
+        corpus_description = {
+            "days": days,
+            "seed": seed,
+        }  # type: Dict[str, typing.Any]
+    else:
+        lines = input_path.read_text(encoding="utf-8").splitlines()
+        corpus_description = {"path": str(input_path)}
+    corpus_description["line_count"] = len(lines)
+
+    # Report on a day in the middle of the document.
+    clock_index = data.ClockIndex.build(
+        data.ParsedDocument.parse(iter(lines))
+    )
+    date = datetime.date.today()
+    if len(clock_index):
+        middle = clock_index.starts[len(clock_index) // 2]
+        date = datetime.datetime.fromtimestamp(middle).date()
+
+    cases = get_cases(lines, date=date)
+    if clock_count:
+        cases.extend(
+            get_clock_cases(
+                list(
+                    corpus.generate_clock_lines(count=clock_count, seed=seed)
+                )
+            )
+        )
+    corpus_description["clock_count"] = clock_count
+
+    results = {
+        "corpus": corpus_description,
+        "date": date.isoformat(),
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "results": run_cases(cases, names=names, repeat=repeat),
+        "version": RESULTS_VERSION,
+    }
+    results_as_string = json.dumps(results, indent=2, sort_keys=True) + "\n"
+    if output_path is None:
+        sys.stdout.write(results_as_string)
+    else:
+        output_path.write_text(results_as_string, encoding="utf-8")
+    return 0
+
+
+def compare(
+    *,
+    baseline_path: pathlib.Path,
+    current_path: pathlib.Path,
+    minimum_seconds: float,
+    tolerance: float
+) -> int:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    current = json.loads(current_path.read_text(encoding="utf-8"))
+    regressions = compare_results(
+        baseline,
+        current,
+        minimum_seconds=minimum_seconds,
+        tolerance=tolerance,
+    )
+    for regression in regressions:
+        _logger.error("Slower than baseline: %s", regression)
+    return 1 if regressions else 0
+
+
+def generate(
+    *, days: int, output_path: Union[None, pathlib.Path], seed: int
+) -> int:
+    lines = corpus.generate_lines(days=days, seed=seed)
+    if output_path is None:
+        for line in lines:
+            sys.stdout.write(line + "\n")
+    else:
+        with output_path.open("w", encoding="utf-8") as output_file:
+            for line in lines:
+                output_file.write(line + "\n")
+    return 0
+
+
+def main(argv: "None | list[str]" = None) -> int:
+    """Parse command line arguments and call the chosen command."""
+
+    if argv is None:
+        argv = sys.argv
+
+    logging_ext.set_up_logging(logger=_logger)
+
+    parser = argparse.ArgumentParser(description="Time taskmd operations.")
+    logging_ext.add_verbose_flag(parser)
+    subparsers = parser.add_subparsers(dest="command")
+
+    generate_parser = subparsers.add_parser(
+        "generate", help="Write a document."
+    )
+    generate_parser.add_argument("--days", default=365, type=int)
+    generate_parser.add_argument(
+        "--output", dest="output_path", type=pathlib.Path
+    )
+    generate_parser.add_argument("--seed", default=0, type=int)
+
+    run_parser = subparsers.add_parser("run", help="Time operations.")
+    run_parser.add_argument(
+        "--clock-count",
+        default=100000,
+        help="Clock lines to parse and format on their own. 0 to skip.",
+        type=int,
+    )
+    run_parser.add_argument("--days", default=365, type=int)
+    run_parser.add_argument(
+        "--input",
+        dest="input_path",
+        help="Document to use instead of a generated one.",
+        type=pathlib.Path,
+    )
+    run_parser.add_argument(
+        "--name",
+        action="append",
+        default=[],
+        dest="names",
+        help="Case to run.",
+    )
+    run_parser.add_argument("--output", dest="output_path", type=pathlib.Path)
+    run_parser.add_argument("--repeat", default=5, type=int)
+    run_parser.add_argument("--seed", default=0, type=int)
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="Fail if slower than a baseline."
+    )
+    compare_parser.add_argument("baseline_path", type=pathlib.Path)
+    compare_parser.add_argument("current_path", type=pathlib.Path)
+    compare_parser.add_argument(
+        "--minimum-seconds",
+        default=0.0,
+        help="Slowdown to ignore as noise.",
+        type=float,
+    )
+    compare_parser.add_argument(
+        "--tolerance",
+        default=1.25,
+        help="Allowed ratio of current to baseline time.",
+        type=float,
+    )
+
+    arguments = parser.parse_args(argv[1:])
+    if arguments.command is None:
+        parser.error("A command is required.")
+
+    logging_ext.set_logger_verbosity(
+        logger=_logger, verbosity=arguments.verbosity
+    )
+
+    if arguments.command == "generate":
+        return generate(
+            days=arguments.days,
+            output_path=arguments.output_path,
+            seed=arguments.seed,
+        )
+    if arguments.command == "run":
+        return run(
+            clock_count=arguments.clock_count,
+            days=arguments.days,
+            input_path=arguments.input_path,
+            names=arguments.names,
+            output_path=arguments.output_path,
+            repeat=arguments.repeat,
+            seed=arguments.seed,
+        )
+    return compare(
+        baseline_path=arguments.baseline_path,
+        current_path=arguments.current_path,
+        minimum_seconds=arguments.minimum_seconds,
+        tolerance=arguments.tolerance,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+
+# Need Python 3.5 support.
+# pylint: disable=consider-using-f-string
+
+# Find overlapping clocks, gaps between clocks and clocks left open.
+#
+# Overlapping clocks count the same time twice in reports.
+# Exits with non-zero status if anything is found,
+# so it can be used as a pre-commit check:
+#
+#     python3 -m bonipy35 taskmd check --gap-minimum 15 timesheets/
+
+# Standard libraries.
+import argparse
+import concurrent.futures
+import datetime
+import json
+import logging
+import pathlib
+import sys
+import typing
+
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+
+# Internal modules.
+from .. import logging_ext
+from . import data
+from . import report
+
+_logger = logging.getLogger(
+    __name__ if __name__ != "__main__" else __package__
+)
+
+# Gaps longer than this are taken as breaks between days.
+DEFAULT_GAP_MAXIMUM_SECONDS = 8 * 3600
+
+FORMATS = ("quickfix", "json")
+
+# Start and end in epoch seconds, source and line number.
+# End is None for open clocks.
+ClockSpan = Tuple[int, Union[None, int], str, int]
+
+
+class ClockIssue:
+    __slots__ = (
+        "end",
+        "kind",
+        "line_number",
+        "other_line_number",
+        "other_source",
+        "source",
+        "start",
+    )
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        *args: typing.Any,
+        end: Union[None, int] = None,
+        kind: str,
+        line_number: int,
+        other_line_number: Union[None, int] = None,
+        other_source: Union[None, str] = None,
+        source: str,
+        start: int,
+        **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        # Range of the overlap or gap. Start of an open clock.
+        self.end = end
+        # One of "gap", "negative", "open" and "overlap".
+        self.kind = kind
+        self.line_number = line_number
+        # Earlier clock the overlap or gap is with.
+        self.other_line_number = other_line_number
+        self.other_source = other_source
+        self.source = source
+        self.start = start
+
+    def get_message(self) -> str:
+        if self.kind == "open":
+            return "Open clock"
+        if self.kind == "negative":
+            return "Clock ends before it starts"
+
+        assert self.end is not None
+        duration = datetime.timedelta(seconds=self.end - self.start)
+        other = "line {line_number}".format(
+            line_number=self.other_line_number
+        )
+        if self.other_source != self.source:
+            other = "{source}:{line_number}".format(
+                line_number=self.other_line_number, source=self.other_source
+            )
+        if self.kind == "overlap":
+            return "Overlaps {other} for {duration}".format(
+                duration=duration, other=other
+            )
+        return "Gap of {duration} after {other}".format(
+            duration=duration, other=other
+        )
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_quickfix(self) -> str:
+        return "{source}:{line_number}:1: {message}".format(
+            line_number=self.line_number,
+            message=self.get_message(),
+            source=self.source,
+        )
+
+
+def iter_clock_spans(
+    parsed_lines: Iterable[data.ParsedLine], *, source: str
+) -> Iterator[ClockSpan]:
+    for parsed_line in parsed_lines:
+        clock = parsed_line.clock
+        if clock is None:
+            continue
+        end = clock.end
+        yield (
+            data.to_epoch_seconds(clock.start),
+            data.to_epoch_seconds(end) if end is not None else None,
+            source,
+            parsed_line.line_number,
+        )
+
+
+def read_clock_spans(path: pathlib.Path) -> List[ClockSpan]:
+    with path.open(encoding="utf-8") as stream:
+        return list(
+            iter_clock_spans(
+                data.iter_structure(data.iter_lines(stream)), source=str(path)
+            )
+        )
+
+
+def _read_clock_spans_or_error(
+    path: pathlib.Path,
+) -> Union[List[ClockSpan], str]:
+    # Error message instead of raising, so one file does not stop a pool map.
+    try:
+        return read_clock_spans(path)
+    except (OSError, UnicodeDecodeError) as error:
+        return str(error)
+
+
+def find_clock_issues(
+    clock_spans: Iterable[ClockSpan],
+    *,
+    gap_maximum_seconds: Union[None, int] = DEFAULT_GAP_MAXIMUM_SECONDS,
+    gap_minimum_seconds: Union[None, int] = None
+) -> List[ClockIssue]:
+    """
+    Find issues with a sweep over clocks sorted by start.
+
+    Each clock is compared with the clock that ends last among those
+    starting before it.
+    A clock overlapping with several earlier ones
+    is reported once, with the one ending last.
+    Gaps are reported if longer than `gap_minimum_seconds`
+    and not longer than `gap_maximum_seconds`.
+    Gaps are not checked if `gap_minimum_seconds` is None.
+    Issues are sorted by start time.
+    """
+
+    issues = []  # type: List[ClockIssue]
+    closed_spans = []  # type: List[Tuple[int, int, str, int]]
+    for start, end, source, line_number in clock_spans:
+        if end is None:
+            issues.append(
+                ClockIssue(
+                    kind="open",
+                    line_number=line_number,
+                    source=source,
+                    start=start,
+                )
+            )
+        elif end < start:
+            issues.append(
+                ClockIssue(
+                    end=end,
+                    kind="negative",
+                    line_number=line_number,
+                    source=source,
+                    start=start,
+                )
+            )
+        else:
+            closed_spans.append((start, end, source, line_number))
+    closed_spans.sort()
+
+    # Clock ending last so far.
+    last_end = None  # type: Union[None, int]
+    last_source = ""
+    last_line_number = 0
+    for start, end, source, line_number in closed_spans:
+        if last_end is not None:
+            if start < last_end:
+                issues.append(
+                    ClockIssue(
+                        end=min(end, last_end),
+                        kind="overlap",
+                        line_number=line_number,
+                        other_line_number=last_line_number,
+                        other_source=last_source,
+                        source=source,
+                        start=start,
+                    )
+                )
+            elif gap_minimum_seconds is not None:
+                gap = start - last_end
+                if gap > gap_minimum_seconds and (
+                    gap_maximum_seconds is None or gap <= gap_maximum_seconds
+                ):
+                    issues.append(
+                        ClockIssue(
+                            end=start,
+                            kind="gap",
+                            line_number=line_number,
+                            other_line_number=last_line_number,
+                            other_source=last_source,
+                            source=source,
+                            start=last_end,
+                        )
+                    )
+
+        if last_end is None or end > last_end:
+            last_end = end
+            last_source = source
+            last_line_number = line_number
+
+    issues.sort(key=lambda issue: issue.start)
+    return issues
+
+
+def iter_project_clock_spans(
+    paths: Sequence[pathlib.Path],
+    *,
+    failed_paths: Union[None, List[pathlib.Path]] = None,
+    max_workers: Union[None, int] = None
+) -> Iterator[ClockSpan]:
+    """
+    Read clocks of files, in worker processes unless `max_workers` is 1.
+
+    Files that cannot be read are logged, skipped
+    and added to `failed_paths` if given.
+    """
+
+    def iter_results(
+        results: Iterable[Union[List[ClockSpan], str]],
+    ) -> Iterator[ClockSpan]:
+        for path, result in zip(paths, results):
+            if isinstance(result, str):
+                _logger.error("Unable to read %s: %s", path, result)
+                if failed_paths is not None:
+                    failed_paths.append(path)
+            else:
+                yield from result
+
+    if max_workers == 1 or len(paths) <= 1:
+        yield from iter_results(map(_read_clock_spans_or_error, paths))
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers
+    ) as executor:
+        yield from iter_results(
+            executor.map(_read_clock_spans_or_error, paths, chunksize=8)
+        )
+
+
+def run(  # pylint: disable=too-many-arguments
+    *,
+    format_name: str,
+    gap_maximum_seconds: Union[None, int],
+    gap_minimum_seconds: Union[None, int],
+    is_open_allowed: bool,
+    max_workers: Union[None, int],
+    path_arguments: Sequence[str]
+) -> int:
+    paths = list(report.iter_paths(path_arguments))
+    if not paths:
+        _logger.error("No files found.")
+        return 1
+
+    failed_paths = []  # type: List[pathlib.Path]
+    issues = find_clock_issues(
+        iter_project_clock_spans(
+            paths, failed_paths=failed_paths, max_workers=max_workers
+        ),
+        gap_maximum_seconds=gap_maximum_seconds,
+        gap_minimum_seconds=gap_minimum_seconds,
+    )
+    if is_open_allowed:
+        issues = [issue for issue in issues if issue.kind != "open"]
+
+    if format_name == "json":
+        json.dump([issue.to_dict() for issue in issues], sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        for issue in issues:
+            sys.stdout.write(issue.to_quickfix() + "\n")
+    return 1 if issues or failed_paths else 0
+
+
+def main(argv: "None | list[str]" = None) -> int:
+    """Parse command line arguments and call `run`."""
+
+    if argv is None:
+        argv = sys.argv
+
+    logging_ext.set_up_logging(logger=_logger)
+
+    parser = argparse.ArgumentParser(
+        description="Find overlapping clocks, gaps and open clocks."
+    )
+    logging_ext.add_verbose_flag(parser)
+    report.add_path_argument(parser)
+    parser.add_argument(
+        "--allow-open", action="store_true", dest="is_open_allowed"
+    )
+    parser.add_argument("--format", choices=FORMATS, default="quickfix")
+    parser.add_argument(
+        "--gap-maximum",
+        default=DEFAULT_GAP_MAXIMUM_SECONDS // 60,
+        help="Minutes. Longer gaps are taken as breaks between days.",
+        type=int,
+    )
+    parser.add_argument(
+        "--gap-minimum",
+        help="Minutes. Report gaps longer than this. Default: no gap check.",
+        type=int,
+    )
+    parser.add_argument(
+        "--jobs", help="Number of worker processes.", type=int
+    )
+    arguments = parser.parse_args(argv[1:])
+
+    logging_ext.set_logger_verbosity(
+        logger=_logger, verbosity=arguments.verbosity
+    )
+
+    return run(
+        format_name=arguments.format,
+        gap_maximum_seconds=arguments.gap_maximum * 60,
+        gap_minimum_seconds=(
+            arguments.gap_minimum * 60
+            if arguments.gap_minimum is not None
+            else None
+        ),
+        is_open_allowed=arguments.is_open_allowed,
+        max_workers=arguments.jobs,
+        path_arguments=arguments.path_arguments,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
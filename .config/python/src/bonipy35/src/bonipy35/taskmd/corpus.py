@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+# Need Python 3.5 support.
+# pylint: disable=consider-using-f-string
+
+# Synthetic taskmd documents for benchmarking.
+#
+# Output only depends on the arguments,
+# so results from different runs can be compared.
+
+# Standard libraries.
+import datetime
+import random
+import typing
+
+from typing import Iterator, Union
+
+# Internal modules.
+from .data import Clock, Headline
+
+TAGS = ("chore", "code", "home", "meeting", "review", "work")
+
+TIMEZONE = datetime.timezone(datetime.timedelta(hours=8))
+
+
+def generate_lines(  # pylint: disable=too-many-arguments,too-many-locals
+    *,
+    code_block_probability: float = 0.05,
+    days: int = 365,
+    depth: int = 3,
+    open_clock_probability: float = 0.01,
+    seed: int = 0,
+    start_date: Union[None, datetime.date] = None,
+    tasks_per_day: int = 4
+) -> Iterator[str]:
+    """
+    Generate a timesheet with a headline for each day.
+
+    Each day has tasks nested up to `depth` levels below it,
+    each task with a few clocks,
+    and some tasks with notes and fenced code blocks.
+    A code block contains text that would be a headline outside of it.
+    """
+
+    if start_date is None:
+        start_date = datetime.date(2000, 1, 1)
+
+    generator = random.Random(seed)
+    one_day = datetime.timedelta(days=1)
+    for day_index in range(days):
+        date = start_date + day_index * one_day
+        yield Headline(level=1, title=date.isoformat()).to_string()
+
+        day_start = datetime.datetime(
+            year=date.year, month=date.month, day=date.day, tzinfo=TIMEZONE
+        )
+        clock_start = day_start + datetime.timedelta(hours=8)
+        level = 1
+        for task_index in range(tasks_per_day):
+            level = generator.randint(2, min(level + 1, depth + 1))
+            tags = None  # type: Union[None, typing.List[str]]
+            if generator.random() < 0.5:
+                tags = generator.sample(TAGS, generator.randint(1, 2))
+            yield Headline(
+                keyword=generator.choice(("DONE", "TODO")),
+                level=level,
+                tags=tags,
+                title="Task {day_index}.{task_index}".format(
+                    day_index=day_index, task_index=task_index
+                ),
+            ).to_string()
+
+            for _ in range(generator.randint(1, 3)):
+                clock_end = clock_start + datetime.timedelta(
+                    minutes=generator.randint(5, 120)
+                )
+                clock = Clock(end=clock_end, start=clock_start)
+                if generator.random() < open_clock_probability:
+                    clock.end = None
+                yield Headline(
+                    level=level + 1, title=clock.to_string()
+                ).to_string()
+                clock_start = clock_end + datetime.timedelta(
+                    minutes=generator.randint(0, 30)
+                )
+
+            if generator.random() < code_block_probability:
+                yield ""
+                yield "Notes for the task."
+                yield "```"
+                yield "# Not a headline"
+                yield "## CLOCK: ({start})".format(
+                    start=clock_start.isoformat()
+                )
+                yield "```"
+                yield ""
+
+
+# Offsets of clocks from different machines and travels.
+CLOCK_TIMEZONES = tuple(
+    datetime.timezone(datetime.timedelta(minutes=minutes))
+    for minutes in (-480, -300, 0, 330, 480, 540)
+)
+
+
+def generate_clock_lines(
+    *, count: int = 100000, seed: int = 0
+) -> Iterator[str]:
+    """Generate closed clock lines with mixed offsets, without headlines."""
+
+    generator = random.Random(seed)
+    clock_start = datetime.datetime(
+        year=2000, month=1, day=1, tzinfo=TIMEZONE
+    )
+    for _ in range(count):
+        timezone = generator.choice(CLOCK_TIMEZONES)
+        clock_end = clock_start + datetime.timedelta(
+            minutes=generator.randint(5, 120)
+        )
+        yield Clock(
+            end=clock_end.astimezone(timezone),
+            start=clock_start.astimezone(timezone),
+        ).to_string()
+        clock_start = clock_end + datetime.timedelta(
+            minutes=generator.randint(0, 30)
+        )
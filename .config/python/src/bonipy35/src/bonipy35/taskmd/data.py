@@ -2,17 +2,27 @@
 
 # Need Python 3.5 support.
 # pylint: disable=consider-using-f-string
-# Need Python 3.5 support.
-# pylint: disable=too-many-arguments
 
 # Standard libraries.
+import array
+import bisect
+import concurrent.futures
+import copy
 import datetime
+import functools
+import hashlib
+import itertools
 import logging
+import os
 import pathlib
+import pickle
 import re
 import typing
 
-from typing import Iterator, List, Tuple, Union
+from typing import Dict, Iterator, List, Sequence, Tuple, Union
+
+# Internal modules.
+from .. import xdg
 
 _logger = logging.getLogger(__name__)
 
@@ -64,7 +74,125 @@ def get_now() -> datetime.datetime:
     )
 
 
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+# Caches of offsets seen, which are few in a document.
+_offset_strings = {}  # type: dict[datetime.timedelta, str]
+_timezones = {}  # type: dict[str, Union[None, datetime.timezone]]
+
+
+def _to_timezone(offset_string: str) -> Union[None, datetime.timezone]:
+    # Parse "+HHMM" or "+HH:MM". None if not in either form.
+    sign = offset_string[:1]
+    if sign not in ("+", "-"):
+        return None
+    if len(offset_string) == 5:
+        hours_string = offset_string[1:3]
+        minutes_string = offset_string[3:5]
+    elif len(offset_string) == 6 and offset_string[3] == ":":
+        hours_string = offset_string[1:3]
+        minutes_string = offset_string[4:6]
+    else:
+        return None
+    if not (hours_string + minutes_string).isdigit():
+        return None
+
+    offset = datetime.timedelta(hours=int(hours_string), minutes=int(minutes_string))
+    if not offset:
+        return datetime.timezone.utc
+    if sign == "-":
+        offset = -offset
+    try:
+        return datetime.timezone(offset)
+    except ValueError:
+        return None
+
+
+def parse_timestamp(value: str) -> datetime.datetime:
+    """
+    Parse a timestamp in `TIMESTAMP_FORMAT`.
+
+    The usual `YYYY-MM-DDTHH:MM:SS+HHMM` form, or with `+HH:MM`,
+    is sliced directly instead of going through `strptime`.
+    Other forms accepted by `strptime` still work, but slower.
+    """
+
+    if len(value) in (24, 25) and (
+        value[4],
+        value[7],
+        value[10],
+        value[13],
+        value[16],
+    ) == ("-", "-", "T", ":", ":"):
+        offset_string = value[19:]
+        try:
+            tzinfo = _timezones[offset_string]
+        except KeyError:
+            tzinfo = _timezones[offset_string] = _to_timezone(offset_string)
+
+        if tzinfo is not None:
+            year = value[0:4]
+            month = value[5:7]
+            day = value[8:10]
+            hour = value[11:13]
+            minute = value[14:16]
+            second = value[17:19]
+            if (year + month + day + hour + minute + second).isdigit():
+                try:
+                    return datetime.datetime(
+                        year=int(year),
+                        month=int(month),
+                        day=int(day),
+                        hour=int(hour),
+                        minute=int(minute),
+                        second=int(second),
+                        tzinfo=tzinfo,
+                    )
+                except ValueError:
+                    # Let `strptime` report the error.
+                    pass
+
+    return datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def format_timestamp(value: datetime.datetime) -> str:
+    """Same as `value.strftime(TIMESTAMP_FORMAT)`, but faster."""
+
+    offset = value.utcoffset()
+    year = value.year
+    # Years before 1000 are not zero padded by some `strftime`.
+    if offset is None or year < 1000:
+        return value.strftime(TIMESTAMP_FORMAT)
+
+    try:
+        offset_string = _offset_strings[offset]
+    except KeyError:
+        offset_string = _offset_strings[offset] = value.strftime("%z")
+
+    return "%04d-%02d-%02dT%02d:%02d:%02d%s" % (
+        year,
+        value.month,
+        value.day,
+        value.hour,
+        value.minute,
+        value.second,
+        offset_string,
+    )
+
+
+def to_epoch_seconds(value: datetime.datetime) -> int:
+    return int(value.timestamp())
+
+
+def to_seconds(duration: datetime.timedelta) -> int:
+    return duration // datetime.timedelta(seconds=1)
+
+
 class Headline:
+    __slots__ = ("comment", "keyword", "level", "priority", "tags", "title")
+
     parse_regex = re.compile(
         r"(?P<level>#+)"
         r"(\s+(?P<keyword>DONE|TODO))?"
@@ -75,7 +203,7 @@ class Headline:
         r"\s*$"
     )
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         *args: typing.Any,
         comment: Union[None, bool] = None,
@@ -150,6 +278,8 @@ class Headline:
 
 
 class Clock:
+    __slots__ = ("end", "start")
+
     parse_regex = re.compile(
         # "CLOCK: (2024-11-12T00:00:00+00:00)"
         r"CLOCK:\s+"
@@ -193,21 +323,23 @@ class Clock:
 
         return end - self.start
 
+    def get_duration_seconds(self) -> int:
+        end = self.end
+        if end is None:
+            return 0
+
+        return to_epoch_seconds(end) - to_epoch_seconds(self.start)
+
     @classmethod
     def parse(cls, line: str) -> "None | typing.Self":
         match = cls.parse_regex.match(line)
         if not match:
             return None
 
-        start_unparsed = match.group("start")
-        start = datetime.datetime.strptime(start_unparsed, "%Y-%m-%dT%H:%M:%S%z")
+        start = parse_timestamp(match.group("start"))
 
         end_unparsed = match.group("end")
-        end = (
-            datetime.datetime.strptime(end_unparsed, "%Y-%m-%dT%H:%M:%S%z")
-            if end_unparsed is not None
-            else None
-        )
+        end = parse_timestamp(end_unparsed) if end_unparsed is not None else None
 
         self = cls(
             end=end,
@@ -218,13 +350,13 @@ class Clock:
 
     def to_string(self) -> str:
         start = self.start
-        start_string = start.strftime("%Y-%m-%dT%H:%M:%S%z")
+        start_string = format_timestamp(start)
 
         line_parts = ["CLOCK: (", start_string, ")"]
 
         end = self.end
         if end is not None:
-            end_string = end.strftime("%Y-%m-%dT%H:%M:%S%z")
+            end_string = format_timestamp(end)
             duration = end - start
             duration_string = str(duration)
             line_parts.extend(("--(", end_string, ") => ", duration_string))
@@ -234,26 +366,52 @@ class Clock:
 
 
 class ParsedLine:
-    def __init__(
+    __slots__ = (
+        "clock",
+        "duration_seconds",
+        "headline",
+        "is_code_block_open",
+        "line",
+        "line_number",
+    )
+
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         *args: typing.Any,
         clock: Union[None, Clock] = None,
         duration: Union[None, datetime.timedelta] = None,
         headline: Union[None, Headline] = None,
+        is_code_block_open: bool = False,
         line: str,
         line_number: int,
         **kwargs: typing.Any
     ) -> None:
         super().__init__(*args, **kwargs)
-        if duration is None:
-            duration = datetime.timedelta()
-
         self.clock = clock
-        self.duration = duration
+        # Durations are stored as integer seconds to avoid `timedelta` math.
+        self.duration_seconds = 0 if duration is None else to_seconds(duration)
         self.headline = headline
+        # Whether a fenced code block is still open after this line.
+        self.is_code_block_open = is_code_block_open
         self.line = line
         self.line_number = line_number
 
+    def copy(self) -> "typing.Self":
+        # Headlines are not modified in place. Only clocks need copying.
+        new_parsed_line = copy.copy(self)
+        clock = self.clock
+        if clock is not None:
+            new_parsed_line.clock = copy.copy(clock)
+        return new_parsed_line
+
+    @property
+    def duration(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=self.duration_seconds)
+
+    @duration.setter
+    def duration(self, duration: datetime.timedelta) -> None:
+        self.duration_seconds = to_seconds(duration)
+
     def get_duration(self) -> datetime.timedelta:
         clock = self.clock
         if not clock:
@@ -264,6 +422,21 @@ class ParsedLine:
         duration = end - clock.start
         return duration
 
+    @classmethod
+    def parse(
+        cls, line: str, *, is_code_block_open: bool, line_number: int
+    ) -> "typing.Self":
+        self = cls(line=line, line_number=line_number)
+
+        if is_code_block_open:
+            self.is_code_block_open = line != "```"
+        elif line.startswith("```"):
+            self.is_code_block_open = True
+        else:
+            self.reparse_line()
+
+        return self
+
     def reparse_line(self) -> None:
         headline = self.headline = Headline.parse(self.line)
         if headline is None:
@@ -300,6 +473,42 @@ class ParsedLine:
         return line
 
 
+def _parse_fence_changes(
+    lines: Sequence[str],
+    parsed_lines: Sequence[ParsedLine],
+    *,
+    is_code_block_open: bool,
+    new_start: int,
+    old_start: int,
+) -> List[ParsedLine]:
+    """
+    Re-parse lines after a change while their fence state differs.
+
+    Lines from `lines[new_start]` correspond to old `parsed_lines`
+    from `old_start`. Parsing stops once the old state before a line
+    agrees with `is_code_block_open` again.
+    """
+
+    new_parsed_lines = []  # type: List[ParsedLine]
+    old_index = old_start
+    for index in range(new_start, len(lines)):
+        was_code_block_open = (
+            old_index > 0 and parsed_lines[old_index - 1].is_code_block_open
+        )
+        if was_code_block_open == is_code_block_open:
+            break
+
+        parsed_line = ParsedLine.parse(
+            lines[index],
+            is_code_block_open=is_code_block_open,
+            line_number=index + 1,
+        )
+        new_parsed_lines.append(parsed_line)
+        is_code_block_open = parsed_line.is_code_block_open
+        old_index += 1
+    return new_parsed_lines
+
+
 class ParsedDocument:
     def __init__(
         self,
@@ -311,9 +520,17 @@ class ParsedDocument:
         if parsed_lines is None:
             parsed_lines = []
 
-        self.duration = datetime.timedelta()
+        self.duration_seconds = 0
         self.parsed_lines = parsed_lines
 
+    @property
+    def duration(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=self.duration_seconds)
+
+    @duration.setter
+    def duration(self, duration: datetime.timedelta) -> None:
+        self.duration_seconds = to_seconds(duration)
+
     def bound_time_range(
         self, *, start: datetime.datetime, end: datetime.datetime
     ) -> None:
@@ -324,6 +541,13 @@ class ParsedDocument:
 
             clock.bound_time_range(start=start, end=end)
 
+    def copy(self) -> "typing.Self":
+        new_parsed_document = copy.copy(self)
+        new_parsed_document.parsed_lines = [
+            parsed_line.copy() for parsed_line in self.parsed_lines
+        ]
+        return new_parsed_document
+
     def end_first_clock(
         self, *, now: Union[None, datetime.datetime] = None
     ) -> Union[None, ParsedLine]:
@@ -345,6 +569,8 @@ class ParsedDocument:
         return None
 
     def get_fix_clocks_diff(self) -> List[Tuple[int, str]]:
+        """Get line number and new text of clock lines that need fixing."""
+
         fixes = []  # type: list[tuple[int, str]]
 
         last_level = 0
@@ -357,10 +583,9 @@ class ParsedDocument:
             if clock is None:
                 continue
 
-            new_clock_line = clock.to_string()
-            fixes.append(
-                (parsed_line.line_number, "#" * last_level + " " + new_clock_line)
-            )
+            new_line = "#" * last_level + " " + clock.to_string()
+            if new_line != parsed_line.line:
+                fixes.append((parsed_line.line_number, new_line))
 
         return fixes
 
@@ -391,54 +616,44 @@ class ParsedDocument:
     def parse(cls, lines: Iterator[str]) -> "typing.Self":
         self = cls()
 
-        is_inside_code_block = False
+        is_code_block_open = False
         parsed_lines = self.parsed_lines
         for line_number, line in enumerate(lines, start=1):
-            parsed_line = ParsedLine(
-                line=line,
-                line_number=line_number,
+            parsed_line = ParsedLine.parse(
+                line, is_code_block_open=is_code_block_open, line_number=line_number
             )
             parsed_lines.append(parsed_line)
-
-            if is_inside_code_block:
-                if line == "```":
-                    is_inside_code_block = False
-                continue
-            if line.startswith("```"):
-                is_inside_code_block = True
-                continue
-
-            parsed_line.reparse_line()
+            is_code_block_open = parsed_line.is_code_block_open
 
         return self
 
     def refresh_durations(self) -> None:
-        # Level zero is root.
-        child_level_durations = [datetime.timedelta()]
+        # Level zero is root. Durations are in seconds.
+        child_level_durations = [0]
         for parsed_line in reversed(self.parsed_lines):
             headline = parsed_line.headline
             if not headline:
                 continue
 
-            duration = datetime.timedelta()
+            duration = 0
 
             clock = parsed_line.clock
             if clock is not None:
-                duration = clock.get_duration()
+                duration = clock.get_duration_seconds()
 
             level = headline.level
-            duration = parsed_line.duration = sum(
+            duration = parsed_line.duration_seconds = sum(
                 child_level_durations[level + 1 :], duration
             )
 
             missing_levels = level + 1 - len(child_level_durations)
             if missing_levels > 0:
-                child_level_durations += [datetime.timedelta()] * missing_levels
+                child_level_durations += [0] * missing_levels
             else:
                 child_level_durations = child_level_durations[: level + 1]
             child_level_durations[level] += duration
 
-        self.duration = sum(child_level_durations, datetime.timedelta())
+        self.duration_seconds = sum(child_level_durations)
 
     def start_clock(self, *, line_number: int, now: datetime.datetime) -> ParsedLine:
         # Does not add to the document.
@@ -464,8 +679,756 @@ class ParsedDocument:
             line_number=new_line_number,
         )
 
+    def update(
+        self, lines: Sequence[str], *, start: int, old_end: int, new_end: int
+    ) -> None:
+        """
+        Re-parse `lines[start:new_end]`, replacing old lines `start:old_end`.
+
+        The `lines` are the full new content of the document.
+        Indices are zero-based with exclusive ends,
+        as returned by `get_changed_range`.
+        Lines after the change are re-parsed only
+        while their fenced code block state differs from before.
+
+        The update is copy on write.
+        The list of parsed lines is replaced, not modified,
+        and lines after the change are replaced by shifted copies,
+        so earlier `parsed_lines` and indices built from them stay valid.
+        """
+
+        parsed_lines = self.parsed_lines
+        is_code_block_open = start > 0 and parsed_lines[start - 1].is_code_block_open
+
+        new_parsed_lines = []  # type: list[ParsedLine]
+        for index in range(start, new_end):
+            parsed_line = ParsedLine.parse(
+                lines[index],
+                is_code_block_open=is_code_block_open,
+                line_number=index + 1,
+            )
+            new_parsed_lines.append(parsed_line)
+            is_code_block_open = parsed_line.is_code_block_open
+
+        # A fence change can flip the state of every line after it.
+        fence_parsed_lines = _parse_fence_changes(
+            lines,
+            parsed_lines,
+            is_code_block_open=is_code_block_open,
+            new_start=new_end,
+            old_start=old_end,
+        )
+        new_parsed_lines.extend(fence_parsed_lines)
+        old_index = old_end + len(fence_parsed_lines)
+
+        updated_lines = parsed_lines[:start]
+        updated_lines.extend(new_parsed_lines)
+        offset = new_end - old_end
+        if offset:
+            for parsed_line in itertools.islice(parsed_lines, old_index, None):
+                shifted_line = copy.copy(parsed_line)
+                shifted_line.line_number += offset
+                updated_lines.append(shifted_line)
+        else:
+            updated_lines.extend(itertools.islice(parsed_lines, old_index, None))
+        self.parsed_lines = updated_lines
+
+
+def merge_line_changes(
+    changes: typing.Iterable[Tuple[int, str]],
+) -> List[Tuple[int, List[str]]]:
+    """
+    Merge changes of adjacent lines.
+
+    Changes are line numbers and new text, in increasing line number.
+    Returns first line number and new text of each run of adjacent lines,
+    so each run can be replaced with one slice assignment.
+    """
+
+    ranges = []  # type: list[tuple[int, list[str]]]
+    for line_number, line in changes:
+        if ranges:
+            start, lines = ranges[-1]
+            if start + len(lines) == line_number:
+                lines.append(line)
+                continue
+        ranges.append((line_number, [line]))
+    return ranges
+
+
+def get_changed_range(
+    old_lines: Sequence[str], new_lines: Sequence[str]
+) -> Tuple[int, int, int]:
+    """
+    Find the smallest range of lines that differ.
+
+    Returns `(start, old_end, new_end)` such that replacing
+    `old_lines[start:old_end]` with `new_lines[start:new_end]`
+    gives `new_lines`.
+    """
+
+    old_end = len(old_lines)
+    new_end = len(new_lines)
+
+    start = 0
+    common_count = min(old_end, new_end)
+    while start < common_count and old_lines[start] == new_lines[start]:
+        start += 1
+
+    while (
+        old_end > start
+        and new_end > start
+        and old_lines[old_end - 1] == new_lines[new_end - 1]
+    ):
+        old_end -= 1
+        new_end -= 1
+
+    return start, old_end, new_end
+
+
+def iter_lines(
+    stream: typing.TextIO, *, chunk_size: Union[None, int] = None
+) -> Iterator[str]:
+    """
+    Read lines from `stream` in chunks of `chunk_size` characters.
+
+    Lines are yielded without their trailing new line,
+    and only one chunk and the unfinished line are kept in memory.
+    """
+
+    if chunk_size is None:
+        chunk_size = DEFAULT_CHUNK_SIZE
+
+    unfinished_parts = []  # type: list[str]
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+
+        lines = chunk.split("\n")
+        if len(lines) == 1:
+            unfinished_parts.append(chunk)
+            continue
+
+        unfinished_parts.append(lines[0])
+        yield "".join(unfinished_parts)
+        unfinished_parts = [lines.pop()]
+        for index in range(1, len(lines)):
+            yield lines[index]
+
+    last_line = "".join(unfinished_parts)
+    if last_line:
+        yield last_line
+
+
+def iter_structure(
+    lines: typing.Iterable[str], *, tags: Sequence[str] = ()
+) -> Iterator[ParsedLine]:
+    """
+    Parse only headlines, clocks and fenced code block boundaries.
+
+    Other lines are skipped without creating a `ParsedLine`.
+    Fence lines can be recognised by their `is_code_block_open`
+    being different from that of the previous yielded fence.
+    If `tags` are given, clocks under headlines without all of them,
+    inherited or not, are skipped the same way,
+    before their timestamps are parsed.
+    """
+
+    required_tags = frozenset(tags)
+    # Level and tags, including inherited ones, of open headlines.
+    headline_stack = []  # type: list[tuple[int, typing.FrozenSet[str]]]
+
+    is_code_block_open = False
+    for line_number, line in enumerate(lines, start=1):
+        if is_code_block_open:
+            if line != "```":
+                continue
+        elif not line.startswith(("#", "```")):
+            continue
+        elif required_tags and line.startswith("#"):
+            # Clocks are told apart without the headline regular expression.
+            title = line.lstrip("#")
+            if title[:1].isspace() and title.lstrip().startswith("CLOCK:"):
+                level = len(line) - len(title)
+                while headline_stack and headline_stack[-1][0] >= level:
+                    headline_stack.pop()
+                if not headline_stack or not required_tags <= headline_stack[-1][1]:
+                    continue
+
+        parsed_line = ParsedLine.parse(
+            line, is_code_block_open=is_code_block_open, line_number=line_number
+        )
+        is_code_block_open = parsed_line.is_code_block_open
+
+        headline = parsed_line.headline
+        if required_tags and headline is not None:
+            level = headline.level
+            while headline_stack and headline_stack[-1][0] >= level:
+                headline_stack.pop()
+            if parsed_line.clock is None:
+                combination = headline_stack[-1][1] if headline_stack else frozenset()
+                if headline.tags:
+                    combination = combination.union(headline.tags)
+                headline_stack.append((level, combination))
+
+        yield parsed_line
+
+
+class DurationAccumulator:
+    """
+    Sum durations of headlines from a stream of parsed lines.
+
+    Gives the durations `ParsedDocument.refresh_durations` would,
+    but only keeps headlines containing the current line in memory.
+    Headlines are returned once all lines they contain are fed,
+    so children are returned before their parents.
+    """
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.duration_seconds = 0
+        self._headline_stack = []  # type: list[tuple[int, ParsedLine]]
+
+    @property
+    def duration(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=self.duration_seconds)
+
+    def feed(self, parsed_line: ParsedLine) -> List[ParsedLine]:
+        headline = parsed_line.headline
+        if headline is None:
+            return []
+
+        level = headline.level
+        closed_lines = self._close(level)
+
+        clock = parsed_line.clock
+        parsed_line.duration_seconds = (
+            0 if clock is None else clock.get_duration_seconds()
+        )
+        self._headline_stack.append((level, parsed_line))
+        return closed_lines
+
+    def finish(self) -> List[ParsedLine]:
+        return self._close(0)
+
+    def _close(self, level: int) -> List[ParsedLine]:
+        closed_lines = []
+        headline_stack = self._headline_stack
+        while headline_stack and headline_stack[-1][0] >= level:
+            _, closed_line = headline_stack.pop()
+            duration = closed_line.duration_seconds
+            if headline_stack:
+                headline_stack[-1][1].duration_seconds += duration
+            else:
+                self.duration_seconds += duration
+            closed_lines.append(closed_line)
+        return closed_lines
+
+
+# Smaller than any end in epoch seconds. Fills unused leaves of the tree.
+_NO_END = -(1 << 63)
+
+
+def get_max_end_tree_size(clock_count: int) -> int:
+    """Get length of `ClockIndex.max_end_tree` for `clock_count` clocks."""
+
+    leaf_count = 1
+    while leaf_count < clock_count:
+        leaf_count *= 2
+    return 2 * leaf_count
+
+
+def _build_max_end_tree(ends: Sequence[int]) -> "array.array[int]":
+    tree_size = get_max_end_tree_size(len(ends))
+    leaf_count = tree_size // 2
+    tree = array.array("q", [_NO_END]) * tree_size
+    tree[leaf_count : leaf_count + len(ends)] = array.array("q", ends)
+    for node in range(leaf_count - 1, 0, -1):
+        tree[node] = max(tree[2 * node], tree[2 * node + 1])
+    return tree
+
+
+def _iter_clock_entries(
+    parsed_lines: Sequence[ParsedLine],
+) -> Iterator[Tuple[int, int, int, List[int]]]:
+    # Start and end in epoch seconds, position, and positions of headlines
+    # containing it, from outermost, of each closed clock.
+    headline_stack = []  # type: list[tuple[int, int]]
+    for index, parsed_line in enumerate(parsed_lines):
+        headline = parsed_line.headline
+        if headline is None:
+            continue
+
+        level = headline.level
+        while headline_stack and headline_stack[-1][0] >= level:
+            headline_stack.pop()
+
+        clock = parsed_line.clock
+        if clock is not None and clock.end is not None:
+            yield (
+                to_epoch_seconds(clock.start),
+                to_epoch_seconds(clock.end),
+                index,
+                [ancestor_index for _, ancestor_index in headline_stack],
+            )
+
+        headline_stack.append((level, index))
+
+
+class ClockIndex:
+    """
+    Closed clocks of a document sorted by start time.
+
+    Answers which clocks overlap a time range
+    with a tree of largest ends instead of walking every parsed line.
+    Clock data is stored in columns of epoch seconds,
+    and `Clock` objects are only copied for lines to be rendered.
+    Open clocks have no duration and are not indexed.
+    The document must not be changed while the index is in use.
+    """
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        parsed_lines: Union[None, Sequence[ParsedLine]] = None,
+        **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        if parsed_lines is None:
+            parsed_lines = []
+
+        # Columns may also be memory mapped. See `sidecar`.
+        #
+        # Headlines containing clock `i`, from outermost,
+        # as positions in `parsed_lines`, are
+        # `ancestor_indices[ancestor_offsets[i] : ancestor_offsets[i + 1]]`.
+        self.ancestor_indices = array.array("q")  # type: Sequence[int]
+        self.ancestor_offsets = array.array("q", [0])  # type: Sequence[int]
+        self.ends = array.array("q")  # type: Sequence[int]
+        # Position of each clock in `parsed_lines`.
+        self.indices = array.array("q")  # type: Sequence[int]
+        # Implicit binary tree over positions, with the largest end
+        # of the clocks under each node. Node 1 is the root,
+        # children of node `n` are `2 * n` and `2 * n + 1`,
+        # and the clock at position `p` is leaf `len(max_end_tree) // 2 + p`.
+        self.max_end_tree = array.array("q", [_NO_END, _NO_END])  # type: Sequence[int]
+        self.parsed_lines = parsed_lines
+        self.starts = array.array("q")  # type: Sequence[int]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def build(cls, parsed_document: ParsedDocument) -> "typing.Self":
+        parsed_lines = parsed_document.parsed_lines
+        self = cls(parsed_lines=parsed_lines)
+
+        # Sorted by start, then by position.
+        entries = sorted(
+            _iter_clock_entries(parsed_lines), key=lambda entry: (entry[0], entry[2])
+        )
+
+        ancestor_indices = array.array("q")
+        ancestor_offsets = array.array("q", [0])
+        ends = array.array("q")
+        indices = array.array("q")
+        starts = array.array("q")
+        for start_seconds, end_seconds, index, ancestors in entries:
+            ancestor_indices.extend(ancestors)
+            ancestor_offsets.append(len(ancestor_indices))
+            ends.append(end_seconds)
+            indices.append(index)
+            starts.append(start_seconds)
+
+        self.ancestor_indices = ancestor_indices
+        self.ancestor_offsets = ancestor_offsets
+        self.ends = ends
+        self.indices = indices
+        self.max_end_tree = _build_max_end_tree(ends)
+        self.starts = starts
+        return self
+
+    def get_bounded_clocks(
+        self, *, start: datetime.datetime, end: datetime.datetime
+    ) -> List[ParsedLine]:
+        """
+        Copy clocks overlapping `[start, end)`, bounded to the range.
+
+        The copies are ordered by start time,
+        and have their durations set to the bounded durations.
+        """
+
+        bounded_clocks = []
+        for position, duration in self.iter_bounded_durations(start=start, end=end):
+            parsed_line = self.parsed_lines[self.indices[position]].copy()
+            clock = parsed_line.clock
+            assert clock is not None
+            clock.bound_time_range(start=start, end=end)
+            parsed_line.duration_seconds = duration
+            bounded_clocks.append(parsed_line)
+        return bounded_clocks
+
+    def get_bounded_document(
+        self, *, start: datetime.datetime, end: datetime.datetime
+    ) -> ParsedDocument:
+        """
+        Create a document with durations bounded to `[start, end)`.
+
+        Only clocks overlapping the range and the headlines containing them
+        are in the new document,
+        with durations as `ParsedDocument.refresh_durations` would give
+        after `ParsedDocument.bound_time_range`.
+        """
+
+        start_seconds = to_epoch_seconds(start)
+        end_seconds = to_epoch_seconds(end)
+
+        bounded_lines = {}  # type: dict[int, ParsedLine]
+        total_duration = 0
+        for position in self.get_overlapping(start=start, end=end):
+            total_duration += self._add_bounded_duration(
+                bounded_lines,
+                position,
+                end=end,
+                end_seconds=end_seconds,
+                start=start,
+                start_seconds=start_seconds,
+            )
+        return _to_bounded_document(bounded_lines, duration_seconds=total_duration)
+
+    def get_bounded_documents(
+        self, boundaries: Sequence[datetime.datetime]
+    ) -> List[ParsedDocument]:
+        """
+        Split clocks at each of the sorted `boundaries` in a single pass.
+
+        Returns one document per consecutive pair of boundaries,
+        each being what `get_bounded_document` would give for that range.
+        """
+
+        range_count = len(boundaries) - 1
+        if range_count <= 0:
+            return []
+
+        boundary_seconds = array.array(
+            "q", (to_epoch_seconds(boundary) for boundary in boundaries)
+        )
+        range_lines = [{} for _ in range(range_count)]  # type: list[dict[int, ParsedLine]]
+        range_durations = [0] * range_count
+
+        starts = self.starts
+        ends = self.ends
+        for position in self.get_overlapping(start=boundaries[0], end=boundaries[-1]):
+            clock_start = starts[position]
+            clock_end = ends[position]
+            range_index = max(0, bisect.bisect_right(boundary_seconds, clock_start) - 1)
+            while range_index < range_count:
+                range_start = boundary_seconds[range_index]
+                if range_start >= clock_end:
+                    break
+                range_durations[range_index] += self._add_bounded_duration(
+                    range_lines[range_index],
+                    position,
+                    end=boundaries[range_index + 1],
+                    end_seconds=boundary_seconds[range_index + 1],
+                    start=boundaries[range_index],
+                    start_seconds=range_start,
+                )
+                range_index += 1
+
+        return [
+            _to_bounded_document(bounded_lines, duration_seconds=duration)
+            for bounded_lines, duration in zip(range_lines, range_durations)
+        ]
+
+    def get_clocked_document(self) -> ParsedDocument:
+        """
+        Create a document of headlines containing clocks, with durations.
+
+        Durations are as `ParsedDocument.refresh_durations` would give,
+        summed from the clock columns.
+        Only the headlines in the new document are copied.
+        """
+
+        parsed_lines = self.parsed_lines
+        bounded_lines = {}  # type: dict[int, ParsedLine]
+        for index, duration in self.get_headline_durations().items():
+            bounded_line = bounded_lines[index] = parsed_lines[index].copy()
+            bounded_line.duration_seconds = duration
+        return _to_bounded_document(
+            bounded_lines, duration_seconds=self.get_duration_seconds()
+        )
+
+    def get_duration_seconds(self) -> int:
+        return sum(self.ends) - sum(self.starts)
+
+    def get_headline_durations(self) -> Dict[int, int]:
+        """
+        Sum clocked seconds of headlines containing clocks.
+
+        Keys are positions in `parsed_lines`,
+        of clock lines and of the headlines containing them.
+        """
+
+        ancestor_indices = self.ancestor_indices
+        ancestor_offsets = self.ancestor_offsets
+        ends = self.ends
+        indices = self.indices
+        starts = self.starts
+        headline_durations = {}  # type: dict[int, int]
+        for position, index in enumerate(indices):
+            duration = ends[position] - starts[position]
+            headline_durations[index] = headline_durations.get(index, 0) + duration
+            for offset in range(
+                ancestor_offsets[position], ancestor_offsets[position + 1]
+            ):
+                ancestor_index = ancestor_indices[offset]
+                headline_durations[ancestor_index] = (
+                    headline_durations.get(ancestor_index, 0) + duration
+                )
+        return headline_durations
+
+    def get_overlapping(
+        self, *, start: datetime.datetime, end: datetime.datetime
+    ) -> List[int]:
+        """
+        Get positions of clocks overlapping `[start, end)`, in order.
+
+        Clocks starting at or after the range end are found by bisection.
+        Among the others, only subtrees with a clock ending after
+        the range start are visited,
+        so each of the `k` results costs at most `O(log n)`,
+        however long other clocks are.
+        """
+
+        start_seconds = to_epoch_seconds(start)
+        # Clocks starting at or after the range end cannot overlap.
+        high = bisect.bisect_left(self.starts, to_epoch_seconds(end))
+
+        tree = self.max_end_tree
+        leaf_count = len(tree) // 2
+        positions = []  # type: list[int]
+        nodes = [1]
+        while nodes:
+            node = nodes.pop()
+            if tree[node] <= start_seconds:
+                continue
+            depth = node.bit_length() - 1
+            # First position under the node.
+            if (node - (1 << depth)) * (leaf_count >> depth) >= high:
+                continue
+            if node >= leaf_count:
+                positions.append(node - leaf_count)
+                continue
+            # Left is popped first, so positions are in order.
+            nodes.append(2 * node + 1)
+            nodes.append(2 * node)
+        return positions
+
+    def iter_bounded_durations(
+        self, *, start: datetime.datetime, end: datetime.datetime
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Yield position and duration in seconds, bounded to `[start, end)`,
+        of clocks overlapping the range.
+        """
+
+        start_seconds = to_epoch_seconds(start)
+        end_seconds = to_epoch_seconds(end)
+        ends = self.ends
+        starts = self.starts
+        for position in self.get_overlapping(start=start, end=end):
+            yield position, min(ends[position], end_seconds) - max(
+                starts[position], start_seconds
+            )
+
+    def _add_bounded_duration(  # pylint: disable=too-many-arguments
+        self,
+        bounded_lines: Dict[int, ParsedLine],
+        position: int,
+        *,
+        end: datetime.datetime,
+        end_seconds: int,
+        start: datetime.datetime,
+        start_seconds: int
+    ) -> int:
+        # Add duration of the clock at `position` bounded to `[start, end)`
+        # to bounded copies of the clock line and its headlines.
+        # Returns the bounded duration in seconds.
+
+        parsed_lines = self.parsed_lines
+
+        def get_bounded_line(index: int) -> ParsedLine:
+            bounded_line = bounded_lines.get(index)
+            if bounded_line is None:
+                bounded_line = bounded_lines[index] = parsed_lines[index].copy()
+                bounded_line.duration_seconds = 0
+                clock = bounded_line.clock
+                if clock is not None:
+                    clock.bound_time_range(start=start, end=end)
+            return bounded_line
+
+        duration = min(self.ends[position], end_seconds) - max(
+            self.starts[position], start_seconds
+        )
+
+        get_bounded_line(self.indices[position]).duration_seconds += duration
+        ancestor_offsets = self.ancestor_offsets
+        for offset in range(ancestor_offsets[position], ancestor_offsets[position + 1]):
+            get_bounded_line(self.ancestor_indices[offset]).duration_seconds += duration
+
+        return duration
+
+
+# Position, line number, level and tags of a headline.
+HeadlineTags = Tuple[int, int, int, Sequence[str]]
+
+
+def iter_headline_tags(parsed_lines: Sequence[ParsedLine]) -> Iterator[HeadlineTags]:
+    for position, parsed_line in enumerate(parsed_lines):
+        headline = parsed_line.headline
+        if headline is None:
+            continue
+        yield position, parsed_line.line_number, headline.level, headline.tags or ()
+
+
+# Level, line number, inherited tags and own tags of an open headline.
+_TaggedHeadline = Tuple[int, int, typing.FrozenSet[str], Sequence[str]]
+
+
+class TagIndex:
+    """
+    Tags of headlines, including those inherited from containing headlines.
+
+    Positions are those of `ClockIndex.parsed_lines`,
+    so clocks found by a clock index can be grouped by tags.
+    """
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        # Distinct sets of tags, including inherited ones, seen on headlines.
+        self.combinations = []  # type: list[typing.FrozenSet[str]]
+        # Index into `combinations` of each headline position.
+        self.combination_ids = {}  # type: dict[int, int]
+        # Line numbers `[first, end)` of headlines in subtrees with each tag.
+        self.ranges = {}  # type: dict[str, list[tuple[int, int]]]
+
+    @classmethod
+    def build(cls, headlines: typing.Iterable[HeadlineTags]) -> "typing.Self":
+        """Build from headline tags in document order. See `iter_headline_tags`."""
+
+        self = cls()
+
+        combination_ids = self.combination_ids
+        known_combination_ids = {}  # type: dict[typing.FrozenSet[str], int]
+
+        headline_stack = []  # type: list[_TaggedHeadline]
+
+        last_line_number = 0
+        for position, line_number, level, tags in headlines:
+            self._close_headlines(
+                headline_stack, level=level, end_line_number=line_number
+            )
+            last_line_number = line_number
+
+            combination = headline_stack[-1][2] if headline_stack else frozenset()
+            if tags:
+                combination = combination.union(tags)
+            combination_ids[position] = self._get_combination_id(
+                combination, known_combination_ids
+            )
+
+            headline_stack.append((level, line_number, combination, tags))
+
+        self._close_headlines(
+            headline_stack, level=0, end_line_number=last_line_number + 1
+        )
+        for tag_ranges in self.ranges.values():
+            tag_ranges.sort()
+
+        return self
+
+    def _close_headlines(
+        self,
+        headline_stack: "list[_TaggedHeadline]",
+        *,
+        level: int,
+        end_line_number: int
+    ) -> None:
+        # Record ranges of headlines at or below `level` ending before the line.
+        ranges = self.ranges
+        while headline_stack and headline_stack[-1][0] >= level:
+            _, line_number, _, tags = headline_stack.pop()
+            for tag in tags:
+                ranges.setdefault(tag, []).append((line_number, end_line_number))
+
+    def _get_combination_id(
+        self,
+        combination: typing.FrozenSet[str],
+        known_combination_ids: "dict[typing.FrozenSet[str], int]",
+    ) -> int:
+        combination_id = known_combination_ids.get(combination)
+        if combination_id is None:
+            combinations = self.combinations
+            combination_id = known_combination_ids[combination] = len(combinations)
+            combinations.append(combination)
+        return combination_id
+
+    def rollup(
+        self,
+        clock_index: ClockIndex,
+        *,
+        start: datetime.datetime,
+        end: datetime.datetime
+    ) -> "TagRollup":
+        """Sum clocked time in `[start, end)` by tag and by tag combination."""
+
+        combination_ids = self.combination_ids
+        indices = clock_index.indices
+        combination_durations = {}  # type: dict[int, int]
+        for position, duration in clock_index.iter_bounded_durations(
+            start=start, end=end
+        ):
+            combination_id = combination_ids[indices[position]]
+            combination_durations[combination_id] = (
+                combination_durations.get(combination_id, 0) + duration
+            )
+
+        tag_rollup = TagRollup()
+        for combination_id, duration in combination_durations.items():
+            combination = self.combinations[combination_id]
+            tag_rollup.combination_durations[combination] = duration
+            tag_rollup.duration_seconds += duration
+            tag_durations = tag_rollup.tag_durations
+            for tag in combination:
+                tag_durations[tag] = tag_durations.get(tag, 0) + duration
+        return tag_rollup
+
+
+class TagRollup:
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        # Durations are in seconds.
+        # Untagged time is under the empty combination.
+        self.combination_durations = {}  # type: dict[typing.FrozenSet[str], int]
+        self.duration_seconds = 0
+        self.tag_durations = {}  # type: dict[str, int]
+
+
+def _to_bounded_document(
+    bounded_lines: Dict[int, ParsedLine], *, duration_seconds: int
+) -> ParsedDocument:
+    bounded_document = ParsedDocument(
+        parsed_lines=[bounded_lines[index] for index in sorted(bounded_lines)]
+    )
+    bounded_document.duration_seconds = duration_seconds
+    return bounded_document
+
 
 class QuicklistItem:
+    __slots__ = ("lnum", "text")
+
     def __init__(
         self, *args: typing.Any, lnum: int, text: str, **kwargs: typing.Any
     ) -> None:
@@ -478,20 +1441,20 @@ def get_summary_quicklist(
     parsed_document: ParsedDocument,
 ) -> List[QuicklistItem]:
 
-    hour = datetime.timedelta(hours=1)
+    hour = 3600  # In seconds.
 
     quicklist = [
         QuicklistItem(lnum=1, text="| Duration / h | Headline"),
         QuicklistItem(
             lnum=1,
             text="| {hour_count:>12.2f} | {title}".format(
-                hour_count=parsed_document.duration / hour, title="Total"
+                hour_count=parsed_document.duration_seconds / hour, title="Total"
             ),
         ),
     ]
 
     for parsed_line in parsed_document.parsed_lines:
-        duration = parsed_line.duration
+        duration = parsed_line.duration_seconds
         if not duration:
             continue
 
@@ -517,20 +1480,270 @@ def get_summary_quicklist(
     return quicklist
 
 
+def get_tag_quicklist(
+    tag_rollup: TagRollup, tag_index: TagIndex
+) -> List[QuicklistItem]:
+    hour = 3600  # In seconds.
+    row_format = "| {hour_count:>12.2f} | {title}"
+
+    quicklist = [
+        QuicklistItem(lnum=1, text="| Duration / h | Tag"),
+        QuicklistItem(
+            lnum=1,
+            text=row_format.format(
+                hour_count=tag_rollup.duration_seconds / hour, title="Total"
+            ),
+        ),
+    ]
+
+    for tag, duration in sorted(tag_rollup.tag_durations.items()):
+        tag_ranges = tag_index.ranges.get(tag)
+        quicklist.append(
+            QuicklistItem(
+                lnum=tag_ranges[0][0] if tag_ranges else 1,
+                text=row_format.format(
+                    hour_count=duration / hour, title=":" + tag + ":"
+                ),
+            )
+        )
+
+    quicklist.append(QuicklistItem(lnum=1, text="| Duration / h | Tags"))
+    for combination, duration in sorted(
+        tag_rollup.combination_durations.items(),
+        key=lambda item: sorted(item[0]),
+    ):
+        if len(combination) == 1:
+            continue
+        title = "Untagged"
+        if combination:
+            title = ":" + ":".join(sorted(combination)) + ":"
+        quicklist.append(
+            QuicklistItem(
+                lnum=1,
+                text=row_format.format(hour_count=duration / hour, title=title),
+            )
+        )
+
+    return quicklist
+
+
+class CachedDocument:
+    __slots__ = ("content_hash", "mtime_ns", "parsed_document", "size")
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        content_hash: str,
+        mtime_ns: int,
+        parsed_document: ParsedDocument,
+        size: int,
+        **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.content_hash = content_hash
+        self.mtime_ns = mtime_ns
+        self.parsed_document = parsed_document
+        self.size = size
+
+
+# Version 2 keeps headlines only.
+CACHE_VERSION = 2
+
+
+def get_cache_directory() -> pathlib.Path:
+    return xdg.AppDirectories(app_name="taskmd").cache_home
+
+
+def get_cache_path(
+    path: pathlib.Path, *, cache_directory: pathlib.Path
+) -> pathlib.Path:
+    path_hash = hashlib.sha256(str(path.resolve()).encode("utf-8")).hexdigest()
+    return cache_directory / (path_hash + ".pickle")
+
+
+def read_cached_document(cache_path: pathlib.Path) -> Union[None, CachedDocument]:
+    try:
+        with cache_path.open("rb") as cache_file:
+            version, cached_document = pickle.load(cache_file)
+    except FileNotFoundError:
+        return None
+    except OSError as error:
+        _logger.warning("Unable to read cache file %s: %s", cache_path, error)
+        return None
+    except (
+        AttributeError,
+        EOFError,
+        ImportError,
+        IndexError,
+        TypeError,
+        ValueError,
+        pickle.UnpicklingError,
+    ):
+        _logger.warning("Ignoring unreadable cache file: %s", cache_path)
+        return None
+    if version != CACHE_VERSION or not isinstance(cached_document, CachedDocument):
+        return None
+    return cached_document
+
+
+def write_cached_document(
+    cache_path: pathlib.Path, cached_document: CachedDocument
+) -> None:
+    xdg.ensure_directory_exists(cache_path.parent)
+    # Write to a temporary file first so readers never see a partial file.
+    temporary_path = cache_path.with_name(
+        "{name}.{pid}.tmp".format(name=cache_path.name, pid=os.getpid())
+    )
+    with temporary_path.open("wb") as cache_file:
+        pickle.dump(
+            (CACHE_VERSION, cached_document),
+            cache_file,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    os.replace(str(temporary_path), str(cache_path))
+
+
+def load_document(
+    path: pathlib.Path, *, cache_directory: Union[None, pathlib.Path] = None
+) -> CachedDocument:
+    """
+    Parse headlines of the file at `path`, with durations refreshed.
+
+    Other lines are not kept, so neither memory nor the cache holds them.
+    If `cache_directory` is given, a cached parse is used
+    if the file size and modification time are unchanged,
+    or if the content is unchanged despite them changing.
+    Otherwise the cache is updated after parsing.
+    Failing to write the cache does not fail the parse.
+    """
+
+    stat = path.stat()
+    mtime_ns = stat.st_mtime_ns
+    size = stat.st_size
+
+    cache_path = None  # type: Union[None, pathlib.Path]
+    cached_document = None  # type: Union[None, CachedDocument]
+    if cache_directory is not None:
+        cache_path = get_cache_path(path, cache_directory=cache_directory)
+        cached_document = read_cached_document(cache_path)
+        if (
+            cached_document is not None
+            and cached_document.mtime_ns == mtime_ns
+            and cached_document.size == size
+        ):
+            return cached_document
+
+    content = path.read_bytes()
+    content_hash = hashlib.sha256(content).hexdigest()
+    if cached_document is not None and cached_document.content_hash == content_hash:
+        # Touched but not changed.
+        cached_document.mtime_ns = mtime_ns
+        cached_document.size = size
+    else:
+        parsed_document = ParsedDocument(
+            parsed_lines=[
+                parsed_line
+                for parsed_line in iter_structure(content.decode("utf-8").splitlines())
+                if parsed_line.headline is not None
+            ]
+        )
+        parsed_document.refresh_durations()
+        cached_document = CachedDocument(
+            content_hash=content_hash,
+            mtime_ns=mtime_ns,
+            parsed_document=parsed_document,
+            size=size,
+        )
+
+    if cache_path is not None:
+        try:
+            write_cached_document(cache_path, cached_document)
+        except OSError as error:
+            _logger.warning("Unable to write cache file %s: %s", cache_path, error)
+    return cached_document
+
+
 class ParsedProject:
-    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+    # Documents are parsed by `load_document`, so only headlines are kept.
+    # They are cached under `cache_directory`,
+    # by default the taskmd directory under XDG_CACHE_HOME.
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        cache_directory: Union[None, pathlib.Path] = None,
+        **kwargs: typing.Any
+    ) -> None:
         super().__init__(*args, **kwargs)
-        self.duration = datetime.timedelta()
+        if cache_directory is None:
+            cache_directory = get_cache_directory()
+        self.cache_directory = cache_directory
+        self.duration_seconds = 0
         self.parsed_documents = {}  # type: dict[pathlib.Path, ParsedDocument]
+        # File size and modification time when each document was parsed.
+        self._stats = {}  # type: dict[pathlib.Path, tuple[int, int]]
+
+    @property
+    def duration(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=self.duration_seconds)
 
     @classmethod
-    def parse(cls, paths: List[pathlib.Path]) -> "typing.Self":
-        self = cls()
+    def parse(
+        cls,
+        paths: List[pathlib.Path],
+        *,
+        cache_directory: Union[None, pathlib.Path] = None,
+        max_workers: Union[None, int] = None
+    ) -> "typing.Self":
+        self = cls(cache_directory=cache_directory)
+        self.update(paths, max_workers=max_workers)
+        return self
+
+    def update(
+        self, paths: List[pathlib.Path], *, max_workers: Union[None, int] = None
+    ) -> List[pathlib.Path]:
+        """
+        Make the project consist of documents at `paths`.
+
+        Only new or modified files are parsed,
+        using a process pool if there are several of them,
+        unless `max_workers` is 1.
+        Processes cannot be used when running inside Vim.
+        Project totals are adjusted by the changed documents only.
+        Returns the paths that were parsed again.
+        """
 
         parsed_documents = self.parsed_documents
+        stats = self._stats
+
+        for removed_path in set(parsed_documents).difference(paths):
+            self.duration_seconds -= parsed_documents.pop(removed_path).duration_seconds
+            del stats[removed_path]
+
+        changed_paths = []  # type: list[pathlib.Path]
         for path in paths:
-            file_text = path.read_text(encoding="utf-8")
-            parsed_document = ParsedDocument.parse(file_text.splitlines())
+            stat = path.stat()
+            if stats.get(path) != (stat.st_mtime_ns, stat.st_size):
+                changed_paths.append(path)
+        if not changed_paths:
+            return changed_paths
+
+        load = functools.partial(load_document, cache_directory=self.cache_directory)
+        if max_workers == 1 or len(changed_paths) == 1:
+            cached_documents = [load(path) for path in changed_paths]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers
+            ) as executor:
+                cached_documents = list(executor.map(load, changed_paths))
+
+        for path, cached_document in zip(changed_paths, cached_documents):
+            parsed_document = cached_document.parsed_document
+            old_parsed_document = parsed_documents.get(path)
+            if old_parsed_document is not None:
+                self.duration_seconds -= old_parsed_document.duration_seconds
+            self.duration_seconds += parsed_document.duration_seconds
             parsed_documents[path] = parsed_document
+            stats[path] = (cached_document.mtime_ns, cached_document.size)
 
-        return self
+        return changed_paths
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+
+# Need Python 3.5 support.
+# pylint: disable=consider-using-f-string
+
+# Report clocked time of many taskmd files.
+#
+# Files are parsed in worker processes,
+# which only send back durations of clocks matching the filters.
+# For example, a weekly timesheet of a team:
+#
+#     python3 -m bonipy35 taskmd report --group-by file --group-by day team/
+
+# Standard libraries.
+import argparse
+import concurrent.futures
+import csv
+import datetime
+import functools
+import glob
+import json
+import logging
+import pathlib
+import sys
+import typing
+
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+# Internal modules.
+from .. import logging_ext
+from . import data
+
+_logger = logging.getLogger(
+    __name__ if __name__ != "__main__" else __package__
+)
+
+FIELDS = ("file", "day", "tag", "headline")
+
+FORMATS = ("table", "csv", "ndjson")
+
+# Values of the grouped fields, in the order asked for.
+Key = Tuple[str, ...]
+
+# Seconds of each group, and seconds clocked.
+# Groups by tag overlap, so their seconds may add up to more than clocked.
+Summary = Tuple[Dict[Key, int], int]
+
+
+def iter_paths(arguments: Iterable[str]) -> Iterator[pathlib.Path]:
+    """
+    Expand directories and glob patterns into files, without duplicates.
+
+    Directories are searched recursively for markdown files.
+    """
+
+    seen = set()  # type: set[pathlib.Path]
+    for argument in arguments:
+        path = pathlib.Path(argument)
+        if path.is_dir():
+            paths = sorted(path.rglob("*.md"))
+        elif any(character in argument for character in "*?["):
+            paths = sorted(
+                pathlib.Path(match)
+                for match in glob.glob(argument, recursive=True)
+            )
+        else:
+            paths = [path]
+
+        for path in paths:
+            if path in seen or path.is_dir():
+                continue
+            seen.add(path)
+            yield path
+
+
+def get_day_starts(
+    *, end: datetime.datetime, start: datetime.datetime
+) -> List[datetime.datetime]:
+    """Get boundaries of days from `start` to `end`, both included."""
+
+    day_starts = []  # type: List[datetime.datetime]
+    day_start = start
+    while day_start < end:
+        day_starts.append(day_start)
+        day_start += datetime.timedelta(days=1)
+    day_starts.append(end)
+    return day_starts
+
+
+def summarize_file(  # pylint: disable=too-many-locals
+    path: pathlib.Path,
+    *,
+    end: datetime.datetime,
+    group_by: Sequence[str],
+    start: datetime.datetime,
+    tags: Sequence[str]
+) -> Summary:
+    """
+    Sum clocked seconds in `[start, end)` of a file, grouped by `group_by`.
+
+    Only clocks under headlines with all of `tags`, inherited or not,
+    are counted.
+    Clocks without the tags are skipped while reading,
+    before their timestamps are parsed.
+    Clocks outside of the range are skipped using the clock index.
+    """
+
+    with path.open(encoding="utf-8") as stream:
+        parsed_lines = list(
+            data.iter_structure(data.iter_lines(stream), tags=tags)
+        )
+    clock_index = data.ClockIndex.build(
+        data.ParsedDocument(parsed_lines=parsed_lines)
+    )
+    tag_index = data.TagIndex.build(data.iter_headline_tags(parsed_lines))
+
+    required_tags = frozenset(tags)
+    matching_ids = frozenset(
+        combination_id
+        for combination_id, combination in enumerate(tag_index.combinations)
+        if required_tags <= combination
+    )
+    if not matching_ids:
+        return {}, 0
+
+    if "day" in group_by:
+        boundaries = get_day_starts(end=end, start=start)
+    else:
+        boundaries = [start, end]
+
+    ancestor_indices = clock_index.ancestor_indices
+    ancestor_offsets = clock_index.ancestor_offsets
+    combination_ids = tag_index.combination_ids
+    indices = clock_index.indices
+
+    durations = {}  # type: Dict[Key, int]
+    total_seconds = 0
+    for day_start, day_end in zip(boundaries, boundaries[1:]):
+        values = {
+            "day": day_start.date().isoformat(),
+            "file": str(path),
+        }  # type: Dict[str, str]
+        for position, seconds in clock_index.iter_bounded_durations(
+            start=day_start, end=day_end
+        ):
+            if not seconds:
+                continue
+            combination_id = combination_ids[indices[position]]
+            if combination_id not in matching_ids:
+                continue
+            total_seconds += seconds
+
+            if "headline" in group_by:
+                # Title of the headline directly containing the clock.
+                ancestor_end = ancestor_offsets[position + 1]
+                title = ""
+                if ancestor_end > ancestor_offsets[position]:
+                    parent = parsed_lines[ancestor_indices[ancestor_end - 1]]
+                    assert parent.headline is not None
+                    title = parent.headline.title or ""
+                values["headline"] = title
+
+            tag_values = [""]  # type: Sequence[str]
+            if "tag" in group_by:
+                tag_values = sorted(
+                    tag_index.combinations[combination_id]
+                ) or [""]
+            for tag in tag_values:
+                values["tag"] = tag
+                key = tuple(values[field] for field in group_by)
+                durations[key] = durations.get(key, 0) + seconds
+
+    return durations, total_seconds
+
+
+def iter_summaries(  # pylint: disable=too-many-arguments
+    paths: Sequence[pathlib.Path],
+    *,
+    end: datetime.datetime,
+    group_by: Sequence[str],
+    max_workers: Union[None, int] = None,
+    start: datetime.datetime,
+    tags: Sequence[str]
+) -> Iterator[Summary]:
+    """
+    Summarize files, in worker processes unless `max_workers` is 1.
+
+    Summaries are yielded in the order of `paths`,
+    each as soon as it and those before it are done.
+    Files that cannot be read are logged and skipped.
+    """
+
+    summarize = functools.partial(
+        summarize_file, end=end, group_by=group_by, start=start, tags=tags
+    )
+    if max_workers == 1 or len(paths) <= 1:
+        for path in paths:
+            try:
+                yield summarize(path)
+            except (OSError, UnicodeDecodeError) as error:
+                _logger.error("Unable to read %s: %s", path, error)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers
+    ) as executor:
+        futures = [executor.submit(summarize, path) for path in paths]
+        for path, future in zip(paths, futures):
+            try:
+                yield future.result()
+            except (OSError, UnicodeDecodeError) as error:
+                _logger.error("Unable to read %s: %s", path, error)
+
+
+class Writer:
+    """Write rows of grouped durations in one of `FORMATS`."""
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        format_name: str,
+        group_by: Sequence[str],
+        stream: typing.TextIO,
+        **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.format_name = format_name
+        self.group_by = group_by
+        self.stream = stream
+        self._csv_writer = csv.writer(stream)
+
+    def write_header(self) -> None:
+        if self.format_name == "table":
+            self.stream.write(
+                "| Duration / h | {fields}\n".format(
+                    fields=" | ".join(self.group_by)
+                )
+            )
+        elif self.format_name == "csv":
+            self._csv_writer.writerow(list(self.group_by) + ["seconds"])
+
+    def write_rows(self, durations: Dict[Key, int]) -> None:
+        stream = self.stream
+        for key in sorted(durations):
+            seconds = durations[key]
+            if self.format_name == "table":
+                stream.write(
+                    "| {hour_count:>12.2f} | {values}\n".format(
+                        hour_count=seconds / 3600, values=" | ".join(key)
+                    )
+                )
+            elif self.format_name == "csv":
+                self._csv_writer.writerow(list(key) + [seconds])
+            else:
+                row = dict(
+                    zip(self.group_by, key)
+                )  # type: Dict[str, typing.Any]
+                row["seconds"] = seconds
+                stream.write(json.dumps(row, sort_keys=True) + "\n")
+        stream.flush()
+
+    def write_footer(self, *, total_seconds: int) -> None:
+        if self.format_name == "table":
+            self.stream.write(
+                "| {hour_count:>12.2f} | Total\n".format(
+                    hour_count=total_seconds / 3600
+                )
+            )
+
+
+def run(  # pylint: disable=too-many-arguments,too-many-locals
+    *,
+    end: datetime.datetime,
+    format_name: str,
+    group_by: Sequence[str],
+    max_workers: Union[None, int],
+    path_arguments: Sequence[str],
+    start: datetime.datetime,
+    tags: Sequence[str]
+) -> int:
+    # Sorted so that rows of each file are written in the same order every run.
+    paths = sorted(iter_paths(path_arguments))
+    if not paths:
+        _logger.error("No files found.")
+        return 1
+
+    writer = Writer(
+        format_name=format_name, group_by=group_by, stream=sys.stdout
+    )
+    writer.write_header()
+    summaries = iter_summaries(
+        paths,
+        end=end,
+        group_by=group_by,
+        max_workers=max_workers,
+        start=start,
+        tags=tags,
+    )
+    total_seconds = 0
+    if "file" in group_by:
+        # Rows of different files never merge, so they can be written early.
+        for durations, file_seconds in summaries:
+            writer.write_rows(durations)
+            total_seconds += file_seconds
+    else:
+        merged_durations = {}  # type: Dict[Key, int]
+        for durations, file_seconds in summaries:
+            for key, seconds in durations.items():
+                merged_durations[key] = merged_durations.get(key, 0) + seconds
+            total_seconds += file_seconds
+        writer.write_rows(merged_durations)
+    writer.write_footer(total_seconds=total_seconds)
+    return 0
+
+
+def add_path_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "path_arguments",
+        help="Files, directories of markdown files, or glob patterns.",
+        metavar="path",
+        nargs="+",
+    )
+
+
+def parse_date(value: str) -> datetime.date:
+    return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main(argv: "None | list[str]" = None) -> int:
+    """Parse command line arguments and call `run`."""
+
+    if argv is None:
+        argv = sys.argv
+
+    logging_ext.set_up_logging(logger=_logger)
+
+    parser = argparse.ArgumentParser(
+        description="Report clocked time of files."
+    )
+    logging_ext.add_verbose_flag(parser)
+    add_path_argument(parser)
+    parser.add_argument(
+        "--end", help="Day after the last day. Default: a week after start."
+    )
+    parser.add_argument("--format", choices=FORMATS, default="table")
+    parser.add_argument(
+        "--group-by",
+        action="append",
+        choices=FIELDS,
+        help="Field to group durations by, in order. Default: file.",
+    )
+    parser.add_argument(
+        "--jobs", help="Number of worker processes.", type=int
+    )
+    parser.add_argument(
+        "--start", help="First day. Default: Monday this week."
+    )
+    parser.add_argument(
+        "--tag",
+        action="append",
+        default=[],
+        dest="tags",
+        help="Only count clocks under headlines with this tag.",
+    )
+    parser.add_argument(
+        "--timezone", help="For example, +0800. Default: local."
+    )
+    arguments = parser.parse_args(argv[1:])
+
+    logging_ext.set_logger_verbosity(
+        logger=_logger, verbosity=arguments.verbosity
+    )
+
+    if arguments.timezone is not None:
+        data.config.set_timezone(arguments.timezone)
+    now = data.get_now()
+    try:
+        start_date = (
+            parse_date(arguments.start)
+            if arguments.start is not None
+            else now.date() - datetime.timedelta(days=now.weekday())
+        )
+        end_date = (
+            parse_date(arguments.end)
+            if arguments.end is not None
+            else start_date + datetime.timedelta(days=7)
+        )
+    except ValueError as error:
+        parser.error(str(error))
+
+    def to_datetime(date: datetime.date) -> datetime.datetime:
+        return datetime.datetime(
+            year=date.year, month=date.month, day=date.day, tzinfo=now.tzinfo
+        )
+
+    return run(
+        end=to_datetime(end_date),
+        format_name=arguments.format,
+        group_by=arguments.group_by or ["file"],
+        max_workers=arguments.jobs,
+        path_arguments=arguments.path_arguments,
+        start=to_datetime(start_date),
+        tags=arguments.tags,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
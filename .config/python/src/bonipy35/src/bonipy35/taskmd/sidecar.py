@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+
+# Need Python 3.5 support.
+# pylint: disable=consider-using-f-string
+
+# Binary index of headline and clock data of a taskmd file.
+#
+# The index is a header followed by columns of native 64-bit integers,
+# and finally the tag names.
+# Columns are memory mapped when loaded,
+# so reports can use them without parsing the markdown file.
+# Only the lines that end up in a report are read from the source file.
+
+# Standard libraries.
+import array
+import hashlib
+import logging
+import mmap
+import os
+import pathlib
+import struct
+import sys
+import typing
+
+from typing import Dict, List, Sequence, Tuple, Union
+
+# Internal modules.
+from .. import xdg
+from . import data
+
+_logger = logging.getLogger(__name__)
+
+MAGIC = b"TASKMDIX"
+# Version 2 stores a tree of largest clock ends.
+VERSION = 2
+
+# Magic, version, is little endian, source size, source modification time,
+# headline count, tag reference count, clock count, ancestor count,
+# and tag names size.
+_HEADER = struct.Struct("=8s9q")
+
+_ITEM_SIZE = array.array("q").itemsize
+
+
+def get_state_directory() -> pathlib.Path:
+    directory = xdg.AppDirectories(app_name="taskmd").state_home / "index"
+    xdg.ensure_directory_exists(directory)
+    return directory
+
+
+def get_sidecar_path(
+    source_path: pathlib.Path, *, directory: Union[None, pathlib.Path] = None
+) -> pathlib.Path:
+    """
+    Get where the index of `source_path` is stored.
+
+    The index is next to the source file by default,
+    or in `directory` named by a hash of the source path.
+    """
+
+    if directory is None:
+        return source_path.with_name(source_path.name + ".taskmd.idx")
+    path_hash = hashlib.sha256(
+        str(source_path.resolve()).encode("utf-8")
+    ).hexdigest()
+    return directory / (path_hash + ".taskmd.idx")
+
+
+class SourceLines(typing.Sequence[data.ParsedLine]):
+    """
+    Headlines parsed from the source file on access.
+
+    The file is only open while reading a headline not read before,
+    so nothing is left open however long this is kept.
+    """
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        line_numbers: Sequence[int],
+        offsets: Sequence[int],
+        source_path: pathlib.Path,
+        **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self._line_numbers = line_numbers
+        # Headlines read so far, by position.
+        self._lines = {}  # type: Dict[int, str]
+        self._offsets = offsets
+        self._source_path = source_path
+
+    @typing.overload
+    def __getitem__(self, index: int) -> data.ParsedLine: ...
+
+    @typing.overload
+    def __getitem__(self, index: slice) -> List[data.ParsedLine]: ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[data.ParsedLine, List[data.ParsedLine]]:
+        if isinstance(index, slice):
+            return [self[position] for position in range(len(self))[index]]
+
+        offset = self._offsets[index]
+        line = self._lines.get(offset)
+        if line is None:
+            with self._source_path.open("rb") as source_file:
+                source_file.seek(offset)
+                raw_line = source_file.readline()
+            if raw_line.endswith(b"\n"):
+                raw_line = raw_line[:-1]
+            line = self._lines[offset] = raw_line.decode("utf-8")
+        return data.ParsedLine.parse(
+            line,
+            is_code_block_open=False,
+            line_number=self._line_numbers[index],
+        )
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+
+def _get_column_sizes(header: Sequence[typing.Any]) -> List[int]:
+    # Item counts of the columns, in file order, from the header fields.
+    headline_count, tag_reference_count, clock_count, ancestor_count = header[
+        5:9
+    ]
+    return [
+        headline_count,
+        headline_count,
+        headline_count,
+        headline_count + 1,
+        tag_reference_count,
+        clock_count,
+        clock_count,
+        data.get_max_end_tree_size(clock_count),
+        clock_count,
+        clock_count + 1,
+        ancestor_count,
+    ]
+
+
+def _is_valid(buffer: mmap.mmap, *, source_path: pathlib.Path) -> bool:
+    # Whether the index in `buffer` is complete and matches the source file.
+    if len(buffer) < _HEADER.size:
+        return False
+    header = _HEADER.unpack_from(buffer)
+    magic, version, is_little_endian, source_size, source_mtime_ns = header[
+        :5
+    ]
+    if (
+        magic != MAGIC
+        or version != VERSION
+        or bool(is_little_endian) != (sys.byteorder == "little")
+    ):
+        return False
+
+    counts = header[5:]
+    if min(counts) < 0:
+        return False
+    columns_end = _HEADER.size + sum(_get_column_sizes(header)) * _ITEM_SIZE
+    if columns_end + header[9] != len(buffer):
+        return False
+    try:
+        buffer[columns_end:].decode("utf-8")
+    except UnicodeDecodeError:
+        return False
+
+    stat = source_path.stat()
+    return bool(
+        source_size == stat.st_size and source_mtime_ns == stat.st_mtime_ns
+    )
+
+
+class Sidecar:
+    def __init__(
+        self,
+        *args: typing.Any,
+        buffer: mmap.mmap,
+        source_path: pathlib.Path,
+        **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        # Columns are views into the buffer, which is kept open with them.
+        self._buffer = buffer
+        self.source_path = source_path
+
+        header = _HEADER.unpack_from(buffer)
+        self.source_size, self.source_mtime_ns = header[3:5]
+
+        column_sizes = iter(_get_column_sizes(header))
+        view = memoryview(buffer)
+        position = _HEADER.size
+
+        def take() -> Sequence[int]:
+            nonlocal position
+            start = position
+            position += next(column_sizes) * _ITEM_SIZE
+            return view[start:position].cast("q")
+
+        self.headline_offsets = take()
+        self.headline_line_numbers = take()
+        self.headline_levels = take()
+        self.headline_tag_offsets = take()
+        self.headline_tag_ids = take()
+        self.clock_starts = take()
+        self.clock_ends = take()
+        self.clock_max_end_tree = take()
+        self.clock_indices = take()
+        self.clock_ancestor_offsets = take()
+        self.clock_ancestor_indices = take()
+        tag_names = buffer[position:]
+        self.tag_names = (
+            tag_names.decode("utf-8").split("\n") if tag_names else []
+        )
+
+    @classmethod
+    def open(
+        cls, sidecar_path: pathlib.Path, *, source_path: pathlib.Path
+    ) -> Union[None, "typing.Self"]:
+        """
+        Open the index if it is still valid for the source file.
+
+        Index files that are stale, truncated or otherwise broken
+        are treated as missing.
+        """
+
+        try:
+            with sidecar_path.open("rb") as sidecar_file:
+                buffer = mmap.mmap(
+                    sidecar_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+        except (FileNotFoundError, ValueError):
+            # Value error if the file is empty.
+            return None
+
+        try:
+            is_valid = _is_valid(buffer, source_path=source_path)
+        except BaseException:
+            buffer.close()
+            raise
+        if not is_valid:
+            _logger.debug("Ignoring invalid index: %s", sidecar_path)
+            buffer.close()
+            return None
+        return cls(buffer=buffer, source_path=source_path)
+
+    def get_clock_index(self) -> data.ClockIndex:
+        clock_index = data.ClockIndex(
+            parsed_lines=SourceLines(
+                line_numbers=self.headline_line_numbers,
+                offsets=self.headline_offsets,
+                source_path=self.source_path,
+            )
+        )
+        clock_index.ancestor_indices = self.clock_ancestor_indices
+        clock_index.ancestor_offsets = self.clock_ancestor_offsets
+        clock_index.ends = self.clock_ends
+        clock_index.indices = self.clock_indices
+        clock_index.max_end_tree = self.clock_max_end_tree
+        clock_index.starts = self.clock_starts
+        return clock_index
+
+    def get_tag_index(self) -> data.TagIndex:
+        return data.TagIndex.build(self.iter_headline_tags())
+
+    def iter_headline_tags(self) -> typing.Iterator[data.HeadlineTags]:
+        levels = self.headline_levels
+        for position, line_number in enumerate(self.headline_line_numbers):
+            tags = self.get_tags(position)
+            yield position, line_number, levels[position], tags
+
+    def get_tags(self, headline_index: int) -> List[str]:
+        tag_names = self.tag_names
+        tag_ids = self.headline_tag_ids
+        return [
+            tag_names[tag_ids[position]]
+            for position in range(
+                self.headline_tag_offsets[headline_index],
+                self.headline_tag_offsets[headline_index + 1],
+            )
+        ]
+
+
+def _parse_headlines(
+    content: bytes,
+) -> Tuple[List[int], List[data.ParsedLine]]:
+    # Parse headlines, keeping their byte offsets.
+    # Body text is skipped without decoding.
+    offsets = []  # type: list[int]
+    parsed_lines = []  # type: list[data.ParsedLine]
+
+    is_code_block_open = False
+    offset = 0
+    for line_number, raw_line in enumerate(content.split(b"\n"), start=1):
+        line_offset = offset
+        offset += len(raw_line) + 1
+
+        if is_code_block_open:
+            if raw_line != b"```":
+                continue
+        elif not raw_line.startswith((b"#", b"```")):
+            continue
+
+        parsed_line = data.ParsedLine.parse(
+            raw_line.decode("utf-8"),
+            is_code_block_open=is_code_block_open,
+            line_number=line_number,
+        )
+        is_code_block_open = parsed_line.is_code_block_open
+        if parsed_line.headline is None:
+            continue
+
+        offsets.append(line_offset)
+        parsed_lines.append(parsed_line)
+
+    return offsets, parsed_lines
+
+
+def _get_tag_columns(
+    parsed_lines: Sequence[data.ParsedLine],
+) -> Tuple["array.array[int]", "array.array[int]", bytes]:
+    # Tag offsets and ids of each headline, and the tag names by id.
+    tag_ids = {}  # type: Dict[str, int]
+    headline_tag_ids = array.array("q")
+    headline_tag_offsets = array.array("q", [0])
+    for parsed_line in parsed_lines:
+        headline = parsed_line.headline
+        assert headline is not None
+        for tag in headline.tags or ():
+            headline_tag_ids.append(tag_ids.setdefault(tag, len(tag_ids)))
+        headline_tag_offsets.append(len(headline_tag_ids))
+    tag_names = "\n".join(sorted(tag_ids, key=tag_ids.__getitem__)).encode(
+        "utf-8"
+    )
+    return headline_tag_offsets, headline_tag_ids, tag_names
+
+
+def _write(
+    sidecar_path: pathlib.Path,
+    *,
+    header: bytes,
+    columns: Sequence[Sequence[int]],
+    tag_names: bytes
+) -> None:
+    # Write to a temporary file first so readers never see a partial file.
+    temporary_path = sidecar_path.with_name(
+        "{name}.{pid}.tmp".format(name=sidecar_path.name, pid=os.getpid())
+    )
+    with temporary_path.open("wb") as sidecar_file:
+        sidecar_file.write(header)
+        for column in columns:
+            assert isinstance(column, array.array)
+            column.tofile(sidecar_file)
+        sidecar_file.write(tag_names)
+    os.replace(str(temporary_path), str(sidecar_path))
+
+
+def build(
+    source_path: pathlib.Path, sidecar_path: pathlib.Path
+) -> data.ClockIndex:
+    """
+    Parse the source file and write its index.
+
+    Returns the clock index of the parsed source,
+    for use without opening the index just written.
+    """
+
+    stat = source_path.stat()
+    offsets, parsed_lines = _parse_headlines(source_path.read_bytes())
+    clock_index = data.ClockIndex.build(
+        data.ParsedDocument(parsed_lines=parsed_lines)
+    )
+    headline_tag_offsets, headline_tag_ids, tag_names = _get_tag_columns(
+        parsed_lines
+    )
+
+    columns = (
+        array.array("q", offsets),
+        array.array(
+            "q", (parsed_line.line_number for parsed_line in parsed_lines)
+        ),
+        array.array(
+            "q",
+            (
+                parsed_line.headline.level if parsed_line.headline else 0
+                for parsed_line in parsed_lines
+            ),
+        ),
+        headline_tag_offsets,
+        headline_tag_ids,
+        clock_index.starts,
+        clock_index.ends,
+        clock_index.max_end_tree,
+        clock_index.indices,
+        clock_index.ancestor_offsets,
+        clock_index.ancestor_indices,
+    )
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        sys.byteorder == "little",
+        stat.st_size,
+        stat.st_mtime_ns,
+        len(parsed_lines),
+        len(headline_tag_ids),
+        len(clock_index),
+        len(clock_index.ancestor_indices),
+        len(tag_names),
+    )
+    _write(sidecar_path, header=header, columns=columns, tag_names=tag_names)
+    return clock_index
+
+
+def load(
+    source_path: pathlib.Path, *, directory: Union[None, pathlib.Path] = None
+) -> Sidecar:
+    """
+    Open index of the source file, rebuilding it first if necessary.
+
+    See `get_sidecar_path` for where the index file is.
+    """
+
+    sidecar_path = get_sidecar_path(source_path, directory=directory)
+    sidecar = Sidecar.open(sidecar_path, source_path=source_path)
+    if sidecar is None:
+        _logger.debug("Rebuilding index of %s", source_path)
+        build(source_path, sidecar_path)
+        sidecar = Sidecar.open(sidecar_path, source_path=source_path)
+        if sidecar is None:
+            raise RuntimeError(
+                "Source changed while being indexed: {}".format(source_path)
+            )
+    return sidecar
+
+
+def load_clock_index(
+    source_path: pathlib.Path, *, directory: Union[None, pathlib.Path] = None
+) -> data.ClockIndex:
+    """
+    Get clock index of the source file from its index file.
+
+    The index file is rebuilt if missing or if the source has changed.
+    See `get_sidecar_path` for where the index file is.
+    """
+
+    sidecar_path = get_sidecar_path(source_path, directory=directory)
+    sidecar = Sidecar.open(sidecar_path, source_path=source_path)
+    if sidecar is not None:
+        return sidecar.get_clock_index()
+
+    _logger.debug("Rebuilding index of %s", source_path)
+    return build(source_path, sidecar_path)
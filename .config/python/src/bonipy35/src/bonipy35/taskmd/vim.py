@@ -3,27 +3,174 @@
 # This is work in progress. Leaving in TODO as progress reminder.
 # pylint: disable=fixme
 
-# TODO: Summarise total time by topic.
 # TODO: Summarise total time by time range.
 
 # Standard libraries.
+import collections
+import concurrent.futures
 import copy
 import datetime
+import functools
 import logging
+import pathlib
 import typing
 
 # External dependencies.
 import vim  # pylint: disable=import-error
 
 # Internal modules.
+from . import check
 from . import data
+from . import sidecar
 
 _logger = logging.getLogger(__name__)
 
 
+class BufferState:
+    """
+    Parse of a buffer at one changedtick.
+
+    A state is not modified once made, other than building its indices,
+    so reports computed in worker threads can share it.
+    A change to the buffer makes a new state.
+    """
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        changedtick: int,
+        lines: "list[str]",
+        parsed_document: data.ParsedDocument,
+        **kwargs: typing.Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.changedtick = changedtick
+        # Built on first use.
+        self.clock_index = None  # type: None | data.ClockIndex
+        self.lines = lines
+        self.parsed_document = parsed_document
+        self.tag_index = None  # type: None | data.TagIndex
+
+
+# Last parse of each buffer, keyed by buffer number,
+# from least to most recently used.
+buffer_states = (
+    collections.OrderedDict()
+)  # type: collections.OrderedDict[int, BufferState]
+
+# Number of buffers to keep parses of.
+BUFFER_STATE_CACHE_SIZE = 8
+
+
+def get_changedtick(buffer: vim.Buffer) -> int:
+    changedtick = vim.eval(f"getbufvar({buffer.number}, 'changedtick')")
+    assert isinstance(changedtick, str)
+    return int(changedtick)
+
+
+def get_buffer_state(buffer: vim.Buffer) -> BufferState:
+    # Only lines changed since the last parse are parsed again.
+    bufnr = buffer.number
+    changedtick = get_changedtick(buffer)
+    buffer_state = buffer_states.get(bufnr)
+    if buffer_state is None:
+        lines = buffer[:]
+        buffer_state = buffer_states[bufnr] = BufferState(
+            changedtick=changedtick,
+            lines=lines,
+            parsed_document=data.ParsedDocument.parse(iter(lines)),
+        )
+        while len(buffer_states) > BUFFER_STATE_CACHE_SIZE:
+            buffer_states.popitem(last=False)
+        return buffer_state
+
+    buffer_states.move_to_end(bufnr)
+    if buffer_state.changedtick != changedtick:
+        lines = buffer[:]
+        start, old_end, new_end = data.get_changed_range(buffer_state.lines, lines)
+        # The update is copy on write.
+        # Pending reports keep using the parse of the old state.
+        parsed_document = copy.copy(buffer_state.parsed_document)
+        parsed_document.update(lines, start=start, old_end=old_end, new_end=new_end)
+        buffer_state = buffer_states[bufnr] = BufferState(
+            changedtick=changedtick, lines=lines, parsed_document=parsed_document
+        )
+
+    return buffer_state
+
+
+def is_using_sidecar(buffer: vim.Buffer) -> bool:
+    # Only an unmodified buffer matches what was indexed from its file.
+    is_enabled = vim.eval("get(g:, 'bonipy35_taskmd_use_sidecar', 0)")
+    if is_enabled in ("", "0") or not buffer.name:
+        return False
+    is_modified = vim.eval(f"getbufvar({buffer.number}, '&modified')")
+    return is_modified == "0"
+
+
+def get_clock_index(buffer: vim.Buffer) -> data.ClockIndex:
+    if is_using_sidecar(buffer):
+        try:
+            return sidecar.load_clock_index(
+                pathlib.Path(buffer.name), directory=sidecar.get_state_directory()
+            )
+        except (OSError, RuntimeError) as error:
+            _logger.warning("Unable to use index of %s: %s", buffer.name, error)
+
+    return get_buffer_clock_index(get_buffer_state(buffer))
+
+
+def get_buffer_clock_index(buffer_state: BufferState) -> data.ClockIndex:
+    # Worker threads may build an index at the same time as the main thread.
+    # Both build the same index, and either can be kept.
+    clock_index = buffer_state.clock_index
+    if clock_index is None:
+        clock_index = buffer_state.clock_index = data.ClockIndex.build(
+            buffer_state.parsed_document
+        )
+    return clock_index
+
+
+def get_buffer_tag_index(buffer_state: BufferState) -> data.TagIndex:
+    tag_index = buffer_state.tag_index
+    if tag_index is None:
+        tag_index = buffer_state.tag_index = data.TagIndex.build(
+            data.iter_headline_tags(buffer_state.parsed_document.parsed_lines)
+        )
+    return tag_index
+
+
+def get_tag_indices(
+    buffer: vim.Buffer,
+) -> "tuple[data.ClockIndex, data.TagIndex]":
+    if is_using_sidecar(buffer):
+        try:
+            buffer_sidecar = sidecar.load(
+                pathlib.Path(buffer.name), directory=sidecar.get_state_directory()
+            )
+            return buffer_sidecar.get_clock_index(), buffer_sidecar.get_tag_index()
+        except (OSError, RuntimeError) as error:
+            _logger.warning("Unable to use index of %s: %s", buffer.name, error)
+
+    # Both indices are of the buffer parse, so that their positions agree.
+    # Positions in the index file are of headlines only.
+    buffer_state = get_buffer_state(buffer)
+    return get_buffer_clock_index(buffer_state), get_buffer_tag_index(buffer_state)
+
+
+def get_parsed_document(buffer: vim.Buffer) -> data.ParsedDocument:
+    # The cached parse is shared. Callers must not modify it.
+    return get_buffer_state(buffer).parsed_document
+
+
+def parse_buffer(buffer: vim.Buffer) -> data.ParsedDocument:
+    # Callers modify clocks and durations. Keep the cached parse intact.
+    return get_buffer_state(buffer).parsed_document.copy()
+
+
 def end_clock() -> None:
     buffer = vim.current.buffer
-    parsed_document = data.ParsedDocument.parse(buffer)
+    parsed_document = parse_buffer(buffer)
     new_parsed_line = parsed_document.end_first_clock()
     if not new_parsed_line:
         print("No clock has been started.")
@@ -34,15 +181,17 @@ def end_clock() -> None:
 
 def fix_clocks() -> None:
     buffer = vim.current.buffer
-    parsed_document = data.ParsedDocument.parse(buffer)
+    parsed_document = get_parsed_document(buffer)
     fixes = parsed_document.get_fix_clocks_diff()
-    for line_number, new_clock_line in fixes:
-        buffer[line_number - 1] = new_clock_line
+    # Changes from one command are undone together.
+    for line_number, new_lines in data.merge_line_changes(fixes):
+        start = line_number - 1
+        buffer[start : start + len(new_lines)] = new_lines
 
 
 def jump_to_started_clock() -> None:
     buffer = vim.current.buffer
-    parsed_document = data.ParsedDocument.parse(buffer)
+    parsed_document = get_parsed_document(buffer)
     started_clocks = list(parsed_document.get_started_clocks())
 
     if not started_clocks:
@@ -64,7 +213,7 @@ def start_clock() -> None:
     buffer = vim.current.buffer
     now = data.get_now()
 
-    parsed_document = data.ParsedDocument.parse(buffer)
+    parsed_document = parse_buffer(buffer)
     new_parsed_line = parsed_document.end_first_clock(now=now)
     if new_parsed_line:
         new_line_number = new_parsed_line.line_number
@@ -83,6 +232,277 @@ class QuicklistRow(typing.TypedDict):
     text: str
 
 
+# Rows given to each `setqflist` call.
+# Rows of the first call are shown before later calls append the rest.
+QUICKLIST_CHUNK_SIZE = 1000
+
+
+def get_setqflist() -> typing.Callable[..., object]:
+    # Neovim has no `vim.Function`, and calls functions through `vim.funcs`.
+    funcs = getattr(vim, "funcs", None)
+    if funcs is not None:
+        return typing.cast(typing.Callable[..., object], funcs.setqflist)
+    return vim.Function("setqflist")
+
+
+def set_quicklist(
+    quicklist_rows: typing.Sequence[QuicklistRow], *, title: str
+) -> None:
+    # Vim converts Python lists and dictionaries to Vim values natively.
+    # No Vimscript expression is built, so titles may contain any quotes.
+    setqflist = get_setqflist()
+    setqflist(
+        [], " ", {"items": quicklist_rows[:QUICKLIST_CHUNK_SIZE], "title": title}
+    )
+    vim.command(":copen")
+    vim.command(":wincmd p")
+
+    if len(quicklist_rows) > QUICKLIST_CHUNK_SIZE:
+        vim.command(":redraw")
+        for start in range(
+            QUICKLIST_CHUNK_SIZE, len(quicklist_rows), QUICKLIST_CHUNK_SIZE
+        ):
+            setqflist(
+                [], "a", {"items": quicklist_rows[start : start + QUICKLIST_CHUNK_SIZE]}
+            )
+
+
+def to_quicklist_rows(
+    quicklist: typing.Iterable[data.QuicklistItem], *, bufnr: int
+) -> "list[QuicklistRow]":
+    return [
+        QuicklistRow(
+            bufnr=bufnr, col=1, lnum=quicklist_item.lnum, text=quicklist_item.text
+        )
+        for quicklist_item in quicklist
+    ]
+
+
+class ReportSnapshot:
+    """
+    Buffer content for computing a report away from the main thread.
+
+    Vim must only be called from the main thread,
+    so everything needed from the buffer is taken beforehand.
+    Taking a snapshot parses only lines changed since the last parse.
+    The cached parse of the current changedtick is shared,
+    and its indices are built once for all reports of that changedtick.
+    """
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        bufnr: int,
+        buffer_state: "None | BufferState",
+        sidecar_source: "None | pathlib.Path",
+        **kwargs: typing.Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.bufnr = bufnr
+        # Parse of the buffer, if not using an index.
+        self.buffer_state = buffer_state
+        # File to use the index of, if using one.
+        # The buffer is unmodified, so the file has the same content.
+        self.sidecar_source = sidecar_source
+
+    @classmethod
+    def take(cls, buffer: vim.Buffer) -> "ReportSnapshot":
+        if is_using_sidecar(buffer):
+            return cls(
+                bufnr=buffer.number,
+                buffer_state=None,
+                sidecar_source=pathlib.Path(buffer.name),
+            )
+        return cls(
+            bufnr=buffer.number,
+            buffer_state=get_buffer_state(buffer),
+            sidecar_source=None,
+        )
+
+    def get_clock_index(self) -> data.ClockIndex:
+        sidecar_source = self.sidecar_source
+        if sidecar_source is not None:
+            try:
+                return sidecar.load_clock_index(
+                    sidecar_source, directory=sidecar.get_state_directory()
+                )
+            except (OSError, RuntimeError) as error:
+                _logger.warning("Unable to use index of %s: %s", sidecar_source, error)
+            return data.ClockIndex.build(self.parse())
+        assert self.buffer_state is not None
+        return get_buffer_clock_index(self.buffer_state)
+
+    def parse(self) -> data.ParsedDocument:
+        """Get the content parsed. Each call gives a new document to modify."""
+
+        buffer_state = self.buffer_state
+        if buffer_state is not None:
+            return buffer_state.parsed_document.copy()
+        assert self.sidecar_source is not None
+        with self.sidecar_source.open(encoding="utf-8") as source:
+            return data.ParsedDocument.parse(data.iter_lines(source))
+
+
+class ReportJob:
+    def __init__(
+        self,
+        *args: typing.Any,
+        changedtick: int,
+        future: "concurrent.futures.Future[list[QuicklistRow]]",
+        key: "tuple[typing.Any, ...]",
+        title: str,
+        **kwargs: typing.Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.changedtick = changedtick
+        self.future = future
+        # Identifies the report and its arguments, for coalescing requests.
+        self.key = key
+        self.title = title
+
+
+class ReportState:
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.executor = None  # type: None | concurrent.futures.ThreadPoolExecutor
+        # Pending report of each buffer, keyed by buffer number.
+        self.jobs = {}  # type: dict[int, ReportJob]
+        # Timer checking for finished reports, while there are pending ones.
+        self.timer = None  # type: None | int
+
+
+report_state = ReportState()
+
+# Milliseconds between checks for finished reports.
+REPORT_POLL_INTERVAL = 50
+
+
+def submit_report(
+    buffer: vim.Buffer,
+    *,
+    compute: "typing.Callable[[ReportSnapshot], list[QuicklistRow]]",
+    key: "tuple[typing.Any, ...]",
+    title: str,
+) -> None:
+    """
+    Compute a report in a worker thread and show it when done.
+
+    A buffer has at most one pending report.
+    Requesting the same report again while it is pending does nothing,
+    and requesting a different one replaces it.
+    Reports of buffers changed since the request are discarded.
+    """
+
+    report_jobs = report_state.jobs
+
+    bufnr = buffer.number
+    changedtick = get_changedtick(buffer)
+    report_job = report_jobs.get(bufnr)
+    if report_job is not None:
+        if report_job.key == key and report_job.changedtick == changedtick:
+            return
+        report_job.future.cancel()
+
+    executor = report_state.executor
+    if executor is None:
+        executor = report_state.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="taskmd-report"
+        )
+    snapshot = ReportSnapshot.take(buffer)
+    report_jobs[bufnr] = ReportJob(
+        changedtick=changedtick,
+        future=executor.submit(compute, snapshot),
+        key=key,
+        title=title,
+    )
+
+    if report_state.timer is None:
+        timer = vim.eval(
+            f"timer_start({REPORT_POLL_INTERVAL},"
+            " 'g:bonipy35#taskmd#poll_reports', {'repeat': -1})"
+        )
+        assert isinstance(timer, str)
+        report_state.timer = int(timer)
+    print(f"Computing {title}...")
+
+
+def poll_reports() -> None:
+    """Show finished reports. Called by a timer on the main thread."""
+
+    report_jobs = report_state.jobs
+
+    for bufnr, report_job in list(report_jobs.items()):
+        changedtick = vim.eval(f"getbufvar({bufnr}, 'changedtick', '')")
+        if changedtick != str(report_job.changedtick):
+            _logger.debug("Discarding outdated report: %s", report_job.title)
+            report_job.future.cancel()
+            del report_jobs[bufnr]
+            continue
+
+        future = report_job.future
+        if not future.done():
+            continue
+        del report_jobs[bufnr]
+
+        error = future.exception()
+        if error is not None:
+            _logger.error("Unable to compute %s: %s", report_job.title, error)
+            continue
+        set_quicklist(future.result(), title=report_job.title)
+
+    if not report_jobs and report_state.timer is not None:
+        vim.eval(f"timer_stop({report_state.timer})")
+        report_state.timer = None
+
+
+def get_month_report_rows(
+    snapshot: ReportSnapshot, *, end: datetime.datetime, start: datetime.datetime
+) -> "list[QuicklistRow]":
+    clock_index = snapshot.get_clock_index()
+    parsed_document = clock_index.get_bounded_document(start=start, end=end)
+    summary_quicklist = data.get_summary_quicklist(parsed_document)
+    return to_quicklist_rows(summary_quicklist, bufnr=snapshot.bufnr)
+
+
+def get_summary_rows(snapshot: ReportSnapshot) -> "list[QuicklistRow]":
+    parsed_document = snapshot.get_clock_index().get_clocked_document()
+    summary_quicklist = data.get_summary_quicklist(parsed_document)
+    return to_quicklist_rows(summary_quicklist, bufnr=snapshot.bufnr)
+
+
+def get_timesheet_rows(
+    snapshot: ReportSnapshot, *, end: datetime.datetime, start: datetime.datetime
+) -> "list[QuicklistRow]":
+    clock_index = snapshot.get_clock_index()
+
+    one_day = datetime.timedelta(days=1)
+    day_starts = []  # type: list[datetime.datetime]
+    day_start = start
+    while day_start < end:
+        day_starts.append(day_start)
+        day_start += one_day
+    parsed_documents = clock_index.get_bounded_documents(
+        day_starts + [day_start]
+    )
+
+    quicklist_rows = []  # type: list[QuicklistRow]
+    bufnr = snapshot.bufnr
+    for day_start, parsed_document in zip(day_starts, parsed_documents):
+        summary_quicklist = data.get_summary_quicklist(parsed_document)
+
+        quicklist_rows.append(
+            {
+                "bufnr": bufnr,
+                "col": 1,
+                "lnum": 1,
+                "text": str(day_start),
+            }
+        )
+        quicklist_rows.extend(to_quicklist_rows(summary_quicklist, bufnr=bufnr))
+
+    return quicklist_rows
+
+
 class TimesheetArgument(typing.TypedDict):
     date: datetime.date
     days: int
@@ -112,24 +532,11 @@ def write_agenda_to_qlist() -> None:
     end = start + datetime.timedelta(days=1)
 
     buffer = vim.current.buffer
-    parsed_document = data.ParsedDocument.parse(buffer)
-    parsed_document.bound_time_range(start=start, end=end)
-    parsed_lines = parsed_document.parsed_lines
-
-    timestamp_lines = []  # type: list[tuple[datetime.datetime, data.ParsedLine]]
-    total_duration = datetime.timedelta()
-    for parsed_line in parsed_lines:
-        clock = parsed_line.clock
-        if clock is None:
-            continue
-
-        clock_end = clock.end
-        if clock_end is None:
-            continue
-
-        clock_start = clock.start
-        total_duration += clock_end - clock_start
-        timestamp_lines.append((clock_start, parsed_line))
+    clock_index = get_clock_index(buffer)
+    bounded_clocks = clock_index.get_bounded_clocks(start=start, end=end)
+    total_duration = datetime.timedelta(
+        seconds=sum(parsed_line.duration_seconds for parsed_line in bounded_clocks)
+    )
 
     bufnr = vim.current.buffer.number
     quicklist_rows = [
@@ -140,10 +547,7 @@ def write_agenda_to_qlist() -> None:
             "text": f"Total: {total_duration}",
         }
     ]  # type: list[QuicklistRow]
-    for timestamp_line in sorted(
-        timestamp_lines, key=lambda timestamp_line: timestamp_line[0]
-    ):
-        parsed_line = timestamp_line[1]
+    for parsed_line in bounded_clocks:
         quicklist_rows.append(
             {
                 "bufnr": bufnr,
@@ -153,9 +557,50 @@ def write_agenda_to_qlist() -> None:
             }
         )
 
-    vim.eval(f"setqflist({quicklist_rows})")
-    vim.command(":copen")
-    vim.command(":wincmd p")
+    set_quicklist(quicklist_rows, title=f"Agenda: {date}")
+
+
+class ClockCheckArgument(typing.TypedDict):
+    # Minutes. Gaps are not checked if empty.
+    gap_minutes: str
+
+
+clock_check_argument = {"gap_minutes": ""}  # type: ClockCheckArgument
+
+
+def write_clock_check_to_qlist() -> None:
+    gap_minutes_as_string = vim.eval(
+        f"input('Gap minutes: ', '{clock_check_argument['gap_minutes']}')"
+    )
+    assert isinstance(gap_minutes_as_string, str)
+    gap_minimum_seconds = None
+    if gap_minutes_as_string:
+        try:
+            gap_minimum_seconds = int(gap_minutes_as_string) * 60
+        except ValueError:
+            print("Unable to parse given number of minutes.")
+            return
+    clock_check_argument["gap_minutes"] = gap_minutes_as_string
+
+    buffer = vim.current.buffer
+    parsed_document = get_parsed_document(buffer)
+    clock_issues = check.find_clock_issues(
+        check.iter_clock_spans(parsed_document.parsed_lines, source=buffer.name),
+        gap_minimum_seconds=gap_minimum_seconds,
+    )
+
+    bufnr = buffer.number
+    quicklist_rows = [
+        QuicklistRow(
+            bufnr=bufnr,
+            col=1,
+            lnum=clock_issue.line_number,
+            text=clock_issue.get_message(),
+        )
+        for clock_issue in clock_issues
+    ]
+
+    set_quicklist(quicklist_rows, title="Clock check")
 
 
 # TODO: Refactor reports.
@@ -175,25 +620,13 @@ def write_day_report_to_qlist() -> None:
     end = start + datetime.timedelta(days=1)
 
     buffer = vim.current.buffer
-    parsed_document = data.ParsedDocument.parse(buffer)
-    parsed_document.bound_time_range(start=start, end=end)
-    parsed_document.refresh_durations()
+    clock_index = get_clock_index(buffer)
+    parsed_document = clock_index.get_bounded_document(start=start, end=end)
     summary_quicklist = data.get_summary_quicklist(parsed_document)
 
-    bufnr = vim.current.buffer.number
-    quicklist_rows = [
-        QuicklistRow(
-            bufnr=bufnr,
-            col=1,
-            lnum=summary_quicklist_item.lnum,
-            text=summary_quicklist_item.text,
-        )
-        for summary_quicklist_item in summary_quicklist
-    ]
+    quicklist_rows = to_quicklist_rows(summary_quicklist, bufnr=buffer.number)
 
-    vim.eval(f"setqflist({quicklist_rows})")
-    vim.command(":copen")
-    vim.command(":wincmd p")
+    set_quicklist(quicklist_rows, title=f"Day report: {date}")
 
 
 def write_month_report_to_qlist() -> None:
@@ -209,48 +642,55 @@ def write_month_report_to_qlist() -> None:
     start = datetime.datetime(year=date.year, month=date.month, day=1).astimezone()
     end = datetime.datetime(year=date.year, month=date.month + 1, day=1).astimezone()
 
-    buffer = vim.current.buffer
-    parsed_document = data.ParsedDocument.parse(buffer)
-    parsed_document.bound_time_range(start=start, end=end)
-    parsed_document.refresh_durations()
-    summary_quicklist = data.get_summary_quicklist(parsed_document)
+    submit_report(
+        vim.current.buffer,
+        compute=functools.partial(get_month_report_rows, end=end, start=start),
+        key=("month_report", start),
+        title=f"Month report: {date:%Y-%m}",
+    )
 
-    bufnr = vim.current.buffer.number
-    quicklist_rows = [
-        QuicklistRow(
-            bufnr=bufnr,
-            col=1,
-            lnum=summary_quicklist_item.lnum,
-            text=summary_quicklist_item.text,
-        )
-        for summary_quicklist_item in summary_quicklist
-    ]
 
-    vim.eval(f"setqflist({quicklist_rows})")
-    vim.command(":copen")
-    vim.command(":wincmd p")
+def write_summary_to_qlist() -> None:
+    submit_report(
+        vim.current.buffer,
+        compute=get_summary_rows,
+        key=("summary",),
+        title="Summary",
+    )
 
 
-def write_summary_to_qlist() -> None:
+def write_tag_report_to_qlist() -> None:
+    date_as_string = vim.eval(f"input('Date: ', '{timesheet_argument['date']}')")
+    assert isinstance(date_as_string, str)
+    try:
+        date = datetime.date.fromisoformat(date_as_string)
+    except ValueError:
+        print("Unable to parse given date.")
+        return
+    timesheet_argument["date"] = date
+
+    days_as_string = vim.eval(f"input('Days: ', '{timesheet_argument['days']}')")
+    assert isinstance(days_as_string, str)
+    try:
+        days = int(days_as_string)
+    except ValueError:
+        print("Unable to parse given number of days.")
+        return
+    timesheet_argument["days"] = days
+
+    start = datetime.datetime(
+        year=date.year, month=date.month, day=date.day
+    ).astimezone()
+    end = start + datetime.timedelta(days=days)
+
     buffer = vim.current.buffer
-    parsed_document = data.ParsedDocument.parse(buffer)
-    parsed_document.refresh_durations()
-    summary_quicklist = data.get_summary_quicklist(parsed_document)
+    clock_index, tag_index = get_tag_indices(buffer)
+    tag_rollup = tag_index.rollup(clock_index, start=start, end=end)
+    tag_quicklist = data.get_tag_quicklist(tag_rollup, tag_index)
 
-    bufnr = vim.current.buffer.number
-    quicklist_rows = [
-        QuicklistRow(
-            bufnr=bufnr,
-            col=1,
-            lnum=summary_quicklist_item.lnum,
-            text=summary_quicklist_item.text,
-        )
-        for summary_quicklist_item in summary_quicklist
-    ]
+    quicklist_rows = to_quicklist_rows(tag_quicklist, bufnr=buffer.number)
 
-    vim.eval(f"setqflist({quicklist_rows})")
-    vim.command(":copen")
-    vim.command(":wincmd p")
+    set_quicklist(quicklist_rows, title=f"Tag report: {date}")
 
 
 def write_timesheet_to_qlist() -> None:
@@ -266,39 +706,9 @@ def write_timesheet_to_qlist() -> None:
     start = datetime.datetime(year=date.year, month=date.month, day=1).astimezone()
     end = datetime.datetime(year=date.year, month=date.month + 1, day=1).astimezone()
 
-    buffer = vim.current.buffer
-    buffer_parsed_document = data.ParsedDocument.parse(buffer)
-
-    quicklist_rows = []  # type: list[QuicklistRow]
-    bufnr = vim.current.buffer.number
-    one_day = datetime.timedelta(days=1)
-    day_start = start
-    while day_start < end:
-        day_end = day_start + one_day
-        parsed_document = copy.deepcopy(buffer_parsed_document)
-        parsed_document.bound_time_range(start=day_start, end=day_end)
-        parsed_document.refresh_durations()
-        summary_quicklist = data.get_summary_quicklist(parsed_document)
-
-        quicklist_rows.append(
-            {
-                "bufnr": bufnr,
-                "col": 1,
-                "lnum": 1,
-                "text": str(day_start),
-            }
-        )
-        for summary_quicklist_item in summary_quicklist:
-            quicklist_rows.append(
-                QuicklistRow(
-                    bufnr=bufnr,
-                    col=1,
-                    lnum=summary_quicklist_item.lnum,
-                    text=summary_quicklist_item.text,
-                )
-            )
-        day_start = day_end
-
-    vim.eval(f"setqflist({quicklist_rows})")
-    vim.command(":copen")
-    vim.command(":wincmd p")
+    submit_report(
+        vim.current.buffer,
+        compute=functools.partial(get_timesheet_rows, end=end, start=start),
+        key=("timesheet", start),
+        title=f"Timesheet: {date:%Y-%m}",
+    )
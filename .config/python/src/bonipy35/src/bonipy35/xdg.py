@@ -28,6 +28,14 @@ def home() -> pathlib.Path:
     return path
 
 
+@functools_ext.nullary_cache
+def cache_home() -> pathlib.Path:
+    path = os_ext.get_environ_path("XDG_CACHE_HOME")
+    if path is None:
+        path = home() / ".cache"
+    return path
+
+
 @functools_ext.nullary_cache
 def config_home() -> pathlib.Path:
     path = os_ext.get_environ_path("XDG_CONFIG_HOME")
@@ -57,6 +65,12 @@ class AppDirectories:
         super().__init__(*args, **kwargs)
         self.app_name = app_name
 
+    @functools_ext.cached_property
+    def cache_home(self) -> pathlib.Path:
+        path = cache_home() / self.app_name
+        ensure_directory_exists(path)
+        return path
+
     @functools_ext.cached_property
     def config_home(self) -> pathlib.Path:
         path = config_home() / self.app_name
@@ -10,11 +10,17 @@ class Buffer:
     number: int
     valid: bool
 
+    @typing.overload
     def __getitem__(self, key: int) -> str: ...
+    @typing.overload
+    def __getitem__(self, key: slice) -> list[str]: ...
     def __iter__(self) -> typing.Self: ...
     def __len__(self) -> int: ...
     def __next__(self) -> str: ...
+    @typing.overload
     def __setitem__(self, key: int, value: str) -> None: ...
+    @typing.overload
+    def __setitem__(self, key: slice, value: list[str]) -> None: ...
     def append(self, _str: str, _nr: int) -> None: ...
 
 class Window:
@@ -30,6 +36,17 @@ class Window:
     vars: object
     width: int
 
+class Function:
+    name: str
+
+    def __init__(
+        self,
+        name: str,
+        args: list[object] = ...,
+        self_: dict[str, object] = ...,
+    ) -> None: ...
+    def __call__(self, *args: object) -> object: ...
+
 class _Current:
     buffer: Buffer
     line: str
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+# Keep this Python 3.5 compatible for Debian 9 support.
+# pylint: disable=consider-using-f-string
+
+# Standard libraries.
+import pathlib
+import typing
+
+# External dependencies.
+import pytest
+
+# Internal modules.
+from bonipy35.notify import history
+from bonipy35.notify.history import (
+    HistoryStore,
+    HistoryWriter,
+    Record,
+    main,
+    parse_time,
+)
+
+
+def create_record(index: int, *, app_name: str = "app") -> Record:
+    return {
+        "app_name": app_name,
+        "body": "Body {index}".format(index=index),
+        "created_at": 1000.0 + index,
+        "id": index + 1,
+        "summary": "Summary",
+    }
+
+
+def get_ids(records: typing.Iterable[Record]) -> "list[int]":
+    return [record["id"] for record in records]
+
+
+def write_records(
+    store: HistoryStore, records: typing.Iterable[Record]
+) -> None:
+    for record in records:
+        store.append(record)
+    store.close()
+
+
+class TestHistoryStore:
+    def test_query_by_time_and_app(self, tmp_path: pathlib.Path) -> None:
+        store = HistoryStore(directory=tmp_path, max_segment_size=200)
+        write_records(
+            store,
+            (
+                create_record(index, app_name="odd" if index % 2 else "even")
+                for index in range(20)
+            ),
+        )
+        assert len(store.get_segment_starts()) > 1
+
+        records = list(store.query(since=1005.0, until=1010.0))
+        assert [record["id"] for record in records] == [6, 7, 8, 9, 10]
+        records = list(store.query(app_name="odd", since=1014.0))
+        assert [record["id"] for record in records] == [16, 18, 20]
+        assert not list(store.query(app_name="missing"))
+
+    def test_removes_oldest_segments(self, tmp_path: pathlib.Path) -> None:
+        store = HistoryStore(
+            directory=tmp_path, max_segment_count=2, max_segment_size=1
+        )
+        write_records(store, (create_record(index) for index in range(5)))
+        assert len(store.get_segment_starts()) == 2
+        assert [record["id"] for record in store.query()] == [4, 5]
+
+    def test_appends_to_existing_history(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        write_records(HistoryStore(directory=tmp_path), [create_record(0)])
+        store = HistoryStore(directory=tmp_path)
+        write_records(store, [create_record(1)])
+        assert [record["id"] for record in store.query()] == [1, 2]
+
+
+class TestHistoryWriter:
+    def test_writes_on_exit(self, tmp_path: pathlib.Path) -> None:
+        store = HistoryStore(directory=tmp_path)
+        with HistoryWriter(recent_count=2, store=store) as writer:
+            for index in range(3):
+                writer.record(create_record(index))
+        assert [record["id"] for record in writer.recent] == [2, 3]
+        assert [record["id"] for record in store.query()] == [1, 2, 3]
+
+    def test_query_recent_from_memory(self, tmp_path: pathlib.Path) -> None:
+        # Not started, so nothing is written to disk.
+        writer = HistoryWriter(
+            recent_count=3, store=HistoryStore(directory=tmp_path)
+        )
+        for index in range(4):
+            writer.record(create_record(index, app_name="ab"[index % 2]))
+
+        assert get_ids(writer.query_recent(since=1001.5) or []) == [3, 4]
+        assert get_ids(
+            writer.query_recent(app_name="a", since=1001.5, until=1003) or []
+        ) == [3]
+        # Older records may have been dropped from memory.
+        assert writer.query_recent(since=1001) is None
+
+    def test_keeps_going_after_flush_error(
+        self,
+        caplog: pytest.LogCaptureFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: pathlib.Path,
+    ) -> None:
+        store = HistoryStore(directory=tmp_path)
+        # Start a segment, so that the writer only flushes it.
+        store.append(create_record(0))
+        flush = store.flush
+
+        def fail_flush() -> None:
+            monkeypatch.setattr(store, "flush", flush)
+            raise OSError("No space left on device")
+
+        monkeypatch.setattr(store, "flush", fail_flush)
+        with HistoryWriter(store=store) as writer:
+            writer.record(create_record(1))
+            writer.record(create_record(2))
+        assert "Unable to flush history" in caplog.text
+        assert get_ids(store.query()) == [1, 2, 3]
+
+
+class TestParseTime:
+    def test_duration(self) -> None:
+        assert parse_time("1h", now=7200.0) == 3600.0
+        assert parse_time("1.5m", now=100.0) == 10.0
+
+    def test_invalid(self) -> None:
+        with pytest.raises(ValueError):
+            parse_time("yesterday", now=0.0)
+
+
+class TestMain:
+    def test_ndjson(
+        self, capsys: pytest.CaptureFixture[str], tmp_path: pathlib.Path
+    ) -> None:
+        write_records(
+            HistoryStore(directory=tmp_path),
+            [create_record(0, app_name="a"), create_record(1, app_name="b")],
+        )
+        assert (
+            main(
+                [
+                    "history",
+                    "--app",
+                    "b",
+                    "--directory",
+                    str(tmp_path),
+                    "--format",
+                    "ndjson",
+                ]
+            )
+            == 0
+        )
+        assert '"id": 2' in capsys.readouterr().out
+
+    def test_recent_from_daemon(
+        self,
+        capsys: pytest.CaptureFixture[str],
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: pathlib.Path,
+    ) -> None:
+        monkeypatch.setattr(
+            history, "get_history_directory", lambda: tmp_path
+        )
+        monkeypatch.setattr(
+            history, "query_daemon", lambda **kwargs: [create_record(0)]
+        )
+        assert main(["history", "--format", "ndjson", "--since", "1h"]) == 0
+        assert '"id": 1' in capsys.readouterr().out
+
+        # The store is read if the daemon cannot answer.
+        write_records(HistoryStore(directory=tmp_path), [create_record(1)])
+        monkeypatch.setattr(history, "query_daemon", lambda **kwargs: None)
+        assert (
+            main(["history", "--format", "ndjson", "--since", "1970-01-01"])
+            == 0
+        )
+        assert '"id": 2' in capsys.readouterr().out
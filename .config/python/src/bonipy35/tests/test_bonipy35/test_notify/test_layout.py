@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+# Standard libraries.
+import datetime
+
+# Internal modules.
+from bonipy35.notify.layout import Coalescer, Notification, SlotLayout
+
+
+def create_notification(
+    notification_id: int, *, app_name: str = "app", summary: str = "Summary"
+) -> Notification:
+    return Notification(
+        actions=[],
+        app_icon="",
+        app_name=app_name,
+        body="",
+        created_at=datetime.datetime(
+            2000, 1, 1, tzinfo=datetime.timezone.utc
+        ),
+        expire_timeout=-1,
+        hints={},
+        id=notification_id,
+        summary=summary,
+    )
+
+
+class TestCoalescer:
+    def test_groups_by_app_and_summary(self) -> None:
+        coalescer = Coalescer(coalesce_seconds=2.0)
+        first = coalescer.add(create_notification(1), now=0.0)
+        assert coalescer.add(create_notification(2), now=1.0) is first
+        other = create_notification(3, app_name="other")
+        assert coalescer.add(other, now=1.0) is not first
+        # Too long after the last notification of the group.
+        assert coalescer.add(create_notification(4), now=3.0) is not first
+        assert list(first.notifications) == [1, 2]
+        assert len(coalescer) == 4
+
+    def test_discard_one_of_group(self) -> None:
+        coalescer = Coalescer()
+        group = coalescer.add(create_notification(1), now=0.0)
+        coalescer.add(create_notification(2), now=0.0)
+        coalescer.pop_dirty_groups()
+
+        assert coalescer.discard(1) is group
+        assert list(group.notifications) == [2]
+        assert group.get_latest().id == 2
+        assert coalescer.get_group(1) is None
+        assert coalescer.get_group(2) is group
+        assert coalescer.pop_dirty_groups() == [group]
+        # Closing an unknown or already closed notification does nothing.
+        assert coalescer.discard(1) is None
+        assert not coalescer.pop_dirty_groups()
+
+        assert coalescer.discard(2) is group
+        assert not group.notifications
+        assert not coalescer
+        # An emptied group is no longer joined.
+        assert coalescer.add(create_notification(3), now=0.0) is not group
+
+    def test_replace_in_place(self) -> None:
+        coalescer = Coalescer()
+        group = coalescer.add(create_notification(1), now=0.0)
+        coalescer.add(create_notification(2), now=0.0)
+        coalescer.pop_dirty_groups()
+
+        replacement = create_notification(1)
+        assert coalescer.add(replacement, now=1.0) is group
+        assert list(group.notifications) == [2, 1]
+        assert group.get_latest() is replacement
+        assert coalescer.pop_dirty_groups() == [group]
+
+    def test_replace_with_new_summary(self) -> None:
+        coalescer = Coalescer()
+        old_group = coalescer.add(create_notification(1), now=0.0)
+        coalescer.pop_dirty_groups()
+
+        new_group = coalescer.add(
+            create_notification(1, summary="New"), now=1.0
+        )
+        assert new_group is not old_group
+        assert new_group.key == ("app", "New")
+        assert not old_group.notifications
+        assert coalescer.get_group(1) is new_group
+        assert len(coalescer) == 1
+        # The emptied group is reported so that its window is hidden.
+        assert coalescer.pop_dirty_groups() == [old_group, new_group]
+        assert not old_group.is_dirty
+
+    def test_remove_group(self) -> None:
+        coalescer = Coalescer()
+        group = coalescer.add(create_notification(1), now=0.0)
+        coalescer.add(create_notification(2), now=0.0)
+        assert coalescer.remove_group(group) == [1, 2]
+        assert not coalescer
+        assert coalescer.get_group(1) is None
+
+
+class TestSlotLayout:
+    def test_lowest_free_slot(self) -> None:
+        layout = SlotLayout(max_count=4, spacing=0)
+        assert [layout.allocate(10) for _ in range(4)] == [0, 1, 2, 3]
+        assert layout.is_full()
+        layout.release(2)
+        layout.release(1)
+        assert not layout.is_full()
+        assert layout.allocate(10) == 1
+        assert layout.allocate(10) == 2
+
+    def test_offsets_after_release(self) -> None:
+        layout = SlotLayout(max_count=4, spacing=5)
+        for height in (10, 20, 30):
+            layout.allocate(height)
+        assert layout.flush() == [(0, 0), (1, 15), (2, 40)]
+        assert layout.flush() is None
+
+        # Windows above a released slot move down into its space.
+        layout.release(1)
+        assert layout.flush() == [(0, 0), (2, 15)]
+        assert layout.get_total_height() == 50
+        layout.resize(0, 40)
+        assert layout.flush() == [(0, 0), (2, 45)]
+        layout.resize(0, 40)
+        assert layout.flush() is None
+
+    def test_reset_when_empty(self) -> None:
+        layout = SlotLayout(max_count=4, spacing=0)
+        for _ in range(3):
+            layout.allocate(10)
+        layout.release(0)
+        layout.release(2)
+        layout.release(1)
+        assert not layout
+        assert layout.flush() == []
+        # Slots count up from the bottom again.
+        assert [layout.allocate(10) for _ in range(3)] == [0, 1, 2]
+        assert layout.flush() == [(0, 0), (1, 10), (2, 20)]
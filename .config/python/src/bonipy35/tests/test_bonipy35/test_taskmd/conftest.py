@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+
+# Standard libraries.
+import pathlib
+import typing
+
+# External dependencies.
+import pytest
+
+
+@pytest.fixture(name="write_source")
+def fixture_write_source(
+    request: pytest.FixtureRequest,
+) -> typing.Callable[[pathlib.Path], pathlib.Path]:
+    """Returns a function writing `LINES` of the test module to a path."""
+    lines = request.module.LINES  # type: typing.List[str]
+
+    def write_source(path: pathlib.Path) -> pathlib.Path:
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return path
+
+    return write_source
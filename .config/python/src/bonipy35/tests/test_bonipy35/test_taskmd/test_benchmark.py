@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+# Standard libraries.
+import datetime
+import json
+import pathlib
+import typing
+
+# Internal modules.
+from bonipy35.taskmd import benchmark
+from bonipy35.taskmd.corpus import generate_clock_lines, generate_lines
+from bonipy35.taskmd.data import Clock, ParsedDocument
+
+
+def to_results(**best_seconds: float) -> typing.Dict[str, typing.Any]:
+    return {
+        "results": {
+            name: {"best_seconds": seconds, "mean_seconds": seconds}
+            for name, seconds in best_seconds.items()
+        }
+    }
+
+
+class TestGenerateLines:
+    def test_reference(
+        self, is_generating_reference: bool, reference_path: pathlib.Path
+    ) -> None:
+        # Baselines are only comparable if the generated document is unchanged.
+        lines = list(
+            generate_lines(
+                code_block_probability=0.5, days=3, open_clock_probability=0.2
+            )
+        )
+        text = "\n".join(lines) + "\n"
+        if is_generating_reference:
+            reference_path.parent.mkdir(exist_ok=True, parents=True)
+            reference_path.write_text(text, encoding="utf-8")
+        assert reference_path.read_text(encoding="utf-8") == text
+
+    def test_content(self) -> None:
+        lines = list(
+            generate_lines(
+                code_block_probability=1, days=2, open_clock_probability=1
+            )
+        )
+        parsed_document = ParsedDocument.parse(iter(lines))
+        clocks = [
+            parsed_line.clock
+            for parsed_line in parsed_document.parsed_lines
+            if parsed_line.clock is not None
+        ]
+        assert clocks
+        assert all(clock.end is None for clock in clocks)
+        assert all(
+            parsed_line.headline is None
+            for parsed_line in parsed_document.parsed_lines
+            if parsed_line.line == "# Not a headline"
+        )
+
+    def test_clock_lines(self) -> None:
+        lines = list(generate_clock_lines(count=50))
+        assert len(lines) == 50
+        for line in lines:
+            clock = Clock.parse(line)
+            assert clock is not None
+            assert clock.to_string() == line
+        assert len({line[27:32] for line in lines}) > 1
+
+
+class TestRunCases:
+    def test_all_cases(self) -> None:
+        cases = benchmark.get_cases(
+            list(generate_lines(days=40)), date=datetime.date(2000, 1, 15)
+        )
+        results = benchmark.run_cases(cases, repeat=1)
+        assert sorted(results) == sorted(name for name, _ in cases)
+        json.dumps(results)
+
+    def test_clock_cases(self) -> None:
+        cases = benchmark.get_clock_cases(
+            list(generate_clock_lines(count=10))
+        )
+        results = benchmark.run_cases(cases, repeat=1)
+        assert sorted(results) == ["clock_parse", "clock_to_string"]
+
+    def test_names(self) -> None:
+        cases = benchmark.get_cases(
+            list(generate_lines(days=1)), date=datetime.date(2000, 1, 1)
+        )
+        assert list(
+            benchmark.run_cases(cases, names=["parse"], repeat=1)
+        ) == ["parse"]
+
+
+class TestCompareResults:
+    def test_slower(self) -> None:
+        assert benchmark.compare_results(
+            to_results(agenda=1.0, parse=1.0),
+            to_results(agenda=1.1, parse=2.0),
+            tolerance=1.5,
+        ) == ["parse: 1.000000 s -> 2.000000 s"]
+
+    def test_minimum_seconds(self) -> None:
+        assert not benchmark.compare_results(
+            to_results(agenda=0.001),
+            to_results(agenda=0.003),
+            minimum_seconds=0.005,
+            tolerance=1.5,
+        )
+
+    def test_missing_case(self) -> None:
+        assert not benchmark.compare_results(
+            to_results(agenda=1.0), to_results(parse=2.0), tolerance=1.5
+        )
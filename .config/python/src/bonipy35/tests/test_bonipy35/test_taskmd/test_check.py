@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+# Need Python 3.5 support.
+# pylint: disable=consider-using-f-string
+
+# Standard libraries.
+import json
+import pathlib
+import typing
+
+# External dependencies.
+import pytest
+
+# Internal modules.
+from bonipy35.taskmd.check import find_clock_issues, main, read_clock_spans
+
+LINES = [
+    "# Work",
+    "## CLOCK: (2004-01-01T00:00:00+00:00)--(2004-01-01T02:00:00+00:00)",
+    "## CLOCK: (2004-01-01T01:00:00+00:00)--(2004-01-01T01:30:00+00:00)",
+    "## CLOCK: (2004-01-01T01:45:00+00:00)--(2004-01-01T03:00:00+00:00)",
+    "```",
+    "## CLOCK: (2004-01-01T00:00:00+00:00)--(2004-01-01T08:00:00+00:00)",
+    "```",
+    "## CLOCK: (2004-01-01T04:00:00+00:00)--(2004-01-01T05:00:00+00:00)",
+    "## CLOCK: (2004-01-02T04:00:00+00:00)",
+]
+
+
+class TestReadClockSpans:
+    def test_code_block(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        path = write_source(tmp_path / "a.md")
+        clock_spans = read_clock_spans(path)
+        assert [clock_span[3] for clock_span in clock_spans] == [
+            2,
+            3,
+            4,
+            8,
+            9,
+        ]
+        assert clock_spans[-1][1] is None
+
+
+class TestFindClockIssues:
+    def test_overlap_with_longest(self) -> None:
+        issues = find_clock_issues(
+            [(0, 100, "a", 1), (10, 20, "a", 2), (50, 150, "b", 3)]
+        )
+        assert [(issue.kind, issue.line_number) for issue in issues] == [
+            ("overlap", 2),
+            ("overlap", 3),
+        ]
+        # Compared with the clock ending last, not the one starting last.
+        assert issues[1].other_line_number == 1
+        assert (issues[1].start, issues[1].end) == (50, 100)
+
+    def test_touching_clocks(self) -> None:
+        assert not find_clock_issues(
+            [(10, 20, "a", 2), (0, 10, "a", 1)], gap_minimum_seconds=0
+        )
+
+    def test_gaps(self) -> None:
+        clock_spans = [(0, 10, "a", 1), (15, 20, "a", 2), (40, 50, "a", 3)]
+        assert not find_clock_issues(clock_spans)
+        issues = find_clock_issues(clock_spans, gap_minimum_seconds=5)
+        assert [(issue.start, issue.end) for issue in issues] == [(20, 40)]
+        issues = find_clock_issues(
+            clock_spans, gap_maximum_seconds=10, gap_minimum_seconds=0
+        )
+        assert [(issue.start, issue.end) for issue in issues] == [(10, 15)]
+
+    def test_open_and_negative(self) -> None:
+        issues = find_clock_issues([(20, None, "a", 1), (10, 5, "a", 2)])
+        assert [issue.kind for issue in issues] == ["negative", "open"]
+
+
+class TestMain:
+    def test_quickfix(
+        self,
+        capsys: pytest.CaptureFixture[str],
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        path = write_source(tmp_path / "a.md")
+        assert main(["check", str(path), "--gap-minimum", "30"]) == 1
+        assert capsys.readouterr().out.splitlines() == [
+            "{path}:3:1: Overlaps line 2 for 0:30:00".format(path=path),
+            "{path}:4:1: Overlaps line 2 for 0:15:00".format(path=path),
+            "{path}:8:1: Gap of 1:00:00 after line 4".format(path=path),
+            "{path}:9:1: Open clock".format(path=path),
+        ]
+
+    def test_json_across_files(
+        self,
+        capsys: pytest.CaptureFixture[str],
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        write_source(tmp_path / "a.md")
+        write_source(tmp_path / "b.md")
+        assert (
+            main(["check", str(tmp_path), "--allow-open", "--format", "json"])
+            == 1
+        )
+        issues = json.loads(
+            capsys.readouterr().out
+        )  # type: typing.List[typing.Dict[str, typing.Any]]
+        assert all(issue["kind"] == "overlap" for issue in issues)
+        assert {
+            (issue["source"], issue["other_source"])
+            for issue in issues
+            if issue["source"] != issue["other_source"]
+        }
+
+    def test_clean(
+        self, capsys: pytest.CaptureFixture[str], tmp_path: pathlib.Path
+    ) -> None:
+        path = tmp_path / "a.md"
+        path.write_text(
+            "## CLOCK: (2004-01-01T00:00:00+00:00)--(2004-01-01T02:00:00+00:00)\n",
+            encoding="utf-8",
+        )
+        assert main(["check", str(path)]) == 0
+        assert not capsys.readouterr().out
+
+    @pytest.mark.parametrize("jobs", ["1", "2"])
+    def test_unreadable_file(
+        self,
+        caplog: pytest.LogCaptureFixture,
+        capsys: pytest.CaptureFixture[str],
+        jobs: str,
+        tmp_path: pathlib.Path,
+    ) -> None:
+        path = tmp_path / "a.md"
+        path.write_text(
+            "## CLOCK: (2004-01-01T00:00:00+00:00)--(2004-01-01T02:00:00+00:00)\n",
+            encoding="utf-8",
+        )
+        (tmp_path / "b.md").write_bytes(b"# \xff\n")
+        # Other files are still checked, but the check fails.
+        assert main(["check", str(tmp_path), "--jobs", jobs]) == 1
+        assert not capsys.readouterr().out
+        assert "Unable to read {}".format(tmp_path / "b.md") in caplog.text
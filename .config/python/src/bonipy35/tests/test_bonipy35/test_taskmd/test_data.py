@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+
+# Standard libraries.
+import datetime
+import io
+import random
+import typing
+
+# External dependencies.
+import pytest
+
+# Internal modules.
+from bonipy35.taskmd.data import (
+    TIMESTAMP_FORMAT,
+    Clock,
+    ClockIndex,
+    DurationAccumulator,
+    ParsedDocument,
+    TagIndex,
+    format_timestamp,
+    get_changed_range,
+    get_summary_quicklist,
+    get_tag_quicklist,
+    iter_headline_tags,
+    iter_lines,
+    iter_structure,
+    merge_line_changes,
+    parse_timestamp,
+)
+
+UTC = datetime.timezone.utc
+
+NESTED_LINES = [
+    "# TODO Grocery",
+    "## CLOCK: (2004-01-01T00:00:00+00:00)--(2004-01-01T02:00:00+00:00)",
+    "## TODO Laundry",
+    "### CLOCK: (2004-01-01T20:00:00+00:00)--(2004-01-02T10:00:00+00:00)",
+    "### CLOCK: (2004-01-02T00:00:00+00:00)--(2004-01-02T01:00:00+00:00)",
+    "### CLOCK: (2004-01-03T00:00:00+00:00)",
+    "# Sleep",
+    "## CLOCK: (2003-12-31T00:00:00+00:00)--(2004-01-05T00:00:00+00:00)",
+]
+
+SAMPLE_LINES = [
+    "# TODO Feed cat",
+    "## CLOCK: (2000-01-01T00:00:00+00:00)--(2000-01-01T01:00:00+00:00)",
+    "",
+    "```",
+    "# TODO Feed bird",
+    "## CLOCK: (2000-01-01T00:00:00+00:00)--(2000-01-01T02:00:00+00:00)",
+    "```",
+    "# TODO Feed fish",
+    "## CLOCK: (2000-01-02T00:00:00+00:00)--(2000-01-02T03:00:00+00:00)",
+]
+
+TAGGED_LINES = [
+    "# Work :work:",
+    "## Review :code:",
+    "### CLOCK: (2004-01-01T00:00:00+00:00)--(2004-01-01T01:00:00+00:00)",
+    "## Meeting",
+    "### CLOCK: (2004-01-01T02:00:00+00:00)--(2004-01-01T04:00:00+00:00)",
+    "# Hobby :code:",
+    "## CLOCK: (2004-01-01T05:00:00+00:00)--(2004-01-01T08:00:00+00:00)",
+    "# Sleep",
+    "## CLOCK: (2004-01-01T20:00:00+00:00)--(2004-01-02T04:00:00+00:00)",
+]
+
+
+def to_summary(
+    parsed_document: ParsedDocument,
+) -> typing.List[typing.Tuple[int, bool, str, str]]:
+    return [
+        (
+            parsed_line.line_number,
+            parsed_line.is_code_block_open,
+            parsed_line.headline.to_string() if parsed_line.headline else "",
+            parsed_line.clock.to_string() if parsed_line.clock else "",
+        )
+        for parsed_line in parsed_document.parsed_lines
+    ]
+
+
+def assert_update_matches_parse(
+    old_lines: typing.List[str], new_lines: typing.List[str]
+) -> None:
+    parsed_document = ParsedDocument.parse(iter(old_lines))
+    start, old_end, new_end = get_changed_range(old_lines, new_lines)
+    parsed_document.update(
+        new_lines, start=start, old_end=old_end, new_end=new_end
+    )
+    expected = ParsedDocument.parse(iter(new_lines))
+    assert to_summary(parsed_document) == to_summary(expected)
+
+
+class TestGetChangedRange:
+    def test_identical(self) -> None:
+        assert get_changed_range(["a", "b"], ["a", "b"]) == (2, 2, 2)
+
+    def test_insert(self) -> None:
+        assert get_changed_range(["a", "c"], ["a", "b", "c"]) == (1, 1, 2)
+
+    def test_remove(self) -> None:
+        assert get_changed_range(["a", "b", "c"], ["a", "c"]) == (1, 2, 1)
+
+    def test_replace(self) -> None:
+        assert get_changed_range(["a", "b", "c"], ["a", "x", "c"]) == (
+            1,
+            2,
+            2,
+        )
+
+
+class TestParsedDocumentUpdate:
+    def test_append_line(self) -> None:
+        new_lines = SAMPLE_LINES + ["## CLOCK: (2000-01-03T00:00:00+00:00)"]
+        assert_update_matches_parse(SAMPLE_LINES, new_lines)
+
+    def test_change_headline(self) -> None:
+        new_lines = list(SAMPLE_LINES)
+        new_lines[0] = "# DONE Feed cat"
+        assert_update_matches_parse(SAMPLE_LINES, new_lines)
+
+    def test_insert_lines_shift_line_numbers(self) -> None:
+        new_lines = SAMPLE_LINES[:1] + ["", "## Extra"] + SAMPLE_LINES[1:]
+        assert_update_matches_parse(SAMPLE_LINES, new_lines)
+
+    def test_open_code_block(self) -> None:
+        new_lines = ["```"] + SAMPLE_LINES
+        assert_update_matches_parse(SAMPLE_LINES, new_lines)
+
+    def test_remove_code_block_fence(self) -> None:
+        new_lines = SAMPLE_LINES[:3] + SAMPLE_LINES[4:]
+        assert_update_matches_parse(SAMPLE_LINES, new_lines)
+
+    def test_remove_all_lines(self) -> None:
+        assert_update_matches_parse(SAMPLE_LINES, [])
+
+    def test_keeps_old_parsed_lines(self) -> None:
+        parsed_document = ParsedDocument.parse(iter(SAMPLE_LINES))
+        old_document = ParsedDocument(
+            parsed_lines=parsed_document.parsed_lines
+        )
+        expected = to_summary(old_document)
+        new_lines = SAMPLE_LINES[:1] + ["", "## Extra"] + SAMPLE_LINES[1:]
+        start, old_end, new_end = get_changed_range(SAMPLE_LINES, new_lines)
+        parsed_document.update(
+            new_lines, start=start, old_end=old_end, new_end=new_end
+        )
+        assert to_summary(old_document) == expected
+
+
+class TestParsedDocumentCopy:
+    def test_bound_time_range_keeps_original(self) -> None:
+        parsed_document = ParsedDocument.parse(iter(SAMPLE_LINES))
+        new_parsed_document = parsed_document.copy()
+        new_parsed_document.bound_time_range(
+            start=datetime.datetime(2000, 1, 2, tzinfo=UTC),
+            end=datetime.datetime(2000, 1, 3, tzinfo=UTC),
+        )
+        assert to_summary(parsed_document) == to_summary(
+            ParsedDocument.parse(iter(SAMPLE_LINES))
+        )
+
+
+class TestClockIndex:
+    def test_get_bounded_clocks(self) -> None:
+        parsed_document = ParsedDocument.parse(iter(NESTED_LINES))
+        clock_index = ClockIndex.build(parsed_document)
+        bounded_clocks = clock_index.get_bounded_clocks(
+            start=datetime.datetime(2004, 1, 2, tzinfo=UTC),
+            end=datetime.datetime(2004, 1, 3, tzinfo=UTC),
+        )
+        assert [
+            parsed_line.line_number for parsed_line in bounded_clocks
+        ] == [
+            8,
+            4,
+            5,
+        ]
+        assert [parsed_line.duration for parsed_line in bounded_clocks] == [
+            datetime.timedelta(days=1),
+            datetime.timedelta(hours=10),
+            datetime.timedelta(hours=1),
+        ]
+
+    def test_get_bounded_document_matches_refresh_durations(self) -> None:
+        parsed_document = ParsedDocument.parse(iter(NESTED_LINES))
+        clock_index = ClockIndex.build(parsed_document)
+        start = datetime.datetime(2004, 1, 1, 12, tzinfo=UTC)
+        end = datetime.datetime(2004, 1, 2, 12, tzinfo=UTC)
+
+        expected_document = parsed_document.copy()
+        expected_document.bound_time_range(start=start, end=end)
+        expected_document.refresh_durations()
+
+        bounded_document = clock_index.get_bounded_document(
+            start=start, end=end
+        )
+        assert [
+            item.text for item in get_summary_quicklist(bounded_document)
+        ] == [item.text for item in get_summary_quicklist(expected_document)]
+
+    def test_get_clocked_document_matches_refresh_durations(self) -> None:
+        parsed_document = ParsedDocument.parse(iter(NESTED_LINES))
+        clock_index = ClockIndex.build(parsed_document)
+
+        expected_document = parsed_document.copy()
+        expected_document.refresh_durations()
+
+        clocked_document = clock_index.get_clocked_document()
+        assert clocked_document.duration == expected_document.duration
+        assert [
+            item.text for item in get_summary_quicklist(clocked_document)
+        ] == [item.text for item in get_summary_quicklist(expected_document)]
+        # The indexed document is not changed.
+        assert not any(
+            parsed_line.duration_seconds
+            for parsed_line in parsed_document.parsed_lines
+        )
+
+    def test_get_overlapping_after_long_clock(self) -> None:
+        # A month long clock first, then clocks of up to a day in random order.
+        start = datetime.datetime(2004, 1, 1, tzinfo=UTC)
+        randomizer = random.Random(0)
+        clocks = [Clock(start=start, end=start + datetime.timedelta(days=30))]
+        for _ in range(200):
+            clock_start = start + datetime.timedelta(
+                minutes=randomizer.randrange(60 * 24 * 60)
+            )
+            duration = datetime.timedelta(
+                minutes=randomizer.randrange(60 * 24)
+            )
+            clocks.append(
+                Clock(start=clock_start, end=clock_start + duration)
+            )
+        lines = ["# Clocks"] + ["## " + clock.to_string() for clock in clocks]
+        clock_index = ClockIndex.build(ParsedDocument.parse(iter(lines)))
+
+        for day in range(62):
+            day_start = start + datetime.timedelta(days=day)
+            day_end = day_start + datetime.timedelta(days=1)
+            expected = [
+                position
+                for position in range(len(clock_index))
+                if clock_index.starts[position] < day_end.timestamp()
+                and clock_index.ends[position] > day_start.timestamp()
+            ]
+            overlapping = clock_index.get_overlapping(
+                start=day_start, end=day_end
+            )
+            assert overlapping == expected
+
+    def test_no_overlap(self) -> None:
+        parsed_document = ParsedDocument.parse(iter(NESTED_LINES))
+        clock_index = ClockIndex.build(parsed_document)
+        assert not clock_index.get_overlapping(
+            start=datetime.datetime(2005, 1, 1, tzinfo=UTC),
+            end=datetime.datetime(2005, 1, 2, tzinfo=UTC),
+        )
+
+    def test_get_bounded_documents_matches_get_bounded_document(self) -> None:
+        parsed_document = ParsedDocument.parse(iter(NESTED_LINES))
+        clock_index = ClockIndex.build(parsed_document)
+        boundaries = [
+            datetime.datetime(2004, 1, day, tzinfo=UTC) for day in range(1, 7)
+        ]
+
+        bounded_documents = clock_index.get_bounded_documents(boundaries)
+        assert len(bounded_documents) == len(boundaries) - 1
+        for start, end, bounded_document in zip(
+            boundaries, boundaries[1:], bounded_documents
+        ):
+            expected_document = clock_index.get_bounded_document(
+                start=start, end=end
+            )
+            assert [
+                item.text for item in get_summary_quicklist(bounded_document)
+            ] == [
+                item.text for item in get_summary_quicklist(expected_document)
+            ]
+
+    def test_get_bounded_documents_without_ranges(self) -> None:
+        parsed_document = ParsedDocument.parse(iter(NESTED_LINES))
+        clock_index = ClockIndex.build(parsed_document)
+        assert not clock_index.get_bounded_documents([])
+
+
+class TestParsedDocumentGetFixClocksDiff:
+    def test_only_changed_lines(self) -> None:
+        lines = [
+            "# Chores",
+            "## CLOCK: (2004-01-01T00:00:00+0000)--(2004-01-01T02:00:00+0000) => 2:00:00",
+            "## CLOCK: (2004-01-01T03:00:00+00:00)--(2004-01-01T04:00:00+00:00)",
+            "##   CLOCK: (2004-01-01T05:00:00+0000)",
+            "## CLOCK: (2004-01-01T06:00:00+0000)",
+        ]
+        assert ParsedDocument.parse(iter(lines)).get_fix_clocks_diff() == [
+            (
+                3,
+                "## CLOCK: (2004-01-01T03:00:00+0000)--(2004-01-01T04:00:00+0000)"
+                " => 1:00:00",
+            ),
+            (4, "## CLOCK: (2004-01-01T05:00:00+0000)"),
+        ]
+
+
+class TestMergeLineChanges:
+    def test_adjacent(self) -> None:
+        assert merge_line_changes(
+            [(2, "b"), (3, "c"), (5, "e"), (6, "f")]
+        ) == [
+            (2, ["b", "c"]),
+            (5, ["e", "f"]),
+        ]
+
+    def test_empty(self) -> None:
+        assert not merge_line_changes([])
+
+
+class TestParsedDocumentRefreshDurations:
+    def test_nested(self) -> None:
+        parsed_document = ParsedDocument.parse(iter(NESTED_LINES))
+        parsed_document.refresh_durations()
+        assert parsed_document.duration == datetime.timedelta(
+            days=5, hours=17
+        )
+        assert [
+            parsed_line.duration_seconds
+            for parsed_line in parsed_document.parsed_lines
+        ] == [
+            17 * 3600,
+            2 * 3600,
+            15 * 3600,
+            14 * 3600,
+            3600,
+            0,
+            120 * 3600,
+            120 * 3600,
+        ]
+
+
+class TestParseTimestamp:
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "2004-01-02T03:04:05+0000",
+            "2004-01-02T03:04:05+00:00",
+            "2004-01-02T03:04:05-0530",
+            "2004-01-02T03:04:05+09:30",
+            "2004-1-2T3:4:5+0100",
+            "0999-01-02T03:04:05+0000",
+        ],
+    )
+    def test_same_as_strptime(self, value: str) -> None:
+        parsed = parse_timestamp(value)
+        expected = datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
+        assert parsed == expected
+        assert parsed.utcoffset() == expected.utcoffset()
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "2004-13-02T03:04:05+0000",
+            "2004-01-02T03:04:05+2400",
+            "2004-01-0x",
+        ],
+    )
+    def test_invalid(self, value: str) -> None:
+        with pytest.raises(ValueError):
+            parse_timestamp(value)
+
+
+class TestFormatTimestamp:
+    @pytest.mark.parametrize(
+        "value",
+        [
+            datetime.datetime(2004, 1, 2, 3, 4, 5, tzinfo=UTC),
+            datetime.datetime(
+                2004,
+                11,
+                12,
+                13,
+                14,
+                15,
+                tzinfo=datetime.timezone(
+                    -datetime.timedelta(hours=5, minutes=30)
+                ),
+            ),
+            datetime.datetime(999, 1, 2, 3, 4, 5, tzinfo=UTC),
+            datetime.datetime(2004, 1, 2, 3, 4, 5),
+        ],
+    )
+    def test_same_as_strftime(self, value: datetime.datetime) -> None:
+        assert format_timestamp(value) == value.strftime(TIMESTAMP_FORMAT)
+
+
+class TestIterLines:
+    @pytest.mark.parametrize("chunk_size", [1, 2, 5, 1024])
+    @pytest.mark.parametrize("text", ["", "a", "a\n", "a\n\nbc\n", "ab\ncd"])
+    def test_same_as_splitlines(self, chunk_size: int, text: str) -> None:
+        lines = list(iter_lines(io.StringIO(text), chunk_size=chunk_size))
+        assert lines == text.splitlines()
+
+
+class TestIterStructure:
+    def test_skips_body_text(self) -> None:
+        parsed_lines = list(iter_structure(SAMPLE_LINES))
+        assert [parsed_line.line_number for parsed_line in parsed_lines] == [
+            1,
+            2,
+            4,
+            7,
+            8,
+            9,
+        ]
+        assert to_summary(ParsedDocument(parsed_lines=parsed_lines)) == [
+            summary
+            for summary in to_summary(
+                ParsedDocument.parse(iter(SAMPLE_LINES))
+            )
+            if summary[0] in (1, 2, 4, 7, 8, 9)
+        ]
+
+    def test_skips_clocks_without_tags(self) -> None:
+        parsed_lines = list(iter_structure(TAGGED_LINES, tags=["code"]))
+        assert [parsed_line.line_number for parsed_line in parsed_lines] == [
+            1,
+            2,
+            3,
+            4,
+            6,
+            7,
+            8,
+        ]
+
+
+class TestDurationAccumulator:
+    def test_same_as_refresh_durations(self) -> None:
+        lines = SAMPLE_LINES + NESTED_LINES
+        expected_document = ParsedDocument.parse(iter(lines))
+        expected_document.refresh_durations()
+
+        duration_accumulator = DurationAccumulator()
+        closed_lines = []
+        for parsed_line in iter_structure(lines):
+            closed_lines.extend(duration_accumulator.feed(parsed_line))
+        closed_lines.extend(duration_accumulator.finish())
+
+        assert duration_accumulator.duration == expected_document.duration
+        assert sorted(
+            (parsed_line.line_number, parsed_line.duration_seconds)
+            for parsed_line in closed_lines
+        ) == [
+            (parsed_line.line_number, parsed_line.duration_seconds)
+            for parsed_line in expected_document.parsed_lines
+            if parsed_line.headline is not None
+        ]
+
+
+class TestTagIndex:
+    def build(self) -> typing.Tuple[ClockIndex, TagIndex]:
+        parsed_document = ParsedDocument.parse(iter(TAGGED_LINES))
+        return (
+            ClockIndex.build(parsed_document),
+            TagIndex.build(iter_headline_tags(parsed_document.parsed_lines)),
+        )
+
+    def test_ranges(self) -> None:
+        _, tag_index = self.build()
+        assert tag_index.ranges == {
+            "code": [(2, 4), (6, 8)],
+            "work": [(1, 6)],
+        }
+
+    def test_inherited_combinations(self) -> None:
+        _, tag_index = self.build()
+        assert sorted(
+            sorted(combination) for combination in tag_index.combinations
+        ) == [
+            [],
+            ["code"],
+            ["code", "work"],
+            ["work"],
+        ]
+
+    def test_rollup(self) -> None:
+        clock_index, tag_index = self.build()
+        tag_rollup = tag_index.rollup(
+            clock_index,
+            start=datetime.datetime(2004, 1, 1, tzinfo=UTC),
+            end=datetime.datetime(2004, 1, 2, tzinfo=UTC),
+        )
+        hour = 3600
+        assert tag_rollup.duration_seconds == 10 * hour
+        assert tag_rollup.tag_durations == {
+            "code": 4 * hour,
+            "work": 3 * hour,
+        }
+        assert tag_rollup.combination_durations == {
+            frozenset(): 4 * hour,
+            frozenset(["code"]): 3 * hour,
+            frozenset(["code", "work"]): hour,
+            frozenset(["work"]): 2 * hour,
+        }
+
+    def test_quicklist(self) -> None:
+        clock_index, tag_index = self.build()
+        tag_rollup = tag_index.rollup(
+            clock_index,
+            start=datetime.datetime(2004, 1, 1, tzinfo=UTC),
+            end=datetime.datetime(2004, 1, 2, tzinfo=UTC),
+        )
+        assert [
+            (item.lnum, item.text)
+            for item in get_tag_quicklist(tag_rollup, tag_index)
+        ] == [
+            (1, "| Duration / h | Tag"),
+            (1, "|        10.00 | Total"),
+            (2, "|         4.00 | :code:"),
+            (1, "|         3.00 | :work:"),
+            (1, "| Duration / h | Tags"),
+            (1, "|         4.00 | Untagged"),
+            (1, "|         1.00 | :code:work:"),
+        ]
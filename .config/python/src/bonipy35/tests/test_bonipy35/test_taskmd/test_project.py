@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+# Need Python 3.5 support.
+# pylint: disable=consider-using-f-string
+
+# Standard libraries.
+import datetime
+import os
+import pathlib
+import typing
+
+# External dependencies.
+import pytest
+
+# Internal modules.
+from bonipy35.taskmd import data
+from bonipy35.taskmd.data import ParsedProject
+
+
+def write_clock_file(path: pathlib.Path, *, hours: int) -> None:
+    path.write_text(
+        "# Work\n"
+        "## CLOCK: (2004-01-01T00:00:00+00:00)--(2004-01-01T{hours:02d}:00:00+00:00)\n".format(
+            hours=hours
+        ),
+        encoding="utf-8",
+    )
+
+
+@pytest.fixture(name="cache_directory", autouse=True)
+def fixture_cache_directory(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> pathlib.Path:
+    # Projects cache there by default. Keep tests out of the user cache.
+    cache_directory = tmp_path / "cache"
+    cache_directory.mkdir()
+    monkeypatch.setattr(data, "get_cache_directory", lambda: cache_directory)
+    return cache_directory
+
+
+def touch(path: pathlib.Path) -> None:
+    stat = path.stat()
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+class TestParsedProject:
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_parse(self, max_workers: int, tmp_path: pathlib.Path) -> None:
+        paths = [tmp_path / "a.md", tmp_path / "b.md", tmp_path / "c.md"]
+        for hours, path in enumerate(paths, start=1):
+            write_clock_file(path, hours=hours)
+
+        parsed_project = ParsedProject.parse(paths, max_workers=max_workers)
+        assert parsed_project.duration == datetime.timedelta(hours=6)
+        assert sorted(parsed_project.parsed_documents) == paths
+
+    def test_update_only_changed(self, tmp_path: pathlib.Path) -> None:
+        paths = [tmp_path / "a.md", tmp_path / "b.md"]
+        for path in paths:
+            write_clock_file(path, hours=1)
+        parsed_project = ParsedProject.parse(paths, max_workers=1)
+
+        write_clock_file(paths[1], hours=5)
+        touch(paths[1])
+        assert parsed_project.update(paths, max_workers=1) == [paths[1]]
+        assert parsed_project.duration == datetime.timedelta(hours=6)
+
+        assert not parsed_project.update(paths[:1], max_workers=1)
+        assert parsed_project.duration == datetime.timedelta(hours=1)
+
+    def test_cache_skips_parse(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+    ) -> None:
+        cache_directory = tmp_path / "other_cache"
+        cache_directory.mkdir()
+        path = tmp_path / "a.md"
+        write_clock_file(path, hours=2)
+        ParsedProject.parse([path], cache_directory=cache_directory)
+
+        def fail_parse(
+            *args: typing.Any, **kwargs: typing.Any
+        ) -> typing.Iterator[data.ParsedLine]:
+            raise AssertionError("Document should be cached.")
+
+        with monkeypatch.context() as m:
+            m.setattr(data, "iter_structure", fail_parse)
+            touch(path)
+            parsed_project = ParsedProject.parse(
+                [path], cache_directory=cache_directory
+            )
+        assert parsed_project.duration == datetime.timedelta(hours=2)
+
+        write_clock_file(path, hours=3)
+        touch(path)
+        parsed_project = ParsedProject.parse(
+            [path], cache_directory=cache_directory
+        )
+        assert parsed_project.duration == datetime.timedelta(hours=3)
+
+    def test_default_cache_directory(
+        self, cache_directory: pathlib.Path, tmp_path: pathlib.Path
+    ) -> None:
+        path = tmp_path / "a.md"
+        write_clock_file(path, hours=2)
+        ParsedProject.parse([path])
+        assert len(list(cache_directory.glob("*.pickle"))) == 1
+
+    def test_creates_cache_directory(self, tmp_path: pathlib.Path) -> None:
+        cache_directory = tmp_path / "missing" / "cache"
+        path = tmp_path / "a.md"
+        write_clock_file(path, hours=2)
+        ParsedProject.parse([path], cache_directory=cache_directory)
+        assert len(list(cache_directory.glob("*.pickle"))) == 1
+
+    def test_unwritable_cache(
+        self, caplog: pytest.LogCaptureFixture, tmp_path: pathlib.Path
+    ) -> None:
+        # A file in place of the directory fails every write.
+        cache_directory = tmp_path / "cache_file"
+        cache_directory.touch()
+        path = tmp_path / "a.md"
+        write_clock_file(path, hours=2)
+        parsed_project = ParsedProject.parse(
+            [path], cache_directory=cache_directory
+        )
+        assert parsed_project.duration == datetime.timedelta(hours=2)
+        assert "Unable to write cache file" in caplog.text
+
+    def test_keeps_headlines_only(self, tmp_path: pathlib.Path) -> None:
+        path = tmp_path / "a.md"
+        path.write_text(
+            "# Work\n"
+            "Notes\n"
+            "```\n"
+            "# Not a headline\n"
+            "```\n"
+            "## CLOCK: (2004-01-01T00:00:00+00:00)--(2004-01-01T01:00:00+00:00)\n",
+            encoding="utf-8",
+        )
+        parsed_document = data.load_document(path).parsed_document
+        assert [
+            (parsed_line.line_number, parsed_line.duration)
+            for parsed_line in parsed_document.parsed_lines
+        ] == [
+            (1, datetime.timedelta(hours=1)),
+            (6, datetime.timedelta(hours=1)),
+        ]
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+# Standard libraries.
+import datetime
+import io
+import pathlib
+import typing
+
+# External dependencies.
+import pytest
+
+# Internal modules.
+from bonipy35.taskmd.report import (
+    Writer,
+    iter_paths,
+    iter_summaries,
+    run,
+    summarize_file,
+)
+
+UTC = datetime.timezone.utc
+
+LINES = [
+    "# Work :work:",
+    "## Review :code:",
+    "### CLOCK: (2004-01-01T23:00:00+00:00)--(2004-01-02T01:00:00+00:00)",
+    "```",
+    "## CLOCK: (2004-01-01T00:00:00+00:00)--(2004-01-01T08:00:00+00:00)",
+    "```",
+    "## Meeting",
+    "### CLOCK: (2004-01-02T02:00:00+00:00)--(2004-01-02T03:00:00+00:00)",
+    "### CLOCK: (2004-01-05T02:00:00+00:00)--(2004-01-05T03:00:00+00:00)",
+]
+
+START = datetime.datetime(2004, 1, 1, tzinfo=UTC)
+
+END = datetime.datetime(2004, 1, 3, tzinfo=UTC)
+
+HOUR = 3600
+
+
+class TestSummarizeFile:
+    def test_by_day_and_headline(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        path = write_source(tmp_path / "a.md")
+        assert summarize_file(
+            path, end=END, group_by=["day", "headline"], start=START, tags=[]
+        ) == (
+            {
+                ("2004-01-01", "Review"): HOUR,
+                ("2004-01-02", "Meeting"): HOUR,
+                ("2004-01-02", "Review"): HOUR,
+            },
+            3 * HOUR,
+        )
+
+    def test_by_tag(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        path = write_source(tmp_path / "a.md")
+        assert summarize_file(
+            path, end=END, group_by=["tag"], start=START, tags=[]
+        ) == ({("code",): 2 * HOUR, ("work",): 3 * HOUR}, 3 * HOUR)
+
+    def test_tag_filter(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        path = write_source(tmp_path / "a.md")
+        assert summarize_file(
+            path,
+            end=END,
+            group_by=["file"],
+            start=START,
+            tags=["code", "work"],
+        ) == ({(str(path),): 2 * HOUR}, 2 * HOUR)
+        assert summarize_file(
+            path, end=END, group_by=["file"], start=START, tags=["home"]
+        ) == ({}, 0)
+
+
+class TestIterSummaries:
+    def test_parallel_same_as_serial(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        paths = [write_source(tmp_path / name) for name in ("a.md", "b.md")]
+
+        def summarize(max_workers: int) -> typing.List[typing.Any]:
+            return sorted(
+                (sorted(durations.items()), total_seconds)
+                for durations, total_seconds in iter_summaries(
+                    paths,
+                    end=END,
+                    group_by=["file", "day"],
+                    max_workers=max_workers,
+                    start=START,
+                    tags=[],
+                )
+            )
+
+        assert summarize(1) == summarize(2)
+
+
+class TestRun:
+    def test_total_by_tag(
+        self,
+        capsys: pytest.CaptureFixture[str],
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        path = write_source(tmp_path / "a.md")
+        assert (
+            run(
+                end=END,
+                format_name="table",
+                group_by=["tag"],
+                max_workers=1,
+                path_arguments=[str(path)],
+                start=START,
+                tags=[],
+            )
+            == 0
+        )
+        # A clock under both tags is counted in both rows, but once in total.
+        assert capsys.readouterr().out.splitlines() == [
+            "| Duration / h | tag",
+            "|         2.00 | code",
+            "|         3.00 | work",
+            "|         3.00 | Total",
+        ]
+
+    def test_files_in_path_order(
+        self,
+        capsys: pytest.CaptureFixture[str],
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        paths = [write_source(tmp_path / name) for name in ("b.md", "a.md")]
+        assert (
+            run(
+                end=END,
+                format_name="csv",
+                group_by=["file"],
+                max_workers=2,
+                path_arguments=[str(path) for path in paths],
+                start=START,
+                tags=[],
+            )
+            == 0
+        )
+        assert [
+            row.split(",")[0]
+            for row in capsys.readouterr().out.splitlines()[1:]
+        ] == [str(paths[1]), str(paths[0])]
+
+
+class TestIterPaths:
+    def test_directories_and_globs(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        (tmp_path / "team").mkdir()
+        first = write_source(tmp_path / "team" / "a.md")
+        second = write_source(tmp_path / "b.md")
+        (tmp_path / "c.txt").touch()
+        assert list(
+            iter_paths(
+                [str(tmp_path / "team"), str(tmp_path / "*.md"), str(first)]
+            )
+        ) == [first, second]
+
+
+class TestWriter:
+    def test_csv(self) -> None:
+        stream = io.StringIO()
+        writer = Writer(
+            format_name="csv", group_by=["day", "tag"], stream=stream
+        )
+        writer.write_header()
+        writer.write_rows({("2004-01-01", ""): 60, ("2004-01-01", "a,b"): 30})
+        writer.write_footer(total_seconds=90)
+        assert stream.getvalue().splitlines() == [
+            "day,tag,seconds",
+            "2004-01-01,,60",
+            '2004-01-01,"a,b",30',
+        ]
+
+    def test_ndjson(self) -> None:
+        stream = io.StringIO()
+        writer = Writer(format_name="ndjson", group_by=["tag"], stream=stream)
+        writer.write_header()
+        writer.write_rows({("code",): 60})
+        writer.write_footer(total_seconds=60)
+        assert stream.getvalue() == '{"seconds": 60, "tag": "code"}\n'
+
+    def test_table(self) -> None:
+        stream = io.StringIO()
+        writer = Writer(format_name="table", group_by=["tag"], stream=stream)
+        writer.write_header()
+        writer.write_rows({("code",): 3600, ("work",): 1800})
+        writer.write_footer(total_seconds=5400)
+        assert stream.getvalue().splitlines() == [
+            "| Duration / h | tag",
+            "|         1.00 | code",
+            "|         0.50 | work",
+            "|         1.50 | Total",
+        ]
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+# Standard libraries.
+import datetime
+import os
+import pathlib
+import sys
+import typing
+
+# Internal modules.
+from bonipy35.taskmd import sidecar
+from bonipy35.taskmd.data import (
+    ClockIndex,
+    ParsedDocument,
+    TagIndex,
+    get_summary_quicklist,
+    iter_headline_tags,
+)
+
+UTC = datetime.timezone.utc
+
+LINES = [
+    "# TODO Grocery :home:",
+    "## CLOCK: (2004-01-01T00:00:00+00:00)--(2004-01-01T02:00:00+00:00)",
+    "Some notes.",
+    "```",
+    "# Not a headline",
+    "```",
+    "## TODO Laundry :home:chore:",
+    "### CLOCK: (2004-01-01T20:00:00+00:00)--(2004-01-02T10:00:00+00:00)",
+    "### CLOCK: (2004-01-03T00:00:00+00:00)",
+]
+
+
+def get_summary_texts(clock_index: ClockIndex) -> typing.List[str]:
+    bounded_document = clock_index.get_bounded_document(
+        start=datetime.datetime(2004, 1, 1, 1, tzinfo=UTC),
+        end=datetime.datetime(2004, 1, 2, tzinfo=UTC),
+    )
+    return [item.text for item in get_summary_quicklist(bounded_document)]
+
+
+class TestLoadClockIndex:
+    def test_same_as_parse(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        source_path = write_source(tmp_path / "source.md")
+        expected = get_summary_texts(
+            ClockIndex.build(ParsedDocument.parse(iter(LINES)))
+        )
+
+        assert (
+            get_summary_texts(sidecar.load_clock_index(source_path))
+            == expected
+        )
+        sidecar_path = sidecar.get_sidecar_path(source_path)
+        assert sidecar_path.exists()
+        loaded = sidecar.Sidecar.open(sidecar_path, source_path=source_path)
+        assert loaded is not None
+        assert get_summary_texts(loaded.get_clock_index()) == expected
+
+    def test_tags(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        source_path = write_source(tmp_path / "source.md")
+        sidecar_path = sidecar.get_sidecar_path(
+            source_path, directory=tmp_path
+        )
+        sidecar.build(source_path, sidecar_path)
+        loaded = sidecar.Sidecar.open(sidecar_path, source_path=source_path)
+        assert loaded is not None
+        assert [
+            loaded.get_tags(index)
+            for index in range(len(loaded.headline_offsets))
+        ] == [["home"], [], ["home", "chore"], [], []]
+
+    def test_stale_after_change(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        source_path = write_source(tmp_path / "source.md")
+        sidecar.load_clock_index(source_path)
+        sidecar_path = sidecar.get_sidecar_path(source_path)
+
+        stat = source_path.stat()
+        os.utime(
+            str(source_path),
+            ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9),
+        )
+        assert (
+            sidecar.Sidecar.open(sidecar_path, source_path=source_path)
+            is None
+        )
+
+        sidecar.load_clock_index(source_path)
+        assert (
+            sidecar.Sidecar.open(sidecar_path, source_path=source_path)
+            is not None
+        )
+
+    def test_rebuild_truncated(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        source_path = write_source(tmp_path / "source.md")
+        sidecar_path = sidecar.get_sidecar_path(
+            source_path, directory=tmp_path
+        )
+        sidecar.build(source_path, sidecar_path)
+        content = sidecar_path.read_bytes()
+        expected = get_summary_texts(
+            ClockIndex.build(ParsedDocument.parse(iter(LINES)))
+        )
+
+        for size in (4, len(content) // 2, len(content) - 1):
+            sidecar_path.write_bytes(content[:size])
+            assert (
+                sidecar.Sidecar.open(sidecar_path, source_path=source_path)
+                is None
+            )
+            clock_index = sidecar.load_clock_index(
+                source_path, directory=tmp_path
+            )
+            assert get_summary_texts(clock_index) == expected
+            assert sidecar_path.read_bytes() == content
+
+    def test_rebuild_corrupt(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        source_path = write_source(tmp_path / "source.md")
+        sidecar_path = sidecar.get_sidecar_path(
+            source_path, directory=tmp_path
+        )
+        sidecar.build(source_path, sidecar_path)
+        content = sidecar_path.read_bytes()
+
+        # A negative clock count, and tag names that are not UTF-8.
+        # The clock count follows the magic and six other header fields.
+        count_offset = 8 + 6 * 8
+        sidecar_path.write_bytes(
+            content[:count_offset]
+            + (-1).to_bytes(8, sys.byteorder, signed=True)
+            + content[count_offset + 8 :]
+        )
+        assert (
+            sidecar.Sidecar.open(sidecar_path, source_path=source_path)
+            is None
+        )
+        sidecar_path.write_bytes(content[:-1] + b"\xff")
+        assert (
+            sidecar.Sidecar.open(sidecar_path, source_path=source_path)
+            is None
+        )
+
+        loaded = sidecar.load(source_path, directory=tmp_path)
+        assert loaded.tag_names == ["home", "chore"]
+        assert sidecar_path.read_bytes() == content
+
+
+class TestLoad:
+    def test_tag_rollup_same_as_parse(
+        self,
+        tmp_path: pathlib.Path,
+        write_source: typing.Callable[[pathlib.Path], pathlib.Path],
+    ) -> None:
+        source_path = write_source(tmp_path / "source.md")
+        parsed_document = ParsedDocument.parse(iter(LINES))
+        start = datetime.datetime(2004, 1, 1, 1, tzinfo=UTC)
+        end = datetime.datetime(2004, 1, 2, tzinfo=UTC)
+        expected = TagIndex.build(
+            iter_headline_tags(parsed_document.parsed_lines)
+        ).rollup(ClockIndex.build(parsed_document), start=start, end=end)
+
+        loaded = sidecar.load(source_path, directory=tmp_path)
+        tag_rollup = loaded.get_tag_index().rollup(
+            loaded.get_clock_index(), start=start, end=end
+        )
+        assert tag_rollup.tag_durations == expected.tag_durations
+        assert (
+            tag_rollup.combination_durations == expected.combination_durations
+        )
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+
+# Standard libraries.
+import collections
+import importlib
+import re
+import sys
+import threading
+import types
+import typing
+
+# External dependencies.
+import pytest
+
+_GETBUFVAR_REGEX = re.compile(
+    r"getbufvar\((?P<bufnr>[0-9]+), '(?P<name>[&\w]+)'"
+)
+
+LINES = [
+    "# Work",
+    "## CLOCK: (2004-01-01T00:00:00+00:00)--(2004-01-01T01:00:00+00:00)",
+]
+
+
+class FakeBuffer(list):  # type: ignore[type-arg]
+    def __init__(self, lines: typing.List[str], *, number: int) -> None:
+        super().__init__(lines)
+        self.name = ""
+        self.number = number
+
+
+class FakeFunction:
+    def __init__(self, name: str, *, calls: typing.List[typing.Any]) -> None:
+        self.calls = calls
+        self.name = name
+
+    def __call__(self, *args: typing.Any) -> None:
+        self.calls.append((self.name,) + args)
+
+
+class FakeVim(types.ModuleType):
+    """Stands in for the `vim` module, which only exists inside Vim."""
+
+    Buffer = FakeBuffer
+
+    def __init__(self) -> None:
+        super().__init__("vim")
+        self.calls = []  # type: typing.List[typing.Any]
+        self.changedticks = {}  # type: typing.Dict[int, int]
+        self.current = types.SimpleNamespace(buffer=None, window=None)
+
+    def Function(  # pylint: disable=invalid-name
+        self, name: str
+    ) -> FakeFunction:
+        return FakeFunction(name, calls=self.calls)
+
+    def add_buffer(
+        self, lines: typing.List[str], *, number: int
+    ) -> FakeBuffer:
+        buffer = FakeBuffer(lines, number=number)
+        self.changedticks[number] = 1
+        self.current.buffer = buffer
+        return buffer
+
+    def change(self, buffer: FakeBuffer, lines: typing.List[str]) -> None:
+        buffer[:] = lines
+        self.changedticks[buffer.number] += 1
+
+    def command(self, command: str) -> None:
+        self.calls.append(("command", command))
+
+    def eval(self, expression: str) -> str:
+        getbufvar_match = _GETBUFVAR_REGEX.match(expression)
+        if getbufvar_match is not None:
+            bufnr = int(getbufvar_match.group("bufnr"))
+            if getbufvar_match.group("name") == "changedtick":
+                return str(self.changedticks[bufnr])
+            return "0"
+        if expression.startswith("timer_start("):
+            return "1"
+        return "0"
+
+    def get_setqflist_calls(self) -> typing.List[typing.Any]:
+        return [call[1:] for call in self.calls if call[0] == "setqflist"]
+
+
+@pytest.fixture(name="fake_vim")
+def fixture_fake_vim(monkeypatch: pytest.MonkeyPatch) -> FakeVim:
+    fake_vim = FakeVim()
+    monkeypatch.setitem(sys.modules, "vim", fake_vim)
+    return fake_vim
+
+
+@pytest.fixture(name="taskmd_vim")
+def fixture_taskmd_vim(
+    fake_vim: FakeVim, monkeypatch: pytest.MonkeyPatch
+) -> typing.Iterator[typing.Any]:
+    # Imported once the fake is in place. Module state is reset per test.
+    taskmd_vim = importlib.import_module("bonipy35.taskmd.vim")
+    monkeypatch.setattr(taskmd_vim, "vim", fake_vim)
+    monkeypatch.setattr(
+        taskmd_vim, "buffer_states", collections.OrderedDict()
+    )
+    report_state = taskmd_vim.ReportState()
+    monkeypatch.setattr(taskmd_vim, "report_state", report_state)
+    yield taskmd_vim
+    if report_state.executor is not None:
+        report_state.executor.shutdown(wait=True)
+
+
+def wait_for_jobs(taskmd_vim: typing.Any) -> None:
+    for report_job in list(taskmd_vim.report_state.jobs.values()):
+        report_job.future.result()
+
+
+class TestGetBufferState:
+    def test_reuses_parse_until_changed(
+        self, fake_vim: FakeVim, taskmd_vim: typing.Any
+    ) -> None:
+        buffer = fake_vim.add_buffer(LINES, number=1)
+        buffer_state = taskmd_vim.get_buffer_state(buffer)
+        assert taskmd_vim.get_buffer_state(buffer) is buffer_state
+
+        fake_vim.change(buffer, ["# Home"] + LINES)
+        new_buffer_state = taskmd_vim.get_buffer_state(buffer)
+        assert new_buffer_state is not buffer_state
+        assert [
+            parsed_line.line_number
+            for parsed_line in new_buffer_state.parsed_document.parsed_lines
+        ] == [1, 2, 3]
+        # The old state may still be used by a pending report.
+        assert [
+            parsed_line.line_number
+            for parsed_line in buffer_state.parsed_document.parsed_lines
+        ] == [1, 2]
+
+    def test_evicts_least_recently_used(
+        self,
+        fake_vim: FakeVim,
+        monkeypatch: pytest.MonkeyPatch,
+        taskmd_vim: typing.Any,
+    ) -> None:
+        monkeypatch.setattr(taskmd_vim, "BUFFER_STATE_CACHE_SIZE", 2)
+        buffers = [
+            fake_vim.add_buffer(LINES, number=number) for number in (1, 2)
+        ]
+        for buffer in buffers:
+            taskmd_vim.get_buffer_state(buffer)
+        taskmd_vim.get_buffer_state(buffers[0])
+        taskmd_vim.get_buffer_state(fake_vim.add_buffer(LINES, number=3))
+        assert list(taskmd_vim.buffer_states) == [1, 3]
+
+
+class TestSetQuicklist:
+    def test_chunks(
+        self,
+        fake_vim: FakeVim,
+        monkeypatch: pytest.MonkeyPatch,
+        taskmd_vim: typing.Any,
+    ) -> None:
+        monkeypatch.setattr(taskmd_vim, "QUICKLIST_CHUNK_SIZE", 2)
+        rows = [
+            {"bufnr": 1, "col": 1, "lnum": lnum, "text": ""}
+            for lnum in range(5)
+        ]
+        taskmd_vim.set_quicklist(rows, title="Title")
+        assert fake_vim.get_setqflist_calls() == [
+            ([], " ", {"items": rows[:2], "title": "Title"}),
+            ([], "a", {"items": rows[2:4]}),
+            ([], "a", {"items": rows[4:]}),
+        ]
+
+    def test_vim_function(
+        self, fake_vim: FakeVim, taskmd_vim: typing.Any
+    ) -> None:
+        assert not hasattr(fake_vim, "funcs")
+        taskmd_vim.set_quicklist([], title="Title")
+        assert fake_vim.get_setqflist_calls() == [
+            ([], " ", {"items": [], "title": "Title"})
+        ]
+
+    def test_neovim_funcs(
+        self,
+        fake_vim: FakeVim,
+        monkeypatch: pytest.MonkeyPatch,
+        taskmd_vim: typing.Any,
+    ) -> None:
+        # Neovim has no `vim.Function`.
+        monkeypatch.delattr(FakeVim, "Function")
+        monkeypatch.setattr(
+            fake_vim,
+            "funcs",
+            types.SimpleNamespace(
+                setqflist=FakeFunction("setqflist", calls=fake_vim.calls)
+            ),
+            raising=False,
+        )
+        taskmd_vim.set_quicklist([], title="Title")
+        assert fake_vim.get_setqflist_calls() == [
+            ([], " ", {"items": [], "title": "Title"})
+        ]
+
+
+class TestReports:
+    def test_shows_finished_report(
+        self, fake_vim: FakeVim, taskmd_vim: typing.Any
+    ) -> None:
+        buffer = fake_vim.add_buffer(LINES, number=1)
+        taskmd_vim.write_summary_to_qlist()
+        wait_for_jobs(taskmd_vim)
+        taskmd_vim.poll_reports()
+
+        setqflist_calls = fake_vim.get_setqflist_calls()
+        assert len(setqflist_calls) == 1
+        assert setqflist_calls[0][2]["title"] == "Summary"
+        assert not taskmd_vim.report_state.jobs
+        assert taskmd_vim.report_state.timer is None
+        # The report used the cached parse.
+        assert list(taskmd_vim.buffer_states) == [buffer.number]
+
+    def test_coalesces_same_request(
+        self, fake_vim: FakeVim, taskmd_vim: typing.Any
+    ) -> None:
+        buffer = fake_vim.add_buffer(LINES, number=1)
+        is_released = threading.Event()
+        snapshots = []  # type: typing.List[typing.Any]
+
+        def compute(snapshot: typing.Any) -> typing.List[typing.Any]:
+            snapshots.append(snapshot)
+            is_released.wait()
+            return []
+
+        for _ in range(2):
+            taskmd_vim.submit_report(
+                buffer, compute=compute, key=("test",), title="Test"
+            )
+        is_released.set()
+        wait_for_jobs(taskmd_vim)
+        assert len(snapshots) == 1
+
+    def test_replaces_different_request(
+        self, fake_vim: FakeVim, taskmd_vim: typing.Any
+    ) -> None:
+        buffer = fake_vim.add_buffer(LINES, number=1)
+        is_released = threading.Event()
+
+        def compute(snapshot: typing.Any) -> typing.List[typing.Any]:
+            del snapshot
+            is_released.wait()
+            return []
+
+        for key in ("first", "second", "third"):
+            taskmd_vim.submit_report(
+                buffer, compute=compute, key=(key,), title=key
+            )
+        report_job = taskmd_vim.report_state.jobs[buffer.number]
+        assert report_job.key == ("third",)
+        is_released.set()
+        wait_for_jobs(taskmd_vim)
+        taskmd_vim.poll_reports()
+        assert [
+            call[2]["title"] for call in fake_vim.get_setqflist_calls()
+        ] == ["third"]
+
+    def test_discards_report_of_changed_buffer(
+        self, fake_vim: FakeVim, taskmd_vim: typing.Any
+    ) -> None:
+        buffer = fake_vim.add_buffer(LINES, number=1)
+        is_released = threading.Event()
+
+        def compute(snapshot: typing.Any) -> typing.List[typing.Any]:
+            del snapshot
+            is_released.wait()
+            return []
+
+        taskmd_vim.submit_report(
+            buffer, compute=compute, key=("test",), title="Test"
+        )
+        report_job = taskmd_vim.report_state.jobs[buffer.number]
+        fake_vim.change(buffer, LINES + ["# Home"])
+        taskmd_vim.poll_reports()
+        is_released.set()
+        report_job.future.result()
+        taskmd_vim.poll_reports()
+
+        assert not taskmd_vim.report_state.jobs
+        assert not fake_vim.get_setqflist_calls()
+
+    def test_discards_finished_report_of_changed_buffer(
+        self, fake_vim: FakeVim, taskmd_vim: typing.Any
+    ) -> None:
+        buffer = fake_vim.add_buffer(LINES, number=1)
+        taskmd_vim.write_summary_to_qlist()
+        wait_for_jobs(taskmd_vim)
+        fake_vim.change(buffer, LINES + ["# Home"])
+        taskmd_vim.poll_reports()
+        assert not fake_vim.get_setqflist_calls()
@@ -15,6 +15,11 @@ catch /^Vim(py3):ModuleNotFoundError:/
   finish
 endtry
 
+" Called by a timer while reports are computed in the background.
+function g:bonipy35#taskmd#poll_reports(timer)
+  py3 bonipy35.taskmd.vim.poll_reports()
+endfunction
+
 function g:bonipy35#taskmd#remap()
   nunmap <Plug>(Boni.Calendar)
   nnoremap <Plug>(Boni.Calendar)<F1> :echo
@@ -24,7 +29,9 @@ function g:bonipy35#taskmd#remap()
     \ :call BoniMapWait("\<Plug>(Boni.Calendar)")<CR>
   nmap <Plug>(Boni.Calendar)<Space> <Plug>(Boni.Calendar)S
   nnoremap <Plug>(Boni.Calendar)A :py3 bonipy35.taskmd.vim.write_agenda_to_qlist()<CR>
+  nnoremap <Plug>(Boni.Calendar)C :py3 bonipy35.taskmd.vim.write_clock_check_to_qlist()<CR>
   nnoremap <Plug>(Boni.Calendar)F :py3 bonipy35.taskmd.vim.fix_clocks()<CR>
+  nnoremap <Plug>(Boni.Calendar)G :py3 bonipy35.taskmd.vim.write_tag_report_to_qlist()<CR>
   nnoremap <Plug>(Boni.Calendar)I :py3 bonipy35.taskmd.vim.start_clock()<CR>
   nnoremap <Plug>(Boni.Calendar)J :py3 bonipy35.taskmd.vim.jump_to_started_clock()<CR>
   nnoremap <Plug>(Boni.Calendar)O :py3 bonipy35.taskmd.vim.end_clock()<CR>
@@ -9,3 +9,7 @@ if !has('python3')
 endif
 
 nmap <Plug>(Boni.Calendar) :call g:bonipy35#taskmd#remap()<CR>
+
+" Reports of unmodified buffers use an index of the file on disk
+" under the XDG state directory instead of parsing the buffer.
+" let g:bonipy35_taskmd_use_sidecar = 1